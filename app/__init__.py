@@ -7,7 +7,13 @@ from config import configs_by_name
 
 from app import errors, cache
 from app.api.llm import LLMClient
+from app.api.rant_cache import RantCache
+from app.api.rant_jobs import RantJobQueue
+from app.api.single_flight import SingleFlight
+from app.api.session_store import create_session_store
 from app.api.spotify_oauth import SpotifyOAuthClient
+from app.api.spotify_cache import SpotifyPlaylistCache
+from app.api.spotify_session import SpotifySessionPool
 
 
 load_dotenv()
@@ -15,7 +21,12 @@ load_dotenv()
 
 session = Session()
 llm_client = LLMClient()
+rant_cache = RantCache()
+rant_jobs = RantJobQueue()
+single_flight = SingleFlight()
+spotify_session_pool = SpotifySessionPool()
 spotify_oauth = SpotifyOAuthClient()
+spotify_playlist_cache = SpotifyPlaylistCache()
 
 
 def create_app(config_name="default"):
@@ -23,9 +34,15 @@ def create_app(config_name="default"):
     app = Flask(__name__)
     app.config.from_object(configs_by_name[config_name])
 
+    app.config["SESSION_CACHELIB"] = create_session_store(app.config)
     session.init_app(app)
     llm_client.init_app(app)
-    spotify_oauth.init_app(app)
+    rant_cache.init_app(app)
+    rant_jobs.init_app(app)
+    single_flight.init_app(app)
+    spotify_session_pool.init_app(app)
+    spotify_oauth.init_app(app, requests_session=spotify_session_pool.session)
+    spotify_playlist_cache.init_app(app)
 
     from app.main import bp as main_bp
 
@@ -42,4 +59,7 @@ def create_app(config_name="default"):
     errors.init_app(app)
     cache.init_app(app)
 
+    if app.config["LLM_WARM_UP"]:
+        llm_client.warm_up()
+
     return app
@@ -1,62 +1,389 @@
+import os
+import re
+import json
+import time
+import hashlib
 import tiktoken
+import threading
 from tiktoken import Encoding
 
-from typing import List, Union
-from pydantic import BaseModel
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain.schema.output_parser import OutputParserException
-from langchain_openai import ChatOpenAI
+from collections import OrderedDict
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Hashable, Iterable, Iterator, List, Optional, Tuple, Type, Union
+from pydantic import BaseModel, ValidationError
+from langchain_core.exceptions import OutputParserException
 
-from app.models.llm import Review, Rhyme
-from app.models.spotify import SpotifyPlaylist
-from app.helpers.spotify import playlist_to_csv, tracks_to_csv
+# Importing langchain's parsers and models takes most of the startup time, so they are imported on first use.
+if TYPE_CHECKING:
+    from langchain.output_parsers import PydanticOutputParser
+
+from app.models.llm import Review, Rhyme, RantType
+from app.models.spotify import SpotifyPlaylist, SpotifyTrack
+from app.helpers.spotify import playlist_to_csv, create_tracks_serializer, CsvTracksSerializer, TracksSerializer
+from app.helpers.metrics import Counters, StageTimer
+from app.helpers.sampling import get_stratified_order
 from app.prompts import prompts
+from app.prompts.prompts import CompiledPromptTemplate
+
+# A comma before the closing of an object or array, which JSON doesn't allow, or else a string (matched first, so the
+# commas inside the strings are left as they are).
+TRAILING_COMMA_OR_STRING = re.compile(r'("(?:[^"\\]|\\.)*")|,\s*([}\]])', re.DOTALL)
+
+# The prompt asking the LLM to fix a response that couldn't be parsed.
+REPAIR_PROMPT_TEMPLATE = CompiledPromptTemplate(prompts.repair_prompt_template)
+
+# How the tracks of the prompt are selected when they don't all fit in it, as described to the LLM.
+TRACKS_SELECTIONS = {
+    "head": "the first tracks of the playlist",
+    "sample": "a sample of the tracks, spread over the release decades, artists and albums of the playlist",
+}
+
+
+class TrackTokensCache:
+    """Thread-safe LRU cache of the number of tokens of the prompt rows of the tracks, keyed by the row keys."""
+
+    def __init__(self, max_size: int = 100_000):
+        """Creates the Track Tokens Cache object, holding up to the given number of tracks."""
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._tokens_counts = OrderedDict()
+
+    def get(self, encoding: Encoding, row_key: Hashable) -> Optional[int]:
+        """Gets the cached number of tokens of the given track row, if any."""
+        with self._lock:
+            tokens_count = self._tokens_counts.get((encoding.name, row_key))
+
+            if tokens_count is not None:
+                self._tokens_counts.move_to_end((encoding.name, row_key))
+
+            return tokens_count
+
+    def set(self, encoding: Encoding, row_key: Hashable, tokens_count: int):
+        """Caches the number of tokens of the given track row, evicting the least recently used if full."""
+        with self._lock:
+            self._tokens_counts[(encoding.name, row_key)] = tokens_count
+            self._tokens_counts.move_to_end((encoding.name, row_key))
+
+            if len(self._tokens_counts) > self.max_size:
+                self._tokens_counts.popitem(last=False)
 
 
 class RantPromptManager:
     """Class to manage the Rant Prompt."""
 
+    # Number of track rows serialized at a time, when adding them to the prompt.
+    ROWS_CHUNK_SIZE = 100
+
     def __init__(
         self,
         parser_model: BaseModel,
         prompt_template: str,
         max_prompt_tokens: int,
         limit_exceeded_prompt_message: str = prompts.limit_exceeded_prompt_message,
+        counters: Optional[Counters] = None,
+        track_tokens_cache: Optional[TrackTokensCache] = None,
+        tracks_format: str = CsvTracksSerializer.name,
+        tracks_selection: str = "head",
     ):
-        """Creates the Rant Prompt Manager object."""
-        self.parser = PydanticOutputParser(pydantic_object=parser_model)
-        self.prompt_template = PromptTemplate(
-            template=prompt_template,
-            input_variables=["playlist", "tracks"],
-            partial_variables={"format_instructions": self.parser.get_format_instructions()},
-        )
+        """
+        Creates the Rant Prompt Manager object, writing the tracks in the given format (see `TRACKS_SERIALIZERS`), and
+        selecting them as given (see `TRACKS_SELECTIONS`) when they don't all fit in the prompt.
+
+        The tracks metrics are reported to the given counters, and the track rows tokens are cached in the given cache,
+        so they can be shared by several managers.
+        """
+        self.parser_model = parser_model
+        self.prompt_template_text = prompt_template
+        self.limit_exceeded_template = CompiledPromptTemplate(limit_exceeded_prompt_message)
         self.max_prompt_tokens = max_prompt_tokens
-        self.limit_exceeded_prompt_message = limit_exceeded_prompt_message
+        self.counters = counters or Counters("tracks_fetched", "tracks_used")
+        self.track_tokens_cache = track_tokens_cache or TrackTokensCache()
+        self.static_tokens_counts = {}
+        self.tracks_format = tracks_format
+        self.tracks_selection = tracks_selection
+
+        # Fails early on an unknown format or selection.
+        create_tracks_serializer(tracks_format)
+
+        if tracks_selection not in TRACKS_SELECTIONS:
+            raise ValueError(f"Unknown tracks selection '{tracks_selection}'")
+
+    @cached_property
+    def parser(self) -> "PydanticOutputParser":
+        """Gets the parser of the LLM responses, created on first use."""
+        from langchain.output_parsers import PydanticOutputParser
+
+        return PydanticOutputParser(pydantic_object=self.parser_model)
+
+    @cached_property
+    def prompt_template(self) -> CompiledPromptTemplate:
+        """Gets the compiled prompt template, with the format instructions of the parser."""
+        return CompiledPromptTemplate(
+            self.prompt_template_text, format_instructions=self.parser.get_format_instructions()
+        )
+
+    @cached_property
+    def version(self) -> str:
+        """Gets the version of the prompt, which changes whenever the prompt of the same playlist could change."""
+        prompt_parts = [
+            self.prompt_template.version,
+            self.limit_exceeded_template.version,
+            str(self.max_prompt_tokens),
+            self.tracks_format,
+            self.tracks_selection,
+        ]
+
+        return hashlib.sha256("\0".join(prompt_parts).encode()).hexdigest()[:16]
+
+    def warm_up(self, encoding: Encoding):
+        """Creates the parser and the prompt template, and counts the static tokens of the prompt, ahead of use."""
+        self.get_static_tokens_count(encoding)
+        self.version
+
+    def generate_prompt(
+        self,
+        playlist: SpotifyPlaylist,
+        encoding: Encoding,
+        tracks_pages: Optional[Iterable[List[SpotifyTrack]]] = None,
+        timer: Optional[StageTimer] = None,
+    ):
+        """
+        Generates the prompt for the given playlist.
+
+        The tracks may be given as pages (see `SpotifyClient.iter_playlist_tracks_pages`) instead of the playlist
+        tracks: each page is then serialized as it arrives, and dropped before the next one. When a Stage Timer is
+        given, it measures the "serialize", "format" and "encode" stages.
+
+        The tokens are counted while the prompt is built, encoding each part of it once: the fixed parts, and then
+        each track row (unless its tokens are cached). With the "head" selection, rows are added until the next one
+        would overflow the maximum prompt tokens: the prompt is then cut on a row boundary, leaving room for the limit
+        exceeded message, and the next pages are never fetched. With the "sample" selection, all the pages are fetched
+        and a sample of the tracks is used instead (see `get_sampled_rows`).
+
+        The number of tracks of the playlist is the number of parsed tracks once they are all fetched, as its total
+        number of tracks also counts the unavailable ones. The total is only used when the pages were cut short, and
+        in the limit exceeded message.
+        """
+        timer = timer or StageTimer()
+        tracks_serializer = create_tracks_serializer(self.tracks_format)
+
+        if tracks_pages is None:
+            tracks_pages = [playlist.tracks or []]
+
+        tracks_count = len(playlist.tracks or []) if playlist.total_tracks is None else playlist.total_tracks
+
+        if self.tracks_selection == "sample":
+            tracks = [track for tracks in tracks_pages for track in tracks]
+            tracks_count = len(tracks)
 
-    def generate_prompt(self, playlist: SpotifyPlaylist, encoding: Encoding):
-        """Generates the prompt for the given playlist."""
-        playlist_csv = playlist_to_csv(playlist)
-        tracks_csv = tracks_to_csv(playlist.tracks)
+        with timer.measure("serialize"):
+            playlist_csv = playlist_to_csv(playlist, tracks_count)
+            tracks_header = tracks_serializer.get_header()
 
-        prompt = self.prompt_template.format(playlist=playlist_csv, tracks=tracks_csv)
+        with timer.measure("encode"):
+            fixed_tokens_count = self.get_static_tokens_count(encoding)
+            fixed_tokens_count += len(encoding.encode_ordinary(playlist_csv))
+            fixed_tokens_count += len(encoding.encode_ordinary(tracks_header))
 
-        prompt_tokens = encoding.encode(prompt)
+        rows_max_tokens = self.max_prompt_tokens - fixed_tokens_count
 
-        if len(prompt_tokens) > self.max_prompt_tokens:
-            prompt = self.adjust_prompt(prompt_tokens, encoding)
-            prompt += self.limit_exceeded_prompt_message
+        if self.tracks_selection == "sample":
+            total_tracks_count = tracks_count if playlist.total_tracks is None else playlist.total_tracks
+            rows, rows_tokens_counts, is_cut_short = self.get_sampled_rows(
+                playlist, tracks, tracks_serializer, encoding, rows_max_tokens, total_tracks_count, timer
+            )
+            fetched_tracks_count = len(tracks)
+            is_fully_fetched = True
+        else:
+            rows, rows_tokens_counts, fetched_tracks_count, is_cut_short = self.get_head_rows(
+                tracks_pages, tracks_serializer, encoding, rows_max_tokens, timer
+            )
+            is_fully_fetched = not is_cut_short
+
+        rows_tokens_count = sum(rows_tokens_counts)
+
+        # The number of parsed tracks is only known once they are all fetched (or when there is no total to go by).
+        if (is_fully_fetched or playlist.total_tracks is None) and fetched_tracks_count != tracks_count:
+            with timer.measure("serialize"):
+                fetched_playlist_csv = playlist_to_csv(playlist, fetched_tracks_count)
+
+            with timer.measure("encode"):
+                rows_max_tokens += len(encoding.encode_ordinary(playlist_csv))
+                rows_max_tokens -= len(encoding.encode_ordinary(fetched_playlist_csv))
+
+            playlist_csv = fetched_playlist_csv
+            tracks_count = fetched_tracks_count
+            is_cut_short = is_cut_short or rows_tokens_count > rows_max_tokens
+
+        if is_cut_short:
+            total_tracks_count = tracks_count if playlist.total_tracks is None else playlist.total_tracks
+
+            with timer.measure("encode"):
+                rows_max_tokens -= self.count_limit_exceeded_message_tokens(total_tracks_count, encoding)
+
+            while rows and rows_tokens_count > rows_max_tokens:
+                rows.pop()
+                rows_tokens_count -= rows_tokens_counts.pop()
+
+        self.counters.increment("tracks_fetched", fetched_tracks_count)
+        self.counters.increment("tracks_used", len(rows))
+
+        with timer.measure("format"):
+            tracks_csv = tracks_header + "".join(rows)
+            prompt = self.prompt_template.format(playlist=playlist_csv, tracks=tracks_csv)
+
+            if is_cut_short:
+                prompt += self.get_limit_exceeded_message(len(rows), total_tracks_count)
 
         return prompt
 
-    def adjust_prompt(self, tokens: List[int], encoding: Encoding):
-        """Adjusts the prompt to fit the maximum context tokens."""
-        if len(tokens) <= self.max_prompt_tokens:
-            return tokens
+    def get_head_rows(
+        self,
+        tracks_pages: Iterable[List[SpotifyTrack]],
+        tracks_serializer: TracksSerializer,
+        encoding: Encoding,
+        rows_max_tokens: int,
+        timer: StageTimer,
+    ) -> Tuple[List[str], List[int], int, bool]:
+        """
+        Gets the rows of the first tracks of the given pages that fit in the given number of tokens, with their tokens
+        counts, the number of tracks fetched, and whether the tracks were cut short.
+        """
+        rows = []
+        rows_tokens_counts = []
+        rows_tokens_count = 0
+        fetched_tracks_count = 0
+        is_cut_short = False
+
+        tracks_pages = iter(tracks_pages)
+
+        for tracks in tracks_pages:
+            fetched_tracks_count += len(tracks)
+
+            # A whole playlist may be given as a single page, so it's serialized in chunks, until the budget is full.
+            for start in range(0, len(tracks), self.ROWS_CHUNK_SIZE):
+                end = start + self.ROWS_CHUNK_SIZE
+                tracks_chunk = tracks[start:end]
+
+                with timer.measure("serialize"):
+                    tracks_rows = tracks_serializer.get_rows(tracks_chunk)
+
+                with timer.measure("encode"):
+                    for row_key, row in tracks_rows:
+                        row_tokens_count = self.count_row_tokens(row_key, row, encoding)
+
+                        if rows_tokens_count + row_tokens_count > rows_max_tokens:
+                            is_cut_short = True
+                            break
+
+                        rows.append(row)
+                        rows_tokens_counts.append(row_tokens_count)
+                        rows_tokens_count += row_tokens_count
+
+                if is_cut_short:
+                    break
+
+            if is_cut_short:
+                break
+
+        # Stops the fetching of the pages not consumed.
+        if hasattr(tracks_pages, "close"):
+            tracks_pages.close()
+
+        return rows, rows_tokens_counts, fetched_tracks_count, is_cut_short
+
+    def get_sampled_rows(
+        self,
+        playlist: SpotifyPlaylist,
+        tracks: List[SpotifyTrack],
+        tracks_serializer: TracksSerializer,
+        encoding: Encoding,
+        rows_max_tokens: int,
+        tracks_count: int,
+        timer: StageTimer,
+    ) -> Tuple[List[str], List[int], bool]:
+        """
+        Gets the rows of a sample of the given tracks that fits in the given number of tokens, with their tokens counts,
+        and whether the tracks were sampled.
+
+        Each track is first counted on a row of its own, which is the most it may take in the prompt (with its group
+        line, or its artists and album definitions). If they don't all fit, the tracks are picked in their stratified
+        order (see `get_stratified_order`), skipping the ones that no longer fit, until the room left for the limit
+        exceeded message is reached. The picked tracks keep the playlist order, and the seed of the order is the
+        playlist snapshot, so the same snapshot always gets the same sample.
+        """
+        with timer.measure("serialize"):
+            tracks_rows = tracks_serializer.get_single_rows(tracks)
+
+        with timer.measure("encode"):
+            tracks_tokens_counts = [self.count_row_tokens(row_key, row, encoding) for row_key, row in tracks_rows]
+
+        is_sampled = sum(tracks_tokens_counts) > rows_max_tokens
+
+        if is_sampled:
+            with timer.measure("encode"):
+                available_tokens_count = rows_max_tokens - self.count_limit_exceeded_message_tokens(
+                    tracks_count, encoding
+                )
+
+            with timer.measure("sample"):
+                is_picked = [False] * len(tracks)
+
+                for index in get_stratified_order(tracks, f"{playlist.id}:{playlist.snapshot_id}"):
+                    if tracks_tokens_counts[index] <= available_tokens_count:
+                        is_picked[index] = True
+                        available_tokens_count -= tracks_tokens_counts[index]
+
+                tracks = [track for track, is_track_picked in zip(tracks, is_picked) if is_track_picked]
+
+        rows = []
+        rows_tokens_counts = []
 
-        adjusted_prompt = tokens[: self.max_prompt_tokens]
+        # Serialized again as a whole, as the rows of the tracks following others of their group are shorter.
+        with timer.measure("serialize"):
+            tracks_rows = tracks_serializer.get_rows(tracks)
 
-        return encoding.decode(adjusted_prompt)
+        with timer.measure("encode"):
+            for row_key, row in tracks_rows:
+                rows.append(row)
+                rows_tokens_counts.append(self.count_row_tokens(row_key, row, encoding))
+
+        return rows, rows_tokens_counts, is_sampled
+
+    def get_limit_exceeded_message(self, tracks_used_count: int, tracks_count: int) -> str:
+        """Gets the limit exceeded message of a prompt with only the given number of the playlist tracks."""
+        return self.limit_exceeded_template.format(
+            tracks_used=tracks_used_count,
+            tracks_count=tracks_count,
+            tracks_ratio=f"{tracks_used_count / tracks_count:.1%}" if tracks_count else "0%",
+            tracks_selection=TRACKS_SELECTIONS[self.tracks_selection],
+        )
+
+    def count_limit_exceeded_message_tokens(self, tracks_count: int, encoding: Encoding) -> int:
+        """Counts the most tokens the limit exceeded message may take, for a playlist with the given tracks count."""
+        return len(encoding.encode_ordinary(self.get_limit_exceeded_message(tracks_count, tracks_count)))
+
+    def get_static_tokens_count(self, encoding: Encoding) -> int:
+        """Gets the number of tokens of the prompt without its data, counted once for each encoding."""
+        tokens_count = self.static_tokens_counts.get(encoding.name)
+
+        if tokens_count is None:
+            tokens_count = len(encoding.encode_ordinary(self.prompt_template.static_text))
+            self.static_tokens_counts[encoding.name] = tokens_count
+
+        return tokens_count
+
+    def count_row_tokens(self, row_key: Optional[Hashable], row: str, encoding: Encoding) -> int:
+        """Counts the tokens of the given track row, encoding it only if not cached yet (by its key)."""
+        tokens_count = self.track_tokens_cache.get(encoding, row_key) if row_key is not None else None
+
+        if tokens_count is None:
+            tokens_count = len(encoding.encode_ordinary(row))
+
+            if row_key is not None:
+                self.track_tokens_cache.set(encoding, row_key, tokens_count)
+
+        return tokens_count
 
 
 class LLMClient:
@@ -64,66 +391,283 @@ class LLMClient:
 
     def __init__(self):
         """Creates the LLM Client object."""
-        pass
+        self.counters = Counters("tracks_fetched", "tracks_used", "parse_failures", "repairs", "retries")
+        self.track_tokens_cache = TrackTokensCache()
 
     def init_app(self, app):
         """Initializes the LLM Client with the given app."""
         self.model = app.config["LLM_MODEL"]
         self.max_prompt_tokens = app.config["LLM_MAX_PROMPT_TOKENS"]
         self.max_retry_attempts = app.config["LLM_MAX_RETRY_ATTEMPTS"]
+        self.tracks_format = app.config["LLM_TRACKS_FORMAT"]
+        self.tracks_selection = app.config["LLM_TRACKS_SELECTION"]
+
+        self.retry_backoff = app.config["LLM_RETRY_BACKOFF"]
+
+        self.json_mode = app.config["LLM_JSON_MODE"]
 
-        self.llm = ChatOpenAI(model=self.model)
-        self.encoding = tiktoken.encoding_for_model(self.model)
+        # The BPE file of the encoding is read from the tokenizer cache directory, unless tiktoken's one is already set.
+        if app.config["LLM_TOKENIZER_CACHE_DIR"]:
+            os.environ.setdefault("TIKTOKEN_CACHE_DIR", app.config["LLM_TOKENIZER_CACHE_DIR"])
+
+        # The LLM and the encoding are created again, on first use, with the new configuration.
+        self.__dict__.pop("llm", None)
+        self.__dict__.pop("encoding", None)
 
         self.rate_prompt_manager = RantPromptManager(
             parser_model=Review,
             prompt_template=prompts.rate_prompt_template,
             max_prompt_tokens=self.max_prompt_tokens,
+            counters=self.counters,
+            track_tokens_cache=self.track_tokens_cache,
+            tracks_format=self.tracks_format,
+            tracks_selection=self.tracks_selection,
         )
 
         self.roast_prompt_manager = RantPromptManager(
             parser_model=Review,
             prompt_template=prompts.roast_prompt_template,
             max_prompt_tokens=self.max_prompt_tokens,
+            counters=self.counters,
+            track_tokens_cache=self.track_tokens_cache,
+            tracks_format=self.tracks_format,
+            tracks_selection=self.tracks_selection,
         )
 
         self.rhyme_prompt_manager = RantPromptManager(
             parser_model=Rhyme,
             prompt_template=prompts.rhyme_prompt_template,
             max_prompt_tokens=self.max_prompt_tokens,
+            counters=self.counters,
+            track_tokens_cache=self.track_tokens_cache,
+            tracks_format=self.tracks_format,
+            tracks_selection=self.tracks_selection,
         )
 
-    def rate(self, playlist: SpotifyPlaylist) -> Review:
+    @cached_property
+    def llm(self):
+        """Gets the LLM, created on first use."""
+        from langchain_openai import ChatOpenAI
+
+        # The format instructions of the prompts ask for a JSON object, as JSON mode requires.
+        model_kwargs = {"response_format": {"type": "json_object"}} if self.json_mode else {}
+
+        return ChatOpenAI(model=self.model, model_kwargs=model_kwargs)
+
+    @cached_property
+    def encoding(self) -> Encoding:
+        """
+        Gets the encoding of the LLM model, loaded on first use.
+
+        Its BPE file is read from the tokenizer cache directory, when configured, so it's only downloaded if missing.
+        """
+        return tiktoken.encoding_for_model(self.model)
+
+    def warm_up(self):
+        """
+        Imports and creates everything the rants need ahead of the first one: the LLM, the encoding, and the parsers and
+        templates of the prompts. When done before gunicorn forks the workers (`preload_app`), they are all shared.
+        """
+        self.llm
+
+        for rant_type in RantType:
+            self.get_prompt_manager(rant_type).warm_up(self.encoding)
+
+    def stats(self) -> dict:
+        """
+        Gets the number of tracks fetched for the prompts and of those actually used in them, and the number of
+        responses that failed to be parsed, that were repaired locally and that were retried.
+        """
+        counters = self.counters.as_dict()
+        tracks_fetched = counters["tracks_fetched"]
+
+        return {**counters, "tracks_used_ratio": counters["tracks_used"] / tracks_fetched if tracks_fetched else 0.0}
+
+    def get_prompt_manager(self, rant_type: RantType) -> RantPromptManager:
+        """Gets the Rant Prompt Manager of the given rant type."""
+        match rant_type:
+            case RantType.RATE:
+                return self.rate_prompt_manager
+            case RantType.ROAST:
+                return self.roast_prompt_manager
+            case RantType.RHYME:
+                return self.rhyme_prompt_manager
+            case _:
+                raise ValueError("Invalid rant type")
+
+    def get_rant_version(self, rant_type: RantType) -> str:
+        """Gets the version of the rants of the given type: the LLM model and the version of the rant prompt."""
+        return f"{self.model}:{self.get_prompt_manager(rant_type).version}"
+
+    def rate(self, playlist: SpotifyPlaylist, tracks_pages=None, timer: Optional[StageTimer] = None) -> Review:
         """Rates the given playlist."""
-        return self.rant(playlist, self.rate_prompt_manager)
+        return self.rant(playlist, self.rate_prompt_manager, tracks_pages, timer)
 
-    def roast(self, playlist: SpotifyPlaylist) -> Review:
+    def roast(self, playlist: SpotifyPlaylist, tracks_pages=None, timer: Optional[StageTimer] = None) -> Review:
         """Roasts the given playlist."""
-        return self.rant(playlist, self.roast_prompt_manager)
+        return self.rant(playlist, self.roast_prompt_manager, tracks_pages, timer)
 
-    def rhyme(self, playlist: SpotifyPlaylist) -> Rhyme:
+    def rhyme(self, playlist: SpotifyPlaylist, tracks_pages=None, timer: Optional[StageTimer] = None) -> Rhyme:
         """Creates a rhyme for the given playlist."""
-        return self.rant(playlist, self.rhyme_prompt_manager)
+        return self.rant(playlist, self.rhyme_prompt_manager, tracks_pages, timer)
+
+    def rant(
+        self,
+        playlist: SpotifyPlaylist,
+        prompt_manager: RantPromptManager,
+        tracks_pages=None,
+        timer: Optional[StageTimer] = None,
+    ) -> Union[Review | Rhyme]:
+        """Rants the given playlist, optionally streaming its tracks pages into the prompt."""
+        timer = timer or StageTimer()
+
+        prompt = prompt_manager.generate_prompt(playlist, self.encoding, tracks_pages, timer)
+
+        with timer.measure("llm"):
+            return self.get_parsed_response(prompt, prompt_manager.parser)
+
+    def stream_rant(
+        self,
+        playlist: SpotifyPlaylist,
+        prompt_manager: RantPromptManager,
+        tracks_pages=None,
+        timer: Optional[StageTimer] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Rants the given playlist, streaming the LLM response as events.
+
+        Yields a ("prompt", None) event once the prompt is generated, then a ("partial", data) event with the fields of
+        the response parsed so far each time they change, and finally a ("rant", rant) event with the parsed rant. If
+        the streamed response can't be parsed, it's repaired as the other responses (see `get_repaired_response`).
+        """
+        from langchain_core.utils.json import parse_json_markdown
+
+        timer = timer or StageTimer()
 
-    def rant(self, playlist: SpotifyPlaylist, prompt_manager: RantPromptManager) -> Union[Review | Rhyme]:
-        """Rants the given playlist."""
-        prompt = prompt_manager.generate_prompt(playlist, self.encoding)
+        prompt = prompt_manager.generate_prompt(playlist, self.encoding, tracks_pages, timer)
+        yield "prompt", None
 
-        return self.get_parsed_response(prompt, prompt_manager.parser)
+        content = ""
+        partial_data = None
 
-    def get_parsed_response(self, prompt: str, parser: PydanticOutputParser) -> Union[Review | Rhyme]:
-        """Gets the parsed response."""
-        parsed_response = None
-        retry_attempts = 0
+        for chunk in timer.iter("llm", self.llm.stream(prompt)):
+            content += chunk.content
+
+            try:
+                data = parse_json_markdown(content)
+            except ValueError:
+                continue
+
+            if isinstance(data, dict) and data and data != partial_data:
+                partial_data = data
+                yield "partial", data
+
+        rant, _ = parse_result = self.parse_response(content, prompt_manager.parser)
+
+        if rant is None:
+            with timer.measure("llm"):
+                rant = self.get_repaired_response(content, prompt_manager.parser, parse_result)
+
+        yield "rant", rant
+
+    def get_parsed_response(self, prompt: str, parser: "PydanticOutputParser") -> Union[Review | Rhyme]:
+        """Gets the parsed response of the given prompt, repairing it if needed (see `get_repaired_response`)."""
+        response = self.llm.invoke(prompt)
+
+        return self.get_repaired_response(response.content, parser)
+
+    def get_repaired_response(
+        self,
+        content: str,
+        parser: "PydanticOutputParser",
+        parse_result: Optional[Tuple[Optional[Union[Review | Rhyme]], Optional[str]]] = None,
+    ) -> Union[Review | Rhyme]:
+        """
+        Gets the parsed response of the given content, repairing it if it can't be parsed.
+
+        The content is first repaired locally (see `repair_response`), unless it was already parsed, with the given
+        result (see `parse_response`). If it still can't be parsed, the LLM is asked to fix it, given only the bad
+        response and its error (not the whole prompt again), after an exponential backoff, until the maximum number of
+        attempts (counting the first response) is reached.
+        """
+        parsed_response, error = parse_result if parse_result is not None else self.parse_response(content, parser)
+        attempts = 1
 
         while parsed_response is None:
-            if retry_attempts >= self.max_retry_attempts:
+            if attempts >= self.max_retry_attempts:
                 raise OutputParserException("Failed to get a valid response from the LLM API.")
 
-            try:
-                response = self.llm.invoke(prompt)
-                parsed_response = parser.parse(response.content)
-            except OutputParserException:
-                retry_attempts += 1
+            time.sleep(self.get_retry_backoff(attempts))
+            self.counters.increment("retries")
+
+            response = self.llm.invoke(self.get_repair_prompt(content, error, parser))
+            content = response.content
+
+            parsed_response, error = self.parse_response(content, parser)
+            attempts += 1
 
         return parsed_response
+
+    def parse_response(
+        self, content: str, parser: "PydanticOutputParser"
+    ) -> Tuple[Optional[Union[Review | Rhyme]], Optional[str]]:
+        """Parses the given response content, repairing it locally if needed, or gets the error of the parser."""
+        try:
+            return parser.parse(content), None
+        except OutputParserException as exception:
+            self.counters.increment("parse_failures")
+            error = str(exception)
+
+        parsed_response = repair_response(content, parser.pydantic_object)
+
+        if parsed_response is None:
+            return None, error
+
+        self.counters.increment("repairs")
+
+        return parsed_response, None
+
+    def get_retry_backoff(self, attempts: int) -> float:
+        """Gets the seconds to wait before retrying, after the given number of attempts."""
+        return self.retry_backoff * 2 ** (attempts - 1)
+
+    @staticmethod
+    def get_repair_prompt(content: str, error: str, parser: "PydanticOutputParser") -> str:
+        """Gets the prompt asking the LLM to fix the given response, that failed with the given error."""
+        return REPAIR_PROMPT_TEMPLATE.format(
+            error=error, format_instructions=parser.get_format_instructions(), response=content
+        )
+
+
+def repair_response(content: str, parser_model: Type[BaseModel]) -> Optional[BaseModel]:
+    """
+    Repairs the common issues of a JSON response of the LLM, and parses it as the given model, or `None` if it can't.
+
+    The JSON object is taken out of any code fence or text around it, the trailing commas of its objects and arrays
+    are removed (leaving the commas of its strings), and control characters (e.g. new lines) are allowed in its
+    strings. A rating given as a string (e.g. "7" or "7/10") is taken as its first number.
+    """
+    start, end = content.find("{"), content.rfind("}") + 1
+
+    if start < 0 or end <= start:
+        return None
+
+    text = TRAILING_COMMA_OR_STRING.sub(lambda match: match.group(1) or match.group(2), content[start:end])
+
+    try:
+        data = json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+    if not isinstance(data, dict):
+        return None
+
+    rating = data.get("rating")
+
+    if isinstance(rating, str) and (match := re.search(r"-?\d+", rating)):
+        data["rating"] = int(match.group())
+
+    try:
+        return parser_model.model_validate(data)
+    except ValidationError:
+        return None
@@ -0,0 +1,78 @@
+import time
+
+from typing import Optional
+
+from app.models.llm import Review, Rhyme, RantType
+from app.helpers.metrics import Counters
+
+
+class RantCache:
+    """
+    Cache of the generated Rants, keyed by the playlist snapshot, the rant type and the version of the rant prompt.
+
+    An entry expires once it's older than the timeout. Each hit renews the entry in the backend, whose pruning drops
+    the entries closest to expiring first, so the least recently used entries are the ones evicted.
+    """
+
+    def __init__(self):
+        """Creates the Rant Cache object."""
+        self.counters = Counters("hits", "misses", "bypasses", "saved_generation_ms")
+
+    def init_app(self, app):
+        """Initializes the Rant Cache with the given app."""
+        self.cache = app.config["RANT_CACHE"]
+        self.timeout = app.config["RANT_CACHE_TIMEOUT"]
+
+    @staticmethod
+    def get_key(playlist_id: str, snapshot_id: str, rant_type: RantType, rant_version: str) -> str:
+        """Gets the cache key of the given rant of a playlist snapshot."""
+        return f"rant:{playlist_id}:{snapshot_id}:{rant_type.name}:{rant_version}"
+
+    def get_rant(
+        self,
+        playlist_id: str,
+        snapshot_id: Optional[str],
+        rant_type: RantType,
+        rant_version: str,
+        bypass: bool = False,
+    ) -> Optional[Review | Rhyme]:
+        """Gets the cached rant of the given playlist snapshot, if any and not bypassed (to regenerate it)."""
+        if bypass:
+            self.counters.increment("bypasses")
+            return None
+
+        key = self.get_key(playlist_id, snapshot_id, rant_type, rant_version)
+        entry = self.cache.get(key) if snapshot_id else None
+
+        if entry is None or time.time() - entry["created_at"] >= self.timeout:
+            self.counters.increment("misses")
+            return None
+
+        self.cache.set(key, entry, timeout=self.timeout)
+
+        self.counters.increment("hits")
+        self.counters.increment("saved_generation_ms", entry["generation_ms"])
+
+        return entry["rant"]
+
+    def set_rant(
+        self,
+        playlist_id: str,
+        snapshot_id: Optional[str],
+        rant_type: RantType,
+        rant_version: str,
+        rant: Review | Rhyme,
+        generation_ms: int,
+    ) -> bool:
+        """Caches the rant of the given playlist snapshot, with the time it took to generate it."""
+        if not snapshot_id:
+            return False
+
+        key = self.get_key(playlist_id, snapshot_id, rant_type, rant_version)
+        entry = {"rant": rant, "created_at": time.time(), "generation_ms": generation_ms}
+
+        return self.cache.set(key, entry, timeout=self.timeout)
+
+    def stats(self) -> dict:
+        """Gets the hit and miss statistics of the cache, and the generation time its hits saved."""
+        return {**self.counters.as_dict(), "hit_ratio": self.counters.ratio("hits", "misses")}
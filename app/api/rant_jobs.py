@@ -0,0 +1,482 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.models.llm import RantType
+from app.helpers.metrics import Counters
+
+# The statuses of a job that hasn't finished yet (also in the `SQLiteRantJobStore.get_unfinished` statement).
+UNFINISHED_STATUSES = ("queued", "running")
+
+
+class RantJobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth."""
+
+
+class MemoryRantJobStore:
+    """Store of the Rant Jobs in the memory of the process, lost when it restarts."""
+
+    def __init__(self):
+        """Creates the Memory Rant Job Store object."""
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def add(self, job: dict):
+        """Adds the given job."""
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Gets the job with the given id, if any."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields):
+        """Updates the given fields of the job with the given id."""
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def claim(self, job_id: str, worker: str, previous_worker: str) -> bool:
+        """Assigns the job with the given id to the given worker, if it's still assigned to the previous one."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["worker"] != previous_worker:
+                return False
+
+            job["worker"] = worker
+            return True
+
+    def get_unfinished(self) -> List[dict]:
+        """Gets the jobs that are still queued or running."""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job["status"] in UNFINISHED_STATUSES]
+
+    def delete_expired(self, now: float):
+        """Deletes the jobs that expired by the given time."""
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job["expires_at"] <= now]:
+                del self._jobs[job_id]
+
+
+class SQLiteRantJobStore:
+    """
+    Store of the Rant Jobs in a local SQLite database, shared by the workers of the host and kept over their restarts.
+
+    Each thread has its own connection, in autocommit mode, so each statement is a transaction of its own. The
+    database holds the Spotify access tokens of the unfinished jobs, so it's only readable by its owner.
+    """
+
+    COLUMNS = [
+        "id",
+        "status",
+        "rant_type",
+        "playlist_id",
+        "regenerate",
+        "access_token",
+        "owner",
+        "result",
+        "error",
+        "worker",
+        "created_at",
+        "expires_at",
+    ]
+
+    # The statements updating each set of fields a job goes through (see `update`), with the order of their values.
+    UPDATE_STATEMENTS = {
+        frozenset(["status"]): (["status"], "UPDATE rant_jobs SET status = ? WHERE id = ?"),
+        frozenset(["status", "result", "access_token"]): (
+            ["status", "result", "access_token"],
+            "UPDATE rant_jobs SET status = ?, result = ?, access_token = ? WHERE id = ?",
+        ),
+        frozenset(["status", "error", "access_token"]): (
+            ["status", "error", "access_token"],
+            "UPDATE rant_jobs SET status = ?, error = ?, access_token = ? WHERE id = ?",
+        ),
+    }
+
+    # Version of the schema of the database. The jobs are short-lived, so a database of an older version is recreated.
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: str):
+        """Creates the SQLite Rant Job Store object, creating its database at the given path if needed."""
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Created before SQLite opens it, with its journal files then created with the same permissions.
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        os.chmod(path, 0o600)
+
+        connection = self.connect()
+
+        if connection.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            connection.execute("DROP TABLE IF EXISTS rant_jobs")
+            connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS rant_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                rant_type TEXT NOT NULL,
+                playlist_id TEXT NOT NULL,
+                regenerate INTEGER NOT NULL,
+                access_token TEXT,
+                owner TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                worker TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+        connection.execute("CREATE INDEX IF NOT EXISTS rant_jobs_expires_at ON rant_jobs (expires_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS rant_jobs_status ON rant_jobs (status)")
+
+    def connect(self) -> sqlite3.Connection:
+        """Gets the connection of the current thread, connecting it on first use (and again in a forked process)."""
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return self._local.connection
+
+    @staticmethod
+    def to_job(row: sqlite3.Row) -> dict:
+        """Gets the job of the given row."""
+        job = dict(row)
+        job["regenerate"] = bool(job["regenerate"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+
+        return job
+
+    def add(self, job: dict):
+        """Adds the given job."""
+        values = {**job, "result": json.dumps(job["result"]) if job["result"] is not None else None}
+
+        self.connect().execute(
+            """
+            INSERT INTO rant_jobs (
+                id, status, rant_type, playlist_id, regenerate, access_token, owner, result, error, worker, created_at,
+                expires_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [values[column] for column in self.COLUMNS],
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Gets the job with the given id, if any."""
+        row = self.connect().execute("SELECT * FROM rant_jobs WHERE id = ?", (job_id,)).fetchone()
+
+        return self.to_job(row) if row is not None else None
+
+    def update(self, job_id: str, **fields):
+        """
+        Updates the given fields of the job with the given id. Raises a `ValueError` if they aren't one of the sets of
+        fields of the `UPDATE_STATEMENTS`.
+        """
+        if frozenset(fields) not in self.UPDATE_STATEMENTS:
+            raise ValueError(f"Unknown rant job fields {sorted(fields)}")
+
+        columns, statement = self.UPDATE_STATEMENTS[frozenset(fields)]
+
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+
+        self.connect().execute(statement, [*(fields[column] for column in columns), job_id])
+
+    def claim(self, job_id: str, worker: str, previous_worker: str) -> bool:
+        """Assigns the job with the given id to the given worker, if it's still assigned to the previous one."""
+        cursor = self.connect().execute(
+            "UPDATE rant_jobs SET worker = ? WHERE id = ? AND worker = ?", (worker, job_id, previous_worker)
+        )
+
+        return cursor.rowcount == 1
+
+    def get_unfinished(self) -> List[dict]:
+        """Gets the jobs that are still queued or running."""
+        rows = self.connect().execute(
+            "SELECT * FROM rant_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        )
+
+        return [self.to_job(row) for row in rows]
+
+    def delete_expired(self, now: float):
+        """Deletes the jobs that expired by the given time."""
+        self.connect().execute("DELETE FROM rant_jobs WHERE expires_at <= ?", (now,))
+
+
+class RantJobQueue:
+    """
+    Queue of the Rants generated in the background, outside of the requests that submit them.
+
+    Each job is run by a bounded pool of threads of the worker that submitted it, and the number of jobs queued or
+    running in a worker is limited. A job, and its result, expires a while after it's submitted, and the Spotify access
+    token it's run with is dropped once it's finished. With the SQLite store, the jobs survive a restart of their
+    worker: the unfinished jobs of a worker that is gone are resumed by the next worker that starts its pool, or that
+    polls one of them. A worker is identified by its token (see `get_worker_token`), so a new worker that reuses the
+    process id of a gone one doesn't keep its jobs stranded.
+    """
+
+    def __init__(self):
+        """Creates the Rant Job Queue object."""
+        self.counters = Counters("submitted", "rejected", "done", "failed", "resumed")
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._pending_count = 0
+        self._done_events = {}
+
+    def init_app(self, app):
+        """Initializes the Rant Job Queue with the given app."""
+        self.app = app
+        self.max_workers = app.config["RANT_JOBS_MAX_WORKERS"]
+        self.max_queue_depth = app.config["RANT_JOBS_MAX_QUEUE_DEPTH"]
+        self.timeout = app.config["RANT_JOBS_TIMEOUT"]
+        self.max_wait = app.config["RANT_JOBS_MAX_WAIT"]
+
+        database = app.config["RANT_JOBS_DATABASE"]
+        self.store = SQLiteRantJobStore(database) if database else MemoryRantJobStore()
+
+        # The pool is started on the first job, so no thread is started before gunicorn forks the workers.
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+        self._executor = None
+        self._executor_pid = None
+
+    def submit(self, playlist_id: str, rant_type: RantType, regenerate: bool, access_token: str, owner: str) -> dict:
+        """
+        Submits the generation of the rant of the given playlist, with the given Spotify access token, and gets its job,
+        owned by the given owner (only they can get it, see `get`).
+
+        Raises a `RantJobQueueFullError` if the worker already has the maximum number of jobs queued or running.
+        """
+        with self._lock:
+            if self._pending_count >= self.max_queue_depth:
+                self.counters.increment("rejected")
+                raise RantJobQueueFullError("The rant job queue is full")
+
+            self._pending_count += 1
+
+        now = time.time()
+        self.store.delete_expired(now)
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "rant_type": rant_type.name,
+            "playlist_id": playlist_id,
+            "regenerate": regenerate,
+            "access_token": access_token,
+            "owner": owner,
+            "result": None,
+            "error": None,
+            "worker": get_worker_token(),
+            "created_at": now,
+            "expires_at": now + self.timeout,
+        }
+
+        try:
+            self.store.add(job)
+            self.start_job(job["id"])
+        except Exception:
+            with self._lock:
+                self._pending_count -= 1
+
+            raise
+
+        self.counters.increment("submitted")
+
+        return job
+
+    def get(self, job_id: str, owner: str, wait: float = 0) -> Optional[dict]:
+        """
+        Gets the job with the given id, unless it doesn't exist, expired or isn't owned by the given owner.
+
+        An unfinished job is waited for up to the given seconds (at most the maximum wait), so the status can be long
+        polled. A job of another worker is polled from the store instead, and resumed if its worker is gone.
+        """
+        job = self.store.get(job_id)
+        if job is None or job["owner"] != owner:
+            return None
+
+        deadline = time.monotonic() + min(wait, self.max_wait)
+        self.resume_job(job)
+
+        while job is not None and job["status"] in UNFINISHED_STATUSES and time.monotonic() < deadline:
+            done_event = self._done_events.get(job_id)
+
+            if done_event is not None:
+                done_event.wait(deadline - time.monotonic())
+            else:
+                time.sleep(min(0.25, max(deadline - time.monotonic(), 0)))
+
+            job = self.store.get(job_id)
+
+            if job is not None and done_event is None:
+                self.resume_job(job)
+
+        if job is None or job["expires_at"] <= time.time():
+            return None
+
+        return job
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Gets the pool of the current worker, starting it (and resuming the jobs of gone workers) on first use."""
+        with self._lock:
+            if self._executor_pid == os.getpid():
+                return self._executor
+
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rant-job")
+            self._executor_pid = os.getpid()
+
+        self.resume_jobs()
+
+        return self._executor
+
+    def start_job(self, job_id: str):
+        """Starts running the job with the given id on the pool of the current worker."""
+        self._done_events[job_id] = threading.Event()
+        self.get_executor().submit(self.run_job, job_id)
+
+    def resume_jobs(self):
+        """Resumes the unfinished jobs of the workers that are gone, in the current worker."""
+        for job in self.store.get_unfinished():
+            self.resume_job(job)
+
+    def resume_job(self, job: dict) -> bool:
+        """Resumes the given job in this worker, if it is unfinished and its worker is gone, and gets whether it is."""
+        if job["status"] not in UNFINISHED_STATUSES or job["worker"] == get_worker_token():
+            return False
+
+        if is_worker_alive(job["worker"]) or not self.store.claim(job["id"], get_worker_token(), job["worker"]):
+            return False
+
+        with self._lock:
+            self._pending_count += 1
+
+        try:
+            self.store.update(job["id"], status="queued")
+            self.start_job(job["id"])
+        except Exception:
+            with self._lock:
+                self._pending_count -= 1
+
+            raise
+
+        self.counters.increment("resumed")
+
+        return True
+
+    def run_job(self, job_id: str):
+        """Runs the job with the given id, storing its result or its error."""
+        # Imported here, as the rant service depends on the app singletons, this queue included.
+        from langchain_core.exceptions import OutputParserException
+        from app.services.rant import generate_rant
+
+        try:
+            with self.app.app_context():
+                job = self.store.get(job_id)
+                if job is None:
+                    return
+
+                self.store.update(job_id, status="running")
+
+                try:
+                    rant = generate_rant(
+                        job["playlist_id"], RantType[job["rant_type"]], job["regenerate"], job["access_token"]
+                    )
+                    self.store.update(job_id, status="done", result=rant.model_dump(), access_token=None)
+                    self.counters.increment("done")
+                except (ValueError, OutputParserException) as exception:
+                    self.store.update(job_id, status="failed", error=str(exception), access_token=None)
+                    self.counters.increment("failed")
+                except Exception:
+                    self.app.logger.exception("Failed to run the rant job %s", job_id)
+                    error = "An error occurred while generating the rant"
+                    self.store.update(job_id, status="failed", error=error, access_token=None)
+                    self.counters.increment("failed")
+        finally:
+            with self._lock:
+                self._pending_count -= 1
+
+            done_event = self._done_events.pop(job_id, None)
+            if done_event is not None:
+                done_event.set()
+
+    def stats(self) -> dict:
+        """Gets the number of jobs submitted, rejected, done, failed and resumed, and the current queue depth."""
+        with self._lock:
+            queue_depth = self._pending_count
+
+        return {**self.counters.as_dict(), "queue_depth": queue_depth}
+
+
+# The token of the current worker, by its process id, as a forked worker gets its own.
+_worker_tokens = {}
+
+
+def get_worker_token() -> str:
+    """
+    Gets the token of the current worker: its process id and its start time, unique to this start of the process.
+
+    Without the start time of the process (no procfs), a random one is used instead.
+    """
+    pid = os.getpid()
+
+    if pid not in _worker_tokens:
+        _worker_tokens[pid] = get_process_token(pid) or f"{pid}:{uuid.uuid4().hex}"
+
+    return _worker_tokens[pid]
+
+
+def get_process_token(pid: int) -> Optional[str]:
+    """Gets the token of the process with the given id, from its start time in procfs, if it's running."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return None
+
+    # The start time is the 22nd field, the 20th after the command name (which may have spaces, within parentheses).
+    start_time = stat.rsplit(")", 1)[1].split()[19]
+
+    return f"{pid}:{start_time}"
+
+
+def is_worker_alive(worker: str) -> bool:
+    """Checks whether the worker with the given token is still running, and not a new process with the same id."""
+    pid = int(worker.split(":", 1)[0])
+
+    if not is_process_alive(pid):
+        return False
+
+    process_token = get_process_token(pid)
+
+    return process_token is None or process_token == worker
+
+
+def is_process_alive(pid: int) -> bool:
+    """Checks whether the process with the given id is still running, on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
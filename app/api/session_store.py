@@ -0,0 +1,25 @@
+from cachelib import BaseCache, FileSystemCache, SimpleCache
+
+from app.api.sqlite_cache import SQLiteCache
+
+
+# The stores of the sessions, as the cachelib backends of Flask-Session.
+SESSION_STORES = ["memory", "sqlite", "filesystem"]
+
+
+def create_session_store(config) -> BaseCache:
+    """
+    Creates the store of the sessions configured in the given app configuration.
+
+    The "memory" store is the fastest, but is only seen by its process. The "sqlite" store is shared by the workers of
+    the host, and sweeps its expired sessions. The "filesystem" store keeps each session in a file of a directory.
+    """
+    match config["SESSION_STORE"]:
+        case "memory":
+            return SimpleCache(threshold=config["SESSION_STORE_THRESHOLD"])
+        case "sqlite":
+            return SQLiteCache(config["SESSION_STORE_PATH"], sweep_interval=config["SESSION_STORE_SWEEP_INTERVAL"])
+        case "filesystem":
+            return FileSystemCache(cache_dir=config["SESSION_STORE_DIR"], threshold=config["SESSION_STORE_THRESHOLD"])
+        case store:
+            raise ValueError(f"Unknown session store '{store}', expected one of {SESSION_STORES}")
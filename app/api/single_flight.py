@@ -0,0 +1,198 @@
+import os
+import time
+import uuid
+import threading
+
+from typing import Any, Callable, Generator, Optional, Tuple
+
+from app.api.sqlite_cache import SQLiteCache
+from app.helpers.metrics import Counters
+
+
+class Flight:
+    """A computation in flight, whose result (or exception) is shared by all the calls that wait on it."""
+
+    def __init__(self):
+        """Creates the Flight object."""
+        self.done_event = threading.Event()
+        self.result = None
+        self.exception = None
+        self.is_abandoned = False
+
+    def get_result(self) -> Any:
+        """Gets the result of the finished computation, raising its exception if it failed."""
+        if self.exception is not None:
+            raise self.exception
+
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces the concurrent calls with the same key into a single computation, whose result they all share.
+
+    Within a worker, the first call of a key computes it, and the calls made while it's in flight wait for its result.
+    Across workers, the computing call also holds a lock in the shared lock store, when configured: the calls of other
+    workers wait for the lock to be released, then get the result from where the computation stored it (e.g. a cache)
+    with their `get_shared` function, computing it themselves only if it isn't there. A lock expires after its timeout,
+    so a worker that dies while computing doesn't block the others (see `acquire_lock`).
+    """
+
+    def __init__(self):
+        """Creates the Single Flight object."""
+        self.counters = Counters("computed", "coalesced", "shared_coalesced")
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def init_app(self, app):
+        """Initializes the Single Flight with the given app, storing the locks in its SQLite database, if any."""
+        lock_database = app.config["SINGLE_FLIGHT_LOCK_DATABASE"]
+        self.lock_store = SQLiteCache(lock_database) if lock_database else None
+        self.lock_timeout = app.config["SINGLE_FLIGHT_LOCK_TIMEOUT"]
+        self.poll_interval = app.config["SINGLE_FLIGHT_POLL_INTERVAL"]
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """Gets the flight of the given key, and whether the call is its leader (it started it, so it computes it)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def land(self, key: str, flight: Flight):
+        """Ends the given flight of the given key, releasing the calls waiting on it."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        flight.done_event.set()
+
+    def do(self, key: str, compute: Callable[[], Any], get_shared: Optional[Callable[[], Any]] = None) -> Any:
+        """Gets the result of the given computation of the given key, coalesced with the concurrent calls of the key."""
+        flight, is_leader = self.join(key)
+
+        if not is_leader:
+            flight.done_event.wait()
+            self.counters.increment("coalesced")
+            return flight.get_result()
+
+        try:
+            flight.result = self.compute_shared(key, compute, get_shared)
+            return flight.result
+        except BaseException as exception:
+            flight.exception = exception
+            raise
+        finally:
+            self.land(key, flight)
+
+    def compute_shared(self, key: str, compute: Callable[[], Any], get_shared: Optional[Callable[[], Any]]) -> Any:
+        """Computes the given key, unless another worker computes it and its result can be shared."""
+        lock_key = self.get_lock_key(key)
+
+        while (lock_owner := self.acquire_lock(lock_key)) is None:
+            result = self.wait_shared(lock_key, get_shared)
+            if result is not None:
+                return result
+
+        try:
+            self.counters.increment("computed")
+            return compute()
+        finally:
+            self.release_lock(lock_key, lock_owner)
+
+    def stream(
+        self, key: str, compute: Callable[[], Generator[Any, None, Any]], get_shared: Optional[Callable[[], Any]] = None
+    ) -> Generator[Any, None, Any]:
+        """
+        Streams the given computation of the given key, coalesced with the concurrent calls of the key, as `do` does.
+
+        The computation is a generator, whose return value is its result: the leader yields its items as it computes
+        it, while the calls waiting on it yield none, and all of them return the result. If the leader is closed before
+        it's done (e.g. its client disconnected), the calls waiting on it start another flight instead.
+        """
+        while True:
+            flight, is_leader = self.join(key)
+
+            if is_leader:
+                break
+
+            flight.done_event.wait()
+
+            if not flight.is_abandoned:
+                self.counters.increment("coalesced")
+                return flight.get_result()
+
+        try:
+            flight.result = yield from self.compute_shared_stream(key, compute, get_shared)
+            return flight.result
+        except GeneratorExit:
+            flight.is_abandoned = True
+            raise
+        except BaseException as exception:
+            flight.exception = exception
+            raise
+        finally:
+            self.land(key, flight)
+
+    def compute_shared_stream(
+        self, key: str, compute: Callable[[], Generator[Any, None, Any]], get_shared: Optional[Callable[[], Any]]
+    ) -> Generator[Any, None, Any]:
+        """Streams the computation of the given key, unless another worker computes it, as `compute_shared` does."""
+        lock_key = self.get_lock_key(key)
+
+        while (lock_owner := self.acquire_lock(lock_key)) is None:
+            result = self.wait_shared(lock_key, get_shared)
+            if result is not None:
+                return result
+
+        try:
+            self.counters.increment("computed")
+            return (yield from compute())
+        finally:
+            self.release_lock(lock_key, lock_owner)
+
+    def wait_shared(self, lock_key: str, get_shared: Optional[Callable[[], Any]]) -> Any:
+        """Waits for the given lock, held by another worker, to be released (or expire), then gets its shared result."""
+        deadline = time.monotonic() + self.lock_timeout
+
+        while self.lock_store.has(lock_key) and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+
+        result = get_shared() if get_shared else None
+        if result is not None:
+            self.counters.increment("shared_coalesced")
+
+        return result
+
+    @staticmethod
+    def get_lock_key(key: str) -> str:
+        """Gets the key of the lock of the given key in the shared lock store."""
+        return f"single-flight:{key}"
+
+    def acquire_lock(self, lock_key: str) -> Optional[str]:
+        """
+        Acquires the given lock in the shared lock store, if any, unless another worker holds it, and gets its owner.
+
+        The lock is added (or an expired one taken over) in a single statement of the store (see `SQLiteCache.add`), so
+        two workers never both acquire it. Its owner is unique to this acquisition, so it's only released by its holder.
+        """
+        lock_owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+
+        if self.lock_store is None:
+            return lock_owner
+
+        return lock_owner if self.lock_store.add(lock_key, lock_owner, timeout=self.lock_timeout) else None
+
+    def release_lock(self, lock_key: str, lock_owner: str):
+        """
+        Releases the given lock of the shared lock store, if any, unless it's no longer held by the given owner (e.g. it
+        expired while computing, and another worker took it over).
+        """
+        if self.lock_store is not None:
+            self.lock_store.delete_if(lock_key, lock_owner)
+
+    def stats(self) -> dict:
+        """Gets the number of computations, and of the calls coalesced into them within and across the workers."""
+        return self.counters.as_dict()
@@ -1,14 +1,30 @@
+import time
 import spotipy
+import threading
 
-from app.models.spotify import SpotifyUser, SpotifyPlaylist
+from typing import Iterable, Iterator, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+
+from app.models.spotify import SpotifyUser, SpotifyPlaylist, SpotifyTrack
+from app.helpers.metrics import StageTimer
+from app.api.spotify_cache import SpotifyPlaylistCache
+from app.api.spotify_projection import SpotifyProjection
 
 
 class SpotifyClient:
     """Spotify Client that gets parsed Spotify Data from the Spotify API."""
 
-    def __init__(self, access_token):
+    def __init__(
+        self,
+        access_token,
+        playlist_cache: SpotifyPlaylistCache = None,
+        max_concurrent_requests=1,
+        requests_session=True,
+    ):
         """Creates the Spotify Client object."""
-        self.spotify_api_client = SpotifyAPIClient(access_token)
+        self.spotify_api_client = SpotifyAPIClient(access_token, max_concurrent_requests, requests_session)
+        self.playlist_cache = playlist_cache
 
     def get_user_profile(self):
         """Gets the Spotify Current User data."""
@@ -16,73 +32,282 @@ class SpotifyClient:
 
         return SpotifyUser.from_json(user_data)
 
-    def get_playlists(self, user_id=None, only_user_playlists=True, include_tracks=True):
-        """Gets the Spotify Current User's Playlists data."""
+    def get_playlists(
+        self,
+        user_id=None,
+        only_user_playlists=True,
+        include_tracks=True,
+        projection=SpotifyProjection.FULL,
+        timeout=None,
+    ):
+        """
+        Gets the Spotify Current User's Playlists data.
+
+        The user's playlists endpoint has no `fields` filter, so the projection only applies to the tracks.
+        When including the tracks, see `iter_playlists_with_tracks` for the concurrency and the timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
         playlists_data = self.spotify_api_client.get_playlists(user_id, only_user_playlists)
 
         if not include_tracks:
             return [SpotifyPlaylist.from_json(playlist_data) for playlist_data in playlists_data]
 
-        return [
-            SpotifyPlaylist.from_json(playlist_data, self.spotify_api_client.get_playlist_tracks(playlist_data["id"]))
+        playlists = {
+            playlist.id: playlist for playlist in self.iter_playlists_with_tracks(playlists_data, projection, deadline)
+        }
+
+        return [playlists[playlist_data["id"]] for playlist_data in playlists_data if playlist_data["id"] in playlists]
+
+    def iter_playlists(self, user_id=None, only_user_playlists=True, projection=SpotifyProjection.FULL, timeout=None):
+        """Yields the Spotify Current User's Playlists data with their tracks, as soon as each playlist is fetched."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        playlists_data = self.spotify_api_client.get_playlists(user_id, only_user_playlists)
+
+        yield from self.iter_playlists_with_tracks(playlists_data, projection, deadline)
+
+    def iter_playlists_with_tracks(self, playlists_data, projection=SpotifyProjection.FULL, deadline=None):
+        """
+        Yields the given Spotify Playlists data with their tracks, as soon as each playlist is fetched.
+
+        The tracks of the playlists are fetched concurrently, sharing the in-flight requests cap of the API client.
+        If a deadline (from `time.monotonic`) is given, stops once it's reached, yielding only the playlists fetched
+        until then.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.spotify_api_client.max_concurrent_requests)
+        playlists_data_by_future = {
+            executor.submit(self.get_playlist_tracks, playlist_data, projection): playlist_data
             for playlist_data in playlists_data
-        ]
+        }
+
+        try:
+            timeout = max(deadline - time.monotonic(), 0) if deadline is not None else None
+
+            for future in as_completed(playlists_data_by_future, timeout=timeout):
+                playlist = SpotifyPlaylist.from_json(playlists_data_by_future[future])
+                yield playlist.model_copy(update={"tracks": future.result()})
+        except FuturesTimeoutError:
+            return
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-    def get_playlist(self, playlist_id, include_tracks=True):
-        """Gets the Spotify Playlist data."""
-        playlist_data = self.spotify_api_client.get_playlist(playlist_id)
+    def get_playlist(self, playlist_id, include_tracks=True, projection=SpotifyProjection.FULL):
+        """
+        Gets the Spotify Playlist data, with the fields of the given projection.
+
+        When a playlist cache is given, the tracks are only fetched if the playlist snapshot is not cached yet.
+        """
+        playlist_data = self.spotify_api_client.get_playlist(playlist_id, fields=projection.playlist_fields)
+        playlist = SpotifyPlaylist.from_json(playlist_data)
 
         if not include_tracks:
-            return SpotifyPlaylist.from_json(playlist_data)
+            return playlist
+
+        return playlist.model_copy(update={"tracks": self.get_playlist_tracks(playlist_data, projection)})
+
+    def get_playlist_tracks(self, playlist_data, projection=SpotifyProjection.FULL):
+        """
+        Gets the Spotify Playlist Tracks data of the given Spotify Playlist data.
+
+        When a playlist cache is given, the tracks are only fetched if the playlist snapshot is not cached yet.
+        """
+        playlist_id = playlist_data.get("id")
+        snapshot_id = playlist_data.get("snapshot_id")
+
+        tracks_pages = self.iter_playlist_tracks_pages(playlist_id, snapshot_id, projection)
+
+        return [track for tracks in tracks_pages for track in tracks]
+
+    def iter_playlist_tracks_pages(self, playlist_id, snapshot_id=None, projection=SpotifyProjection.FULL, timer=None):
+        """
+        Yields the Spotify Playlist Tracks of the given playlist snapshot, one page at a time, as each page arrives.
+
+        Each page is parsed as soon as it's fetched, so only one page of raw data is held at a time (the albums and
+        artists repeated over the pages are still shared). A cached snapshot is yielded as a single page, and a fully
+        consumed playlist is cached. When a Stage Timer is given, it measures the "fetch" and "parse" stages.
+        """
+        timer = timer or StageTimer()
+
+        if self.playlist_cache:
+            cached_tracks = self.playlist_cache.get_tracks(playlist_id, snapshot_id, projection)
+            if cached_tracks is not None:
+                yield cached_tracks
+                return
+
+        playlist_tracks = [] if self.playlist_cache else None
+        identity_map = {}
+
+        pages = self.spotify_api_client.iter_playlist_tracks_pages(playlist_id, fields=projection.tracks_fields)
+
+        for tracks_data in timer.iter("fetch", pages):
+            with timer.measure("parse"):
+                tracks = SpotifyPlaylist.tracks_from_json(tracks_data, validate=False, identity_map=identity_map)
+
+            if playlist_tracks is not None:
+                playlist_tracks.extend(tracks)
 
-        tracks_data = self.spotify_api_client.get_playlist_tracks(playlist_id)
-        return SpotifyPlaylist.from_json(playlist_data, tracks_data)
+            yield tracks
+
+        if self.playlist_cache:
+            self.playlist_cache.set_tracks(playlist_id, snapshot_id, projection, playlist_tracks)
+
+
+class SharedTracksPages:
+    """
+    Tracks pages read by several prompts at once (e.g. the rants of a playlist), fetched from the given pages only as
+    far as the prompt that reads the most of them.
+
+    Each prompt iterates over its own pass of the pages, so each page is fetched once for all of them, and the pages
+    that no prompt reads (e.g. past their tokens budgets) are never fetched. An error while fetching a page is raised to
+    every prompt that reads up to it.
+    """
+
+    def __init__(self, tracks_pages: Iterable[List[SpotifyTrack]]):
+        """Creates the Shared Tracks Pages object, of the given tracks pages."""
+        self._tracks_pages = iter(tracks_pages)
+        self._pages = []
+        self._is_exhausted = False
+        self._exception = None
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[List[SpotifyTrack]]:
+        """Yields the tracks pages from the first one, fetching the next page once no other pass has."""
+        index = 0
+
+        while True:
+            with self._lock:
+                if index == len(self._pages):
+                    if self._exception is not None:
+                        raise self._exception
+
+                    if self._is_exhausted:
+                        return
+
+                    try:
+                        self._pages.append(next(self._tracks_pages))
+                    except StopIteration:
+                        self._is_exhausted = True
+                        return
+                    except Exception as exception:
+                        self._exception = exception
+                        raise
+
+                page = self._pages[index]
+
+            yield page
+            index += 1
 
 
 class SpotifyAPIClient:
     """Spotify Client that interacts directly with the Spotify API and returns it's raw JSON contents."""
 
-    def __init__(self, access_token):
-        """Creates the Spotify Client object."""
-        self.spotify = spotipy.Spotify(access_token)
+    def __init__(self, access_token, max_concurrent_requests=1, requests_session=True):
+        """
+        Creates the Spotify Client object.
+
+        The access token is sent on each call, so the given Requests Session can be shared by the clients of all users.
+        """
+        self.spotify = spotipy.Spotify(access_token, requests_session=requests_session)
+        self.max_concurrent_requests = max(max_concurrent_requests, 1)
+        self.request_slots = threading.BoundedSemaphore(self.max_concurrent_requests)
+
+    def request(self, spotify_method, *args, **kwargs):
+        """
+        Calls the given Spotify API method, holding one of the request slots while it's in flight.
+
+        The slots are shared by every thread using this client, capping its concurrent requests to
+        `max_concurrent_requests`, even when the fetching of playlists and of their pages is nested.
+        """
+        with self.request_slots:
+            return spotify_method(*args, **kwargs)
 
     def get_user_profile(self):
         """Gets the Spotify Current User data."""
-        return self.spotify.current_user()
+        return self.request(self.spotify.current_user)
 
     def get_playlists(self, user_id=None, only_user_playlists=True):
         """Gets the Spotify Current User's Playlists data."""
         if user_id is None:
             user_id = self.get_user_profile()["id"]
 
-        results = self.spotify.user_playlists(user_id)
-        user_playlists = results["items"]
-
-        while results["next"]:
-            results = self.spotify.next(results)
-            user_playlists.extend(results["items"])
-
-        user_playlists = [playlist for playlist in user_playlists]
+        results = self.request(self.spotify.user_playlists, user_id)
+        pages = self.iter_pages(
+            results,
+            lambda limit, offset: self.request(self.spotify.user_playlists, user_id, limit, offset),
+        )
+        user_playlists = [playlist for page in pages for playlist in page]
 
         if only_user_playlists:
             user_playlists = [playlist for playlist in user_playlists if playlist["owner"]["id"] == user_id]
 
         return user_playlists
 
-    def get_playlist(self, playlist_id):
-        """Gets the Spotify Playlist data."""
-        return self.spotify.playlist(playlist_id)
+    def get_playlist(self, playlist_id, fields=None):
+        """Gets the Spotify Playlist data, optionally filtered by the given fields."""
+        return self.request(self.spotify.playlist, playlist_id, fields=fields)
 
-    def get_playlist_tracks(self, playlist_id):
-        """Gets the Spotify Playlist Tracks data."""
-        results = self.spotify.playlist_tracks(playlist_id)
+    def get_playlist_tracks(self, playlist_id, fields=None):
+        """Gets the Spotify Playlist Tracks data, optionally filtered by the given fields."""
+        return [track for page in self.iter_playlist_tracks_pages(playlist_id, fields) for track in page]
+
+    def iter_playlist_tracks_pages(self, playlist_id, fields=None):
+        """Yields the pages of the Spotify Playlist Tracks data, in order."""
+        results = self.request(self.spotify.playlist_tracks, playlist_id, fields=fields)
         if not results:
-            return []
+            return
+
+        yield from self.iter_pages(
+            results,
+            lambda limit, offset: self.request(
+                self.spotify.playlist_tracks,
+                playlist_id,
+                fields=fields,
+                limit=limit,
+                offset=offset,
+            ),
+        )
+
+    def iter_pages(self, results, get_page):
+        """
+        Yields the items of the given first page of results and of all its next pages, in order.
+
+        Once the first page reports the total number of items, the offsets of the remaining pages are known, so they
+        are fetched concurrently with `get_page(limit, offset)`, up to `max_concurrent_requests` at a time.
+        Otherwise, the next pages are followed one at a time.
+        """
+        yield results["items"]
+
+        if not results["next"]:
+            return
+
+        limit, offset, total = results.get("limit"), results.get("offset"), results.get("total")
+
+        if self.max_concurrent_requests <= 1 or not limit or offset is None or total is None:
+            while results["next"]:
+                results = self.request(self.spotify.next, results)
+                yield results["items"]
+            return
+
+        offsets = iter(range(offset + limit, total, limit))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            # Keeps a bounded window of requested pages, so unconsumed pages don't pile up in memory.
+            pending_pages = deque(
+                executor.submit(get_page, limit, page_offset)
+                for _, page_offset in zip(range(2 * self.max_concurrent_requests), offsets)
+            )
 
-        playlist_tracks = results["items"]
+            try:
+                while pending_pages:
+                    page = pending_pages.popleft().result()
 
-        while results["next"]:
-            results = self.spotify.next(results)
-            playlist_tracks.extend(results["items"])
+                    next_offset = next(offsets, None)
+                    if next_offset is not None:
+                        pending_pages.append(executor.submit(get_page, limit, next_offset))
 
-        return playlist_tracks
+                    if page:
+                        yield page["items"]
+            finally:
+                for pending_page in pending_pages:
+                    pending_page.cancel()
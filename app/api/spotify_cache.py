@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+from app.models.spotify import SpotifyTrack
+from app.helpers.metrics import Counters
+from app.api.spotify_projection import SpotifyProjection
+
+
+class SpotifyPlaylistCache:
+    """
+    Cache of the parsed Spotify Playlist Tracks, keyed by the playlist id, its snapshot id and the fetched projection.
+
+    Spotify changes the snapshot id of a playlist on every modification, so a cached entry is valid as long as the
+    snapshot id returned by a (cheap) playlist metadata request matches the one it was cached with.
+    """
+
+    def __init__(self):
+        """Creates the Spotify Playlist Cache object."""
+        self.counters = Counters("hits", "misses")
+
+    def init_app(self, app):
+        """Initializes the Spotify Playlist Cache with the given app."""
+        self.cache = app.config["SPOTIFY_PLAYLIST_CACHE"]
+        self.timeout = app.config["SPOTIFY_PLAYLIST_CACHE_TIMEOUT"]
+
+    @staticmethod
+    def get_key(playlist_id: str, snapshot_id: str, projection: SpotifyProjection) -> str:
+        """Gets the cache key of the given playlist snapshot."""
+        return f"spotify_playlist_tracks:{playlist_id}:{snapshot_id}:{projection.name}"
+
+    def get_tracks(
+        self,
+        playlist_id: str,
+        snapshot_id: Optional[str],
+        projection: SpotifyProjection,
+    ) -> Optional[List[SpotifyTrack]]:
+        """Gets the cached tracks of the given playlist snapshot, if any."""
+        tracks = self.cache.get(self.get_key(playlist_id, snapshot_id, projection)) if snapshot_id else None
+
+        self.counters.increment("misses" if tracks is None else "hits")
+
+        return tracks
+
+    def set_tracks(
+        self,
+        playlist_id: str,
+        snapshot_id: Optional[str],
+        projection: SpotifyProjection,
+        tracks: List[SpotifyTrack],
+    ) -> bool:
+        """Caches the tracks of the given playlist snapshot."""
+        if not snapshot_id:
+            return False
+
+        return self.cache.set(self.get_key(playlist_id, snapshot_id, projection), tracks, timeout=self.timeout)
+
+    def stats(self) -> dict:
+        """Gets the hit and miss statistics of the cache."""
+        return {**self.counters.as_dict(), "hit_ratio": self.counters.ratio("hits", "misses")}
@@ -13,14 +13,15 @@ class SpotifyOAuthClient(SpotifyOAuth):
         """Initializes the Spotify OAuth Client."""
         pass
 
-    def init_app(self, app):
-        """Initializes the Spotify OAuth Client with the given app."""
+    def init_app(self, app, requests_session=True):
+        """Initializes the Spotify OAuth Client with the given app, and optionally a shared Requests Session."""
         super().__init__(
             client_id=app.config["SPOTIFY_CLIENT_ID"],
             client_secret=app.config["SPOTIFY_CLIENT_SECRET"],
             scope=app.config["SPOTIFY_SCOPE"],
             redirect_uri=app.config["SPOTIFY_REDIRECT_URI"],
             cache_handler=FlaskSessionCacheHandler(session),
+            requests_session=requests_session,
         )
 
     @staticmethod
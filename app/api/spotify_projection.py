@@ -0,0 +1,36 @@
+from enum import Enum
+
+
+class SpotifyProjection(Enum):
+    """
+    Projections of the Spotify API data for each use case, sent as the `fields` filter of the requests.
+
+    Each projection is a pair with the fields of the playlist (without its embedded tracks page) and the fields of the
+    playlist tracks pages. A `None` tracks projection requests the full track objects. The index page has none, as it
+    only lists the user's playlists, whose endpoint has no `fields` filter (see `SpotifyClient.get_playlists`).
+
+    https://developer.spotify.com/documentation/web-api/reference/get-playlist
+    https://developer.spotify.com/documentation/web-api/reference/get-playlists-tracks
+    """
+
+    # Every field of the Spotify models.
+    FULL = (
+        "id,name,owner(id),description,images,public,collaborative,snapshot_id,tracks(total)",
+        None,
+    )
+
+    # The fields used by the prompt (see `get_track_data`), plus the paging fields.
+    PROMPT = (
+        "id,name,owner(id),description,snapshot_id,tracks(total)",
+        "items(track(id,name,artists(id,name),album(id,name,release_date))),limit,offset,total,next",
+    )
+
+    @property
+    def playlist_fields(self):
+        """Gets the `fields` filter of the playlist requests."""
+        return self.value[0]
+
+    @property
+    def tracks_fields(self):
+        """Gets the `fields` filter of the playlist tracks requests."""
+        return self.value[1]
@@ -0,0 +1,69 @@
+import spotipy
+import requests
+import urllib3
+
+
+class PooledSession(requests.Session):
+    """Requests Session shared by all the Spotify clients of the process, so its connections are kept alive."""
+
+    def close(self):
+        """
+        Keeps the pooled connections open.
+
+        Spotipy closes the session of a client when it's garbage collected, which would drop the shared connections
+        at the end of every request.
+        """
+
+    def shutdown(self):
+        """Closes the pooled connections."""
+        super().close()
+
+
+class SpotifySessionPool:
+    """
+    Process-wide pool of keep-alive HTTP connections to the Spotify API and Accounts services.
+
+    The session holds no credentials: Spotipy sends the access token (or the client credentials) on each call, so the
+    same connections can be reused by the clients of every user.
+    """
+
+    def __init__(self):
+        """Creates the Spotify Session Pool object."""
+        pass
+
+    def init_app(self, app):
+        """Initializes the Spotify Session Pool with the given app."""
+        self.pool_size = app.config["SPOTIFY_HTTP_POOL_SIZE"]
+
+        # Same retry policy as the sessions built by Spotipy.
+        retry = urllib3.Retry(
+            total=spotipy.Spotify.max_retries,
+            connect=None,
+            read=False,
+            allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+            status=spotipy.Spotify.max_retries,
+            backoff_factor=0.3,
+            status_forcelist=spotipy.Spotify.default_retry_codes,
+        )
+
+        self.adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retry)
+
+        self.session = PooledSession()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def stats(self) -> dict:
+        """Gets the size and the connection reuse statistics of the pool."""
+        pool_manager = self.adapter.poolmanager
+        connection_pools = [pool_manager.pools[key] for key in pool_manager.pools.keys()]
+
+        requests_count = sum(connection_pool.num_requests for connection_pool in connection_pools)
+        connections_count = sum(connection_pool.num_connections for connection_pool in connection_pools)
+
+        return {
+            "pool_size": self.pool_size,
+            "hosts": len(connection_pools),
+            "requests": requests_count,
+            "connections": connections_count,
+            "reused_connections": max(requests_count - connections_count, 0),
+        }
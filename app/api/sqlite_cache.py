@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from typing import Any, Optional
+from cachelib.base import BaseCache
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cachelib backend stored in a local SQLite database, shared by the workers of the host.
+
+    Each entry is a row, found through the primary key index, so a lookup doesn't slow down as the cache grows, and the
+    database is memory-mapped, so the pages read often are shared by the workers through the page cache. The expired
+    entries are swept in batches through the index of their expiration time, at most once per sweep interval.
+
+    The values must be JSON serializable (as the sessions and the locks are): they are stored as JSON, so reading the
+    database never runs any code. The database is only readable by its owner, as it holds the sessions.
+    """
+
+    # Version of the schema of the database. The entries are a cache, so a database of an older version is recreated.
+    SCHEMA_VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        default_timeout: int = 300,
+        sweep_interval: float = 60,
+        sweep_batch_size: int = 1000,
+        mmap_size: int = 256 * 1024 * 1024,
+    ):
+        """
+        Creates the SQLite Cache object, creating its database at the given path if needed.
+
+        A timeout of zero never expires, and the given memory-mapped size is the maximum size of the database mapped.
+        """
+        super().__init__(default_timeout)
+
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._last_sweep_time = time.monotonic()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Created before SQLite opens it, with its journal files then created with the same permissions.
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        os.chmod(path, 0o600)
+
+        connection = self.connect()
+
+        if connection.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            connection.execute("DROP TABLE IF EXISTS cache")
+            connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+        connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def connect(self) -> sqlite3.Connection:
+        """Gets the connection of the current thread, connecting it on first use (and again in a forked process)."""
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return self._local.connection
+
+    def get_expires_at(self, timeout: Optional[int]) -> Optional[float]:
+        """Gets the expiration time of an entry set now with the given timeout (none if it never expires)."""
+        timeout = self._normalize_timeout(timeout)
+
+        return time.time() + timeout if timeout > 0 else None
+
+    def get(self, key: str) -> Any:
+        """Gets the value of the given key, unless it's missing or expired."""
+        row = (
+            self.connect()
+            .execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+            )
+            .fetchone()
+        )
+
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        """Sets the value of the given key."""
+        self.connect().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), self.get_expires_at(timeout)),
+        )
+        self.sweep()
+
+        return True
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        """Sets the value of the given key, atomically, only if it's missing or expired."""
+        cursor = self.connect().execute(
+            """
+            INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE cache.expires_at IS NOT NULL AND cache.expires_at <= ?
+            """,
+            (key, json.dumps(value), self.get_expires_at(timeout), time.time()),
+        )
+        self.sweep()
+
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> bool:
+        """Deletes the given key."""
+        cursor = self.connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+        return cursor.rowcount == 1
+
+    def delete_if(self, key: str, value: Any) -> bool:
+        """Deletes the given key, atomically, only if it has the given value (e.g. the owner of a lock)."""
+        cursor = self.connect().execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, json.dumps(value)))
+
+        return cursor.rowcount == 1
+
+    def has(self, key: str) -> bool:
+        """Checks whether the given key is set and not expired."""
+        row = (
+            self.connect()
+            .execute("SELECT 1 FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time()))
+            .fetchone()
+        )
+
+        return row is not None
+
+    def clear(self) -> bool:
+        """Deletes all the keys."""
+        self.connect().execute("DELETE FROM cache")
+
+        return True
+
+    def sweep(self, force: bool = False) -> int:
+        """
+        Deletes a batch of the expired entries, unless they were all swept less than a sweep interval ago, and gets
+        their number. The batch is bounded so a sweep doesn't stall the request that triggers it, and the next sweep
+        comes right after a full batch.
+        """
+        if not force and time.monotonic() - self._last_sweep_time < self.sweep_interval:
+            return 0
+
+        cursor = self.connect().execute(
+            "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE expires_at <= ? LIMIT ?)",
+            (time.time(), self.sweep_batch_size),
+        )
+
+        if cursor.rowcount < self.sweep_batch_size:
+            self._last_sweep_time = time.monotonic()
+
+        return cursor.rowcount
@@ -1,14 +1,77 @@
-from flask import Flask
+import os
+import hashlib
+
+from functools import lru_cache
+from typing import Optional
+from flask import Flask, Response, request
 
 
 def init_app(app: Flask):
     """Initialize cache middleware."""
 
+    @app.url_defaults
+    def add_static_version(endpoint: str, values: dict):
+        """Version the URLs of the static files, so they can be cached until their content changes"""
+        if endpoint == "static" and "filename" in values:
+            version = get_static_version(app.static_folder, values["filename"])
+
+            if version is not None:
+                values.setdefault("v", version)
+
     @app.after_request
-    def after_request(response):
-        """Ensure responses aren't cached"""
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Expires"] = 0
-        response.headers["Pragma"] = "no-cache"
+    def after_request(response: Response):
+        """Apply the cache policy of the route to the response"""
+        cache_control = get_cache_control(app, response)
+        response.headers["Cache-Control"] = cache_control
+
+        if "no-store" in cache_control:
+            response.headers["Expires"] = 0
+            response.headers["Pragma"] = "no-cache"
 
         return response
+
+
+def get_cache_control(app: Flask, response: Response) -> str:
+    """
+    Gets the Cache-Control of the current request, by its endpoint, its blueprints or else the default.
+
+    A static file is only cached for good when found at the URL of its current version, as any other URL of it (e.g.
+    from a stylesheet, or of a previous version) keeps serving its latest content.
+    """
+    if request.endpoint == "static" and not is_current_static_version(app, response):
+        return app.config["CACHE_CONTROL_UNVERSIONED_STATIC"]
+
+    policies = app.config["CACHE_CONTROL_POLICIES"]
+
+    for name in [request.endpoint, *request.blueprints]:
+        if name in policies:
+            return policies[name]
+
+    return app.config["CACHE_CONTROL_DEFAULT"]
+
+
+def is_current_static_version(app: Flask, response: Response) -> bool:
+    """Checks whether the static file of the response was found at the URL of its current version."""
+    filename = (request.view_args or {}).get("filename")
+
+    if response.status_code != 200 or not filename or not request.args.get("v"):
+        return False
+
+    return request.args["v"] == get_static_version(app.static_folder, filename)
+
+
+def get_static_version(static_folder: str, filename: str) -> Optional[str]:
+    """Gets the version of the given static file, from its content, unless it doesn't exist."""
+    try:
+        stat = os.stat(os.path.join(static_folder, filename))
+    except (OSError, ValueError):
+        return None
+
+    return hash_static_file(os.path.join(static_folder, filename), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=256)
+def hash_static_file(path: str, mtime_ns: int, size: int) -> str:
+    """Gets the hash of the content of the given static file, only read again once it's modified."""
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()[:12]
@@ -4,7 +4,7 @@ from functools import wraps
 from spotipy.oauth2 import SpotifyOauthError
 
 from app import spotify_oauth
-from app.helpers.session import get_token_info, set_token_info
+from app.helpers.session import get_auth_context, set_token_info
 
 
 def redirect_if_auth(location: str):
@@ -14,8 +14,7 @@ def redirect_if_auth(location: str):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # If user is authorized
-            session_token_info = get_token_info()
-            if session_token_info and not spotify_oauth.is_token_expired(session_token_info):
+            if get_auth_context().is_authorized():
                 return redirect(location)
             return f(*args, **kwargs)
 
@@ -31,7 +30,7 @@ def auth_required(from_ajax: bool = False):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # If session does not have Token Info, isn't authorized
-            if not get_token_info():
+            if not get_auth_context().token_info:
                 login_url = url_for("auth.login")
                 return redirect(login_url, code=401) if from_ajax else redirect(login_url)
             return f(*args, **kwargs)
@@ -48,14 +47,14 @@ def validate_token(from_ajax: bool = False):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             """Validates the SPOTIFY TOKEN INFO. Refresh token if necessary"""
-            session_token_info = get_token_info()
-            if session_token_info and not spotify_oauth.is_token_expired(session_token_info):
+            auth_context = get_auth_context()
+            if auth_context.is_authorized():
                 return f(*args, **kwargs)
 
             login_url = url_for("auth.login")
 
             try:
-                validated_token_info = spotify_oauth.validate_token(session_token_info)
+                validated_token_info = spotify_oauth.validate_token(auth_context.token_info)
                 if not validated_token_info:
                     return redirect(login_url, code=401) if from_ajax else redirect(login_url)
             except SpotifyOauthError:
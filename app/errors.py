@@ -4,7 +4,7 @@ from requests.exceptions import ReadTimeout
 from spotipy import SpotifyException, SpotifyOauthError
 
 from app.helpers.session import clear_session
-from app.helpers.errors import apology
+from app.helpers.errors import apology, get_spotify_error_message
 
 
 def init_app(app: Flask):
@@ -19,7 +19,7 @@ def init_app(app: Flask):
     def spotify_error(error):
         """Handle Spotify API errors."""
         clear_session()
-        return apology(f"Spotify error: {error.msg}", error.http_status)
+        return apology(get_spotify_error_message(error), error.http_status)
 
     @app.errorhandler(SpotifyOauthError)
     def spotify_oauth_error(error):
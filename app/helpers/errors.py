@@ -1,6 +1,13 @@
 from flask import render_template
 
+from spotipy import SpotifyException
+
 
 def apology(description, code=400):
     """Render message as an apology to user."""
     return render_template("apology.html", code=code, description=description), code
+
+
+def get_spotify_error_message(error: SpotifyException) -> str:
+    """Gets the message shown to the user for the given Spotify API error."""
+    return f"Spotify error: {error.msg}"
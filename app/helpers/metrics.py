@@ -0,0 +1,76 @@
+import time
+import threading
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class Counters:
+    """Thread-safe named counters, used to report hits, misses and other metrics."""
+
+    def __init__(self, *names: str):
+        """Creates the Counters object, with the given counter names starting at zero."""
+        self._lock = threading.Lock()
+        self._counts = Counter({name: 0 for name in names})
+
+    def increment(self, name: str, amount: int = 1):
+        """Increments the given counter by the given amount."""
+        with self._lock:
+            self._counts[name] += amount
+
+    def get(self, name: str) -> int:
+        """Gets the current value of the given counter."""
+        with self._lock:
+            return self._counts[name]
+
+    def ratio(self, name: str, *names: str) -> float:
+        """Gets the ratio of the given counter over the sum of it and the other given counters."""
+        with self._lock:
+            total = self._counts[name] + sum(self._counts[other] for other in names)
+            return self._counts[name] / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        """Gets a snapshot of all the counters."""
+        with self._lock:
+            return dict(self._counts)
+
+
+class StageTimer:
+    """Thread-safe accumulated durations of the named stages of a pipeline, used to report where its time goes."""
+
+    def __init__(self):
+        """Creates the Stage Timer object."""
+        self._lock = threading.Lock()
+        self._durations = defaultdict(float)
+
+    @contextmanager
+    def measure(self, name: str):
+        """Measures the duration of the given stage, adding it to the previous ones."""
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+
+            with self._lock:
+                self._durations[name] += elapsed_time
+
+    def iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Yields the items of the given iterable, measuring the time spent getting each one as the given stage."""
+        iterator = iter(iterable)
+
+        while True:
+            with self.measure(name):
+                item = next(iterator, StopIteration)
+
+            if item is StopIteration:
+                return
+
+            yield item
+
+    def as_dict(self) -> dict:
+        """Gets a snapshot of the durations of all the stages, in milliseconds."""
+        with self._lock:
+            return {name: round(duration * 1000, 3) for name, duration in self._durations.items()}
@@ -0,0 +1,104 @@
+import heapq
+import random
+
+from typing import Hashable, List, Optional, Tuple
+
+from app.models.spotify import SpotifyTrack
+
+
+def get_stratified_order(tracks: List[SpotifyTrack], seed: Hashable) -> List[int]:
+    """
+    Gets the indexes of the given tracks in their sampling order, stratified by release decade, artist and album.
+
+    Every prefix of the order takes from each decade in proportion to its number of tracks, then from each artist of
+    the decade and from each album of the artist in proportion to theirs (see `interleave_proportionally`), so a sample
+    of any size is representative of the playlist. The strata and their tracks are shuffled with the given seed, so the
+    same tracks and seed always give the same order.
+    """
+    indexes = list(range(len(tracks)))
+    # A reproducible order, not a secret one, so a seeded pseudo-random generator is what's needed.
+    random.Random(seed).shuffle(indexes)  # nosec B311
+
+    strata = {}
+
+    for index in indexes:
+        decade, artist, album = get_track_strata(tracks[index])
+        strata.setdefault(decade, {}).setdefault(artist, {}).setdefault(album, []).append(index)
+
+    decades_orders = []
+
+    for decade_artists in strata.values():
+        artists_orders = [
+            interleave_proportionally(list(artist_albums.values())) for artist_albums in decade_artists.values()
+        ]
+        decades_orders.append(interleave_proportionally(artists_orders))
+
+    return interleave_proportionally(decades_orders)
+
+
+def get_track_strata(track: SpotifyTrack) -> Tuple[Optional[int], Optional[Hashable], Optional[Hashable]]:
+    """Gets the release decade, the (first) artist and the album of the given track, or `None` if unknown."""
+    artist = track.artists[0] if track and track.artists else None
+    album = track.album if track else None
+
+    year = get_release_year(album.release_date if album else None)
+
+    return (
+        None if year is None else year // 10 * 10,
+        (artist.id or artist.name) if artist else None,
+        (album.id or album.name) if album else None,
+    )
+
+
+def get_release_year(release_date: Optional[str]) -> Optional[int]:
+    """Gets the year of the given Spotify release date (YYYY, YYYY-MM or YYYY-MM-DD), or `None` if unknown."""
+    year = release_date[:4] if release_date else None
+
+    return int(year) if year and year.isdigit() else None
+
+
+def interleave_proportionally(groups: List[List]) -> List:
+    """
+    Merges the given groups into one order in which every prefix takes from each group in proportion to its size.
+
+    Each prefix takes within one item of the exact share of each group, as a largest remainder allocation of the prefix
+    would, and a longer prefix only adds items to it, so the order can be cut anywhere. It's Tijdeman's algorithm: an
+    item of a group is released once the group's share reaches a fraction of an item over what it took, and the released
+    group whose share is the closest to exceeding what it took by a whole item is picked first (ties go to the first
+    group). It takes O(n log g) time, for n items in g groups.
+    """
+    groups = [group for group in groups if group]
+    if len(groups) <= 1:
+        return list(groups[0]) if groups else []
+
+    total = sum(len(group) for group in groups)
+    # The times are scaled by 2g - 2, so the fraction of an item of the release, 1 / (2g - 2), is a whole number.
+    scale = 2 * len(groups) - 2
+
+    taken_counts = [0] * len(groups)
+    released = [(total / len(group), group_index) for group_index, group in enumerate(groups)]
+    heapq.heapify(released)
+    ready = []
+    order = []
+
+    def is_released(group_index: int, position: int) -> bool:
+        # Checked in integers, as a group released exactly at the position must be.
+        return (scale * taken_counts[group_index] + 1) * total <= position * scale * len(groups[group_index])
+
+    for position in range(1, total + 1):
+        while released and is_released(released[0][1], position):
+            _, group_index = heapq.heappop(released)
+            deadline = (scale * (taken_counts[group_index] + 1) - 1) * total / len(groups[group_index])
+            heapq.heappush(ready, (deadline, group_index))
+
+        _, group_index = heapq.heappop(ready)
+        group = groups[group_index]
+
+        order.append(group[taken_counts[group_index]])
+        taken_counts[group_index] += 1
+
+        if taken_counts[group_index] < len(group):
+            release_time = (scale * taken_counts[group_index] + 1) * total / len(group)
+            heapq.heappush(released, (release_time, group_index))
+
+    return order
@@ -1,19 +1,60 @@
-from flask import session
+import hashlib
 
+from flask import Response, current_app, g, session
+
+from spotipy.oauth2 import SpotifyOAuth
 from spotipy.cache_handler import FlaskSessionCacheHandler
 
 
+class AuthContext:
+    """Authorization of the current request, resolved from the Flask session once and shared by all its checks."""
+
+    def __init__(self, token_info):
+        """Creates the Auth Context object, with the given SPOTIFY TOKEN INFO."""
+        self.token_info = token_info
+        self._is_token_expired = None
+
+    def is_token_expired(self) -> bool:
+        """Checks whether the SPOTIFY TOKEN INFO expired (or is about to), only once per request."""
+        if self._is_token_expired is None:
+            self._is_token_expired = SpotifyOAuth.is_token_expired(self.token_info)
+
+        return self._is_token_expired
+
+    def is_authorized(self) -> bool:
+        """Checks whether the request has a SPOTIFY TOKEN INFO that didn't expire."""
+        return bool(self.token_info) and not self.is_token_expired()
+
+
+def get_auth_context() -> AuthContext:
+    """Gets the Auth Context of the current request, reading the Flask session on first use."""
+    # The proxy of `g` is resolved once, as each access through it costs as much as the session lookup itself.
+    request_globals = g._get_current_object()
+    auth_context = request_globals.get("auth_context")
+
+    if auth_context is None:
+        auth_context = request_globals.auth_context = AuthContext(FlaskSessionCacheHandler(session).get_cached_token())
+
+    return auth_context
+
+
 def get_token_info():
-    """Gets the SPOTIFY TOKEN INFO from the Flask session"""
-    cache_handler = FlaskSessionCacheHandler(session)
-    return cache_handler.get_cached_token()
+    """Gets the SPOTIFY TOKEN INFO from the Auth Context"""
+    return get_auth_context().token_info
 
 
 def set_token_info(token_info):
-    """Sets the given SPOTIFY TOKEN INFO inside the Flask session"""
+    """Sets the given SPOTIFY TOKEN INFO inside the Flask session and the Auth Context"""
     cache_handler = FlaskSessionCacheHandler(session)
     cache_handler.save_token_to_cache(token_info)
 
+    g.auth_context = AuthContext(token_info)
+
+
+def get_session_owner() -> str:
+    """Gets the id of the owner of what the session creates (e.g. rant jobs): a hash, so the session id isn't stored"""
+    return hashlib.sha256(session.sid.encode()).hexdigest()
+
 
 def get_access_token():
     """Gets the access token from the SPOTIFY TOKEN INFO"""
@@ -32,5 +73,14 @@ def set_oauth_state(oauth_state):
 
 
 def clear_session():
-    """Clears the session"""
+    """Clears the session and the Auth Context"""
     session.clear()
+    g.pop("auth_context", None)
+
+
+def clear_streamed_session():
+    """Clears the session from a streamed response, whose headers were sent before the session could be saved"""
+    clear_session()
+
+    # Deletes the session from its store, as the response that would save it is already sent.
+    current_app.session_interface.save_session(current_app, session, Response())
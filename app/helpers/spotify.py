@@ -1,32 +1,307 @@
 import csv
 
-from typing import List
+from typing import Hashable, List, Optional, Tuple
 from io import StringIO
 
 from app.models.spotify import SpotifyPlaylist, SpotifyTrack
 
 
-def playlist_to_csv(playlist: SpotifyPlaylist):
-    """Gets the Playlist data as CSV"""
+TRACKS_CSV_FIELDS = ["Track Name", "Artist Names", "Album Name", "Release Date"]
+
+
+def playlist_to_csv(playlist: SpotifyPlaylist, tracks_count: Optional[int] = None):
+    """Gets the Playlist data as CSV, with the given number of tracks (by default, of the playlist tracks)."""
     fields = ["Playlist Name", "Description", "Number of Tracks"]
-    playlist_data = [[playlist.name, playlist.description, len(playlist.tracks)]]
+    tracks_count = len(playlist.tracks) if tracks_count is None else tracks_count
+    playlist_data = [[playlist.name, playlist.description, tracks_count]]
 
     return get_csv_table(fields, playlist_data)
 
 
-def tracks_to_csv(tracks: List[SpotifyTrack]):
-    """Gets the Tracks data as CSV."""
-    fields = ["Track Name", "Artist Names", "Album Name", "Release Date"]
+def tracks_to_csv(tracks: List[SpotifyTrack], include_header: bool = True):
+    """Gets the Tracks data as CSV, optionally without the header (to append the rows of another page of tracks)."""
     tracks_data = [get_track_data(track) for track in tracks]
 
-    return get_csv_table(fields, tracks_data)
+    return get_csv_table(TRACKS_CSV_FIELDS if include_header else None, tracks_data)
+
+
+def tracks_to_csv_rows(tracks: List[SpotifyTrack]) -> List[str]:
+    """Gets the CSV row of each of the Tracks data, without the header."""
+    return get_csv_rows([get_track_data(track) for track in tracks])
+
+
+class TracksSerializer:
+    """
+    Serializer of the Tracks data of the prompt, as a header followed by a row for each track.
+
+    Each row comes with a key identifying its text, to cache its tokens, or `None` if it can't be cached. Serializers
+    may keep state from one row to the next (e.g. the current group), so a new one is used for each prompt.
+    """
+
+    name = None
+
+    def get_header(self) -> str:
+        """Gets the header of the tracks, describing their format."""
+        raise NotImplementedError
+
+    def get_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        """Gets the key and the row of each of the given tracks, following the previously serialized ones."""
+        raise NotImplementedError
+
+    def get_single_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        """Gets the key and the row of each of the given tracks, as if it was the only one serialized."""
+        return [type(self)().get_rows([track])[0] for track in tracks]
+
+    def get_row_key(self, track: SpotifyTrack, *variant) -> Optional[Hashable]:
+        """Gets the key of the row of the given track, in the given variant of the format."""
+        return (self.name, track.id, *variant) if track and track.id else None
+
+
+class CsvTracksSerializer(TracksSerializer):
+    """The Tracks data as CSV, with the artist names as a list (the original format of the prompt)."""
+
+    name = "csv"
+
+    def get_header(self) -> str:
+        return tracks_to_csv([])
+
+    def get_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        return [(self.get_row_key(track), row) for track, row in zip(tracks, tracks_to_csv_rows(tracks))]
+
+    def get_single_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        return self.get_rows(tracks)
+
+
+class PlainTracksSerializer(TracksSerializer):
+    """The Tracks data as CSV, with the artist names joined by semicolons."""
+
+    name = "plain"
+
+    def get_header(self) -> str:
+        return tracks_to_csv([])
+
+    def get_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        tracks_data = []
+
+        for track in tracks:
+            track_data = get_track_data(track)
+            if track_data and track_data[1]:
+                track_data[1] = "; ".join(artist_name or "" for artist_name in track_data[1])
+
+            tracks_data.append(track_data)
+
+        return [(self.get_row_key(track), row) for track, row in zip(tracks, get_csv_rows(tracks_data))]
+
+    def get_single_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        return self.get_rows(tracks)
+
+
+class GroupedTracksSerializer(TracksSerializer):
+    """The Tracks data as runs of consecutive tracks of the same group, each run under a single group line."""
+
+    def __init__(self):
+        """Creates the Grouped Tracks Serializer object."""
+        self.current_group = None
+
+    def get_group(self, track: SpotifyTrack) -> Optional[Hashable]:
+        """Gets the group of the given track."""
+        raise NotImplementedError
+
+    def get_group_line(self, track: SpotifyTrack) -> str:
+        """Gets the line of the group of the given track."""
+        raise NotImplementedError
+
+    def get_track_line(self, track: SpotifyTrack) -> str:
+        """Gets the line of the given track, without the fields of its group."""
+        raise NotImplementedError
+
+    def get_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        rows = []
+
+        for track in tracks:
+            group = self.get_group(track)
+            starts_group = group is None or group != self.current_group
+            self.current_group = group
+
+            row = self.get_track_line(track)
+            if starts_group:
+                row = self.get_group_line(track) + row
+
+            rows.append((self.get_row_key(track, starts_group), row))
+
+        return rows
+
+
+class AlbumGroupedTracksSerializer(GroupedTracksSerializer):
+    """The Tracks data grouped by album, with the album name and release date written once per run."""
+
+    name = "album_groups"
+
+    def get_header(self) -> str:
+        return "[Album Name | Release Date] lines, each followed by its tracks as Track Name | Artist Names lines\n"
+
+    def get_group(self, track: SpotifyTrack) -> Optional[Hashable]:
+        album = track.album if track else None
+        return (album.id, album.name, album.release_date) if album else None
+
+    def get_group_line(self, track: SpotifyTrack) -> str:
+        album = track.album if track else None
+        album_name, release_date = (album.name, album.release_date) if album else (None, None)
+
+        return f"[{get_plain_text(album_name)} | {get_plain_text(release_date)}]\n"
+
+    def get_track_line(self, track: SpotifyTrack) -> str:
+        track_name = track.name if track else None
+
+        return f"{get_plain_text(track_name)} | {get_artist_names_text(track)}\n"
+
+
+class ArtistGroupedTracksSerializer(GroupedTracksSerializer):
+    """The Tracks data grouped by their (first) artist, with the artist name written once per run."""
+
+    name = "artist_groups"
+
+    def get_header(self) -> str:
+        return "[Artist Name] lines, each followed by its tracks as Track Name | Album Name | Release Date lines\n"
+
+    def get_group(self, track: SpotifyTrack) -> Optional[Hashable]:
+        artist = track.artists[0] if track and track.artists else None
+        return (artist.id, artist.name) if artist else None
+
+    def get_group_line(self, track: SpotifyTrack) -> str:
+        artist = track.artists[0] if track and track.artists else None
+
+        return f"[{get_plain_text(artist.name if artist else None)}]\n"
+
+    def get_track_line(self, track: SpotifyTrack) -> str:
+        track_name, album = (track.name, track.album) if track else (None, None)
+        album_name, release_date = (album.name, album.release_date) if album else (None, None)
+
+        track_line = get_plain_text(track_name)
+
+        # The other artists of the track (features, collaborations), if any.
+        if track and track.artists and len(track.artists) > 1:
+            track_line += f" (with {get_artist_names_text(track, skip=1)})"
+
+        return f"{track_line} | {get_plain_text(album_name)} | {get_plain_text(release_date)}\n"
+
+
+class DictionaryTracksSerializer(TracksSerializer):
+    """
+    The Tracks data with deduplicated string tables of the artists and albums.
+
+    Each artist and album is defined on its first track, as `id=name`, and only referenced by its short id after that.
+    """
+
+    name = "dictionary"
+
+    def __init__(self):
+        """Creates the Dictionary Tracks Serializer object."""
+        self.artist_ids = {}
+        self.album_ids = {}
+
+    def get_header(self) -> str:
+        return (
+            "Track Name | Artist Ids | Album Id lines, where an id is followed by =Artist Name or "
+            "=Album Name (Release Date) the first time it's used\n"
+        )
+
+    def get_rows(self, tracks: List[SpotifyTrack]) -> List[Tuple[Optional[Hashable], str]]:
+        rows = []
+
+        for track in tracks:
+            artists = track.artists if track and track.artists else []
+            album = track.album if track else None
+
+            artist_refs = ";".join(
+                self.get_ref(self.artist_ids, "a", (artist.id, artist.name), get_plain_text(artist.name))
+                for artist in artists
+                if artist
+            )
+            album_ref = (
+                self.get_ref(
+                    self.album_ids,
+                    "b",
+                    (album.id, album.name, album.release_date),
+                    f"{get_plain_text(album.name)} ({get_plain_text(album.release_date)})",
+                )
+                if album
+                else ""
+            )
+
+            row = f"{get_plain_text(track.name if track else None)} | {artist_refs} | {album_ref}\n"
+
+            # The ids depend on the previous tracks, so the row is its own key.
+            rows.append(((self.name, row), row))
+
+        return rows
+
+    @staticmethod
+    def get_ref(ids: dict, prefix: str, value: Hashable, text: str) -> str:
+        """Gets the reference to the given value, defining it with the given text if it's its first use."""
+        if value in ids:
+            return ids[value]
+
+        ids[value] = f"{prefix}{len(ids) + 1}"
+
+        return f"{ids[value]}={text}"
+
+
+TRACKS_SERIALIZERS = {
+    serializer.name: serializer
+    for serializer in [
+        CsvTracksSerializer,
+        PlainTracksSerializer,
+        AlbumGroupedTracksSerializer,
+        ArtistGroupedTracksSerializer,
+        DictionaryTracksSerializer,
+    ]
+}
+
+
+def create_tracks_serializer(tracks_format: str) -> TracksSerializer:
+    """Creates a new Tracks Serializer of the given format."""
+    if tracks_format not in TRACKS_SERIALIZERS:
+        raise ValueError(f"Unknown tracks format '{tracks_format}'")
+
+    return TRACKS_SERIALIZERS[tracks_format]()
+
+
+def get_plain_text(value: Optional[str]) -> str:
+    """Gets the given value as a single line of plain text."""
+    return value.replace("\r", " ").replace("\n", " ") if value else ""
+
+
+def get_artist_names_text(track: SpotifyTrack, skip: int = 0) -> str:
+    """Gets the artist names of the given track joined by semicolons, optionally skipping the first ones."""
+    artists = track.artists[skip:] if track and track.artists else []
+
+    return "; ".join(get_plain_text(artist.name if artist else None) for artist in artists)
+
+
+def get_csv_rows(rows_data) -> List[str]:
+    """Gets each row of a table as a CSV string."""
+    rows = []
+
+    with StringIO() as string_io:
+        writer = csv.writer(string_io)
+
+        for row_data in rows_data:
+            writer.writerow(row_data)
+
+            rows.append(string_io.getvalue())
+            string_io.seek(0)
+            string_io.truncate()
+
+    return rows
 
 
 def get_csv_table(fields, tracks_data):
-    """Gets a table as CSV string."""
+    """Gets a table as CSV string, without the header row if no fields are given."""
     with StringIO() as string_io:
         writer = csv.writer(string_io)
-        writer.writerow(fields)
+        if fields is not None:
+            writer.writerow(fields)
         writer.writerows(tracks_data)
 
         return string_io.getvalue()
@@ -2,8 +2,7 @@ from flask import render_template
 
 from app.main import bp
 from app.decorators.session import auth_required, validate_token
-from app.api.spotify import SpotifyClient
-from app.helpers.session import get_access_token
+from app.services.spotify import create_spotify_client
 
 
 @bp.route("/")
@@ -11,8 +10,7 @@ from app.helpers.session import get_access_token
 @validate_token()
 def index():
     """Index page of the application."""
-    access_token = get_access_token()
-    spotify = SpotifyClient(access_token)
+    spotify = create_spotify_client()
 
     user = spotify.get_user_profile()
     playlists = spotify.get_playlists(
@@ -2,7 +2,35 @@ from pydantic import BaseModel, HttpUrl
 from typing import List, Optional
 
 
-class SpotifyUser(BaseModel):
+class SpotifyModel(BaseModel):
+    """Base model of the Spotify data."""
+
+    @classmethod
+    def construct_trusted(cls, **fields):
+        """
+        Creates the model from trusted data, that came straight from the Spotify API, without validating it.
+
+        This is a leaner `model_construct` (which is slower than the validation itself), as the Spotify models have no
+        aliases, defaults or private attributes to handle: every field must be given.
+        """
+        model = cls.__new__(cls)
+        object.__setattr__(model, "__dict__", fields)
+        object.__setattr__(model, "__pydantic_fields_set__", set(fields))
+        object.__setattr__(model, "__pydantic_extra__", None)
+        object.__setattr__(model, "__pydantic_private__", None)
+
+        return model
+
+    @classmethod
+    def remember(cls, identity_map, model):
+        """Adds the given model to the identity map of a parse, keyed by its Spotify id, and returns it."""
+        if identity_map is not None and model.id is not None:
+            identity_map[(cls, model.id)] = model
+
+        return model
+
+
+class SpotifyUser(SpotifyModel):
     """
     Modelates the Spotify Current User data.
 
@@ -25,7 +53,7 @@ class SpotifyUser(BaseModel):
         return cls(id=id, name=name, image_url=image_url)
 
 
-class SpotifyArtist(BaseModel):
+class SpotifyArtist(SpotifyModel):
     """
     Model of the Spotify Artist data.
 
@@ -38,24 +66,32 @@ class SpotifyArtist(BaseModel):
     image_url: Optional[HttpUrl]
 
     @classmethod
-    def from_json(cls, artist_data):
-        """Creates a SpotifyArtist object from the Spotify Artist data."""
+    def from_json(cls, artist_data, validate=True, identity_map=None):
+        """Creates a SpotifyArtist object from the Spotify Artist data, optionally skipping its validation."""
         id = artist_data.get("id")
+
+        if identity_map is not None and (cls, id) in identity_map:
+            return identity_map[(cls, id)]
+
         name = artist_data.get("name")
         genres = artist_data.get("genres")
 
         artist_images = artist_data.get("images")
         image_url = artist_images[0]["url"] if artist_images else None
 
-        return cls(
+        create = cls if validate else cls.construct_trusted
+
+        artist = create(
             id=id,
             name=name,
             genres=genres,
             image_url=image_url,
         )
 
+        return cls.remember(identity_map, artist)
+
 
-class SpotifyAlbum(BaseModel):
+class SpotifyAlbum(SpotifyModel):
     """
     Model of the Spotify Album data.
 
@@ -74,9 +110,13 @@ class SpotifyAlbum(BaseModel):
     artists: Optional[List[SpotifyArtist]]
 
     @classmethod
-    def from_json(cls, album_data):
-        """Creates a SpotifyAlbum object from the Spotify Album data."""
+    def from_json(cls, album_data, validate=True, identity_map=None):
+        """Creates a SpotifyAlbum object from the Spotify Album data, optionally skipping its validation."""
         id = album_data.get("id")
+
+        if identity_map is not None and (cls, id) in identity_map:
+            return identity_map[(cls, id)]
+
         name = album_data.get("name")
         album_type = album_data.get("album_type")
         release_date = album_data.get("release_date")
@@ -86,9 +126,14 @@ class SpotifyAlbum(BaseModel):
         label = album_data.get("label")
         popularity = album_data.get("popularity")
 
-        artists = [SpotifyArtist.from_json(artist_data) for artist_data in album_data.get("artists", [])]
+        artists = [
+            SpotifyArtist.from_json(artist_data, validate, identity_map)
+            for artist_data in album_data.get("artists") or []
+        ]
 
-        return cls(
+        create = cls if validate else cls.construct_trusted
+
+        album = create(
             id=id,
             name=name,
             album_type=album_type,
@@ -101,8 +146,10 @@ class SpotifyAlbum(BaseModel):
             artists=artists,
         )
 
+        return cls.remember(identity_map, album)
+
 
-class SpotifyTrack(BaseModel):
+class SpotifyTrack(SpotifyModel):
     """
     Model of the Spotify Track data.
 
@@ -120,8 +167,8 @@ class SpotifyTrack(BaseModel):
     is_local: Optional[bool]
 
     @classmethod
-    def from_json(cls, track_data):
-        """Creates a SpotifyTrack object from the Spotify Track data."""
+    def from_json(cls, track_data, validate=True, identity_map=None):
+        """Creates a SpotifyTrack object from the Spotify Track data, optionally skipping its validation."""
         id = track_data.get("id")
         name = track_data.get("name")
         popularity = track_data.get("popularity")
@@ -130,12 +177,17 @@ class SpotifyTrack(BaseModel):
         is_playable = track_data.get("is_playable")
         is_local = track_data.get("is_local")
 
-        artists = [SpotifyArtist.from_json(artist_data) for artist_data in track_data.get("artists", [])]
+        artists = [
+            SpotifyArtist.from_json(artist_data, validate, identity_map)
+            for artist_data in track_data.get("artists") or []
+        ]
 
         album_data = track_data.get("album")
-        album = SpotifyAlbum.from_json(album_data)
+        album = SpotifyAlbum.from_json(album_data, validate, identity_map) if album_data is not None else None
 
-        return cls(
+        create = cls if validate else cls.construct_trusted
+
+        return create(
             id=id,
             name=name,
             popularity=popularity,
@@ -148,7 +200,7 @@ class SpotifyTrack(BaseModel):
         )
 
 
-class SpotifyPlaylist(BaseModel):
+class SpotifyPlaylist(SpotifyModel):
     """
     Model of the Spotify Playlist data.
 
@@ -162,6 +214,8 @@ class SpotifyPlaylist(BaseModel):
     image_url: Optional[HttpUrl]
     public: Optional[bool]
     collaborative: Optional[bool]
+    snapshot_id: Optional[str]
+    total_tracks: Optional[int]
     tracks: Optional[List[SpotifyTrack]]
 
     @classmethod
@@ -169,23 +223,17 @@ class SpotifyPlaylist(BaseModel):
         """Creates a SpotifyPlaylist object from the Spotify Playlist data."""
         id = playlist_data.get("id")
         name = playlist_data.get("name")
-        owner_id = playlist_data.get("owner").get("id")
+        owner_id = (playlist_data.get("owner") or {}).get("id")
         description = playlist_data.get("description")
         public = playlist_data.get("public")
         collaborative = playlist_data.get("collaborative")
+        snapshot_id = playlist_data.get("snapshot_id")
+        total_tracks = (playlist_data.get("tracks") or {}).get("total")
 
         playlist_images = playlist_data.get("images")
         image_url = playlist_images[0]["url"] if playlist_images else None
 
-        tracks = (
-            [
-                SpotifyTrack.from_json(track_data.get("track"))
-                for track_data in playlist_tracks_data
-                if track_data.get("track")
-            ]
-            if playlist_tracks_data
-            else []
-        )
+        tracks = cls.tracks_from_json(playlist_tracks_data)
 
         return cls(
             id=id,
@@ -195,5 +243,30 @@ class SpotifyPlaylist(BaseModel):
             image_url=image_url,
             public=public,
             collaborative=collaborative,
+            snapshot_id=snapshot_id,
+            total_tracks=total_tracks,
             tracks=tracks,
         )
+
+    @staticmethod
+    def tracks_from_json(playlist_tracks_data, validate=True, identity_map=None) -> List[SpotifyTrack]:
+        """
+        Creates the SpotifyTrack objects from the Spotify Playlist Tracks data, skipping the unavailable ones.
+
+        Trusted data, that came straight from the Spotify API, may skip the validation with `validate=False`, which is
+        cheaper for large playlists. The image URLs are then kept as strings.
+
+        The albums and artists repeated over the tracks are created once and shared, through an identity map scoped to
+        this parse (or to the given one, to share them across the pages of a playlist).
+        """
+        if not playlist_tracks_data:
+            return []
+
+        if identity_map is None:
+            identity_map = {}
+
+        return [
+            SpotifyTrack.from_json(track_data.get("track"), validate, identity_map)
+            for track_data in playlist_tracks_data
+            if track_data.get("track")
+        ]
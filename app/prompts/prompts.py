@@ -1,7 +1,52 @@
+import hashlib
+
 from pathlib import Path
+from string import Formatter
+from typing import List, Tuple
+
+
+PROMPTS_DIR = Path(__file__).parent / "templates"
+
+
+class CompiledPromptTemplate:
+    """
+    Prompt template (with f-string placeholders) parsed once into its literal parts and its variables.
+
+    The given partial variables are filled in on compilation, so formatting only joins the literal parts with the
+    values of the remaining variables.
+    """
+
+    def __init__(self, template: str, **partial_variables: str):
+        """Compiles the given template, filling in the given partial variables."""
+        self.parts: List[Tuple[str, str]] = []
+        literal = ""
+
+        for literal_text, field_name, _, _ in Formatter().parse(template):
+            literal += literal_text
+
+            if field_name is None:
+                continue
+
+            if field_name in partial_variables:
+                literal += partial_variables[field_name]
+                continue
+
+            self.parts.append((literal, field_name))
+            literal = ""
+
+        self.suffix = literal
+        self.variables = [field_name for _, field_name in self.parts]
+
+        # The text of the template without its (remaining) variables.
+        self.static_text = "".join(literal for literal, _ in self.parts) + self.suffix
 
+        # Changes whenever the formatted prompts could change.
+        parts_text = "\0".join(f"{literal}\0{field_name}" for literal, field_name in self.parts)
+        self.version = hashlib.sha256(f"{parts_text}\0{self.suffix}".encode()).hexdigest()[:16]
 
-PROMPTS_DIR = Path("./app/prompts/templates")
+    def format(self, **variables) -> str:
+        """Formats the template with the given values of its variables."""
+        return "".join([literal + str(variables[field_name]) for literal, field_name in self.parts]) + self.suffix
 
 
 def load_prompt_template(filename: str) -> str:
@@ -20,3 +65,4 @@ rate_prompt_template = load_prompt_template("rate.md")
 roast_prompt_template = load_prompt_template("roast.md")
 rhyme_prompt_template = load_prompt_template("rhyme.md")
 limit_exceeded_prompt_message = load_prompt_template("limit_exceeded.md")
+repair_prompt_template = load_prompt_template("repair.md")
@@ -2,7 +2,13 @@ from flask import request
 
 from app.rant import bp
 from app.decorators.session import auth_required, validate_token
-from app.services.rant import handle_rant
+from app.services.rant import (
+    handle_rant,
+    handle_rant_job,
+    handle_rant_job_submit,
+    handle_rant_stream,
+    handle_rants_stream,
+)
 from app.models.llm import RantType
 
 
@@ -12,8 +18,9 @@ from app.models.llm import RantType
 def rate():
     """Generates a rate about a playlist."""
     playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
 
-    return handle_rant(playlist_id, RantType.RATE)
+    return handle_rant(playlist_id, RantType.RATE, regenerate)
 
 
 @bp.route("/roast", methods=["POST"])
@@ -22,8 +29,9 @@ def rate():
 def roast():
     """Generates a roast about a playlist."""
     playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
 
-    return handle_rant(playlist_id, RantType.ROAST)
+    return handle_rant(playlist_id, RantType.ROAST, regenerate)
 
 
 @bp.route("/rhyme", methods=["POST"])
@@ -32,5 +40,94 @@ def roast():
 def rhyme():
     """Generates a rhyme about a playlist."""
     playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
 
-    return handle_rant(playlist_id, RantType.RHYME)
+    return handle_rant(playlist_id, RantType.RHYME, regenerate)
+
+
+@bp.route("/rate/stream", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def rate_stream():
+    """Streams the generation of a rate about a playlist."""
+    playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rant_stream(playlist_id, RantType.RATE, regenerate)
+
+
+@bp.route("/roast/stream", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def roast_stream():
+    """Streams the generation of a roast about a playlist."""
+    playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rant_stream(playlist_id, RantType.ROAST, regenerate)
+
+
+@bp.route("/rhyme/stream", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def rhyme_stream():
+    """Streams the generation of a rhyme about a playlist."""
+    playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rant_stream(playlist_id, RantType.RHYME, regenerate)
+
+
+@bp.route("/all/stream", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def all_stream():
+    """Streams the generation of several rants about a playlist, each one as soon as it's done."""
+    playlist_id = request.form.get("playlist")
+    rant_type_names = request.form.getlist("type")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rants_stream(playlist_id, rant_type_names, regenerate)
+
+
+@bp.route("/rate/jobs", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def rate_job():
+    """Submits the generation of a rate about a playlist, as a background job."""
+    playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rant_job_submit(playlist_id, RantType.RATE, regenerate)
+
+
+@bp.route("/roast/jobs", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def roast_job():
+    """Submits the generation of a roast about a playlist, as a background job."""
+    playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rant_job_submit(playlist_id, RantType.ROAST, regenerate)
+
+
+@bp.route("/rhyme/jobs", methods=["POST"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def rhyme_job():
+    """Submits the generation of a rhyme about a playlist, as a background job."""
+    playlist_id = request.form.get("playlist")
+    regenerate = request.form.get("regenerate") == "true"
+
+    return handle_rant_job_submit(playlist_id, RantType.RHYME, regenerate)
+
+
+@bp.route("/jobs/<job_id>", methods=["GET"])
+@auth_required(from_ajax=True)
+@validate_token(from_ajax=True)
+def job(job_id):
+    """Gets the status of a rant job, and its rant once done, waiting up to the given seconds for it to finish."""
+    wait = request.args.get("wait", 0, type=float)
+
+    return handle_rant_job(job_id, wait)
@@ -1,54 +1,474 @@
-from flask import render_template
+import json
+import time
+import hashlib
 
-from langchain.schema.output_parser import OutputParserException
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+from flask import Response, current_app, jsonify, make_response, render_template, request, stream_with_context, url_for
+from werkzeug.http import quote_etag
 
-from app import llm_client
-from app.helpers.session import get_access_token
-from app.helpers.errors import apology
-from app.api.spotify import SpotifyClient
+from langchain_core.exceptions import OutputParserException
+from spotipy import SpotifyException
+
+from app import llm_client, rant_cache, rant_jobs, single_flight
+from app.api.rant_jobs import RantJobQueueFullError
+from app.helpers.errors import apology, get_spotify_error_message
+from app.helpers.session import clear_streamed_session, get_access_token, get_session_owner
+from app.helpers.metrics import StageTimer
+from app.services.spotify import create_spotify_client
+from app.api.spotify import SharedTracksPages
+from app.api.spotify_projection import SpotifyProjection
 from app.models.llm import Review, Rhyme, RantType
+from app.models.spotify import SpotifyPlaylist, SpotifyTrack
+
 
+def handle_rant(playlist_id: str, rant_type: RantType, regenerate: bool = False):
+    """
+    Handles and generates the review of the given playlist.
 
-def handle_rant(playlist_id: str, rant_type: RantType):
-    """Handles and generates the review of the given playlist."""
+    The rant has the ETag of its playlist snapshot (see `get_rant_etag`), so a request whose `If-None-Match` has it
+    is answered before the rant is generated (see `get_not_modified_response`), unless it's regenerated.
+    """
     try:
-        rant = generate_rant(playlist_id, rant_type)
+        playlist = get_rant_playlist(create_spotify_client(), playlist_id)
+        etag = get_rant_etag(playlist.id, playlist.snapshot_id, rant_type)
+
+        if is_rant_not_modified(etag, regenerate):
+            return get_not_modified_response(etag)
+
+        rant = generate_rant(playlist_id, rant_type, regenerate, playlist=playlist)
     except (ValueError, OutputParserException):
         return apology("An error occurred while generating the rant", 500)
 
+    try:
+        response = make_response(render_rant(rant_type, rant))
+    except ValueError:
+        return apology("Invalid rant type", 400)
+
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def handle_rant_stream(playlist_id: str, rant_type: RantType, regenerate: bool = False) -> Response:
+    """
+    Handles and streams the generation of the rant of the given playlist, as Server-Sent Events.
+
+    The events are the ones of `stream_rant`, with the data as JSON, except for the final "rant" event, which has the
+    rendered rant as its "html", and its ETag as its "etag" (if the playlist has a snapshot). Errors are sent as an
+    "error" event (see `get_stream_error_data`), as the response has already started.
+
+    The ETag is sent back in the `If-None-Match` of the next request of the rant, which isn't streamed if it matches
+    (see `get_not_modified_response`), unless it's regenerated. The playlist is then fetched before the stream starts.
+    """
+    playlist = None
+
+    if request.if_none_match and not regenerate:
+        try:
+            playlist = get_rant_playlist(create_spotify_client(), playlist_id)
+        except ValueError:
+            pass  # The stream sends the error.
+
+        if playlist is not None:
+            etag = get_rant_etag(playlist.id, playlist.snapshot_id, rant_type)
+
+            if is_rant_not_modified(etag, regenerate):
+                return get_not_modified_response(etag)
+
+    def generate_messages():
+        snapshot_id = None
+
+        try:
+            for event, data in stream_rant(playlist_id, rant_type, regenerate, playlist):
+                if event == "progress" and data["stage"] == "playlist":
+                    snapshot_id = data.pop("snapshot_id")
+
+                if event == "rant":
+                    etag = get_rant_etag(playlist_id, snapshot_id, rant_type)
+                    data = {"html": render_rant(rant_type, data), "etag": quote_etag(etag, weak=True) if etag else None}
+
+                yield get_event_message(event, data)
+        except Exception as exception:
+            data = get_stream_error_data(exception, "An error occurred while generating the rant")
+            yield get_event_message("error", data)
+
+    # Disables the buffering of reverse proxies (e.g. nginx), so each event is sent as soon as it's generated.
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    return Response(stream_with_context(generate_messages()), mimetype="text/event-stream", headers=headers)
+
+
+def handle_rants_stream(playlist_id: str, rant_type_names: List[str], regenerate: bool = False) -> Response:
+    """
+    Handles and streams the generation of several rants of the given playlist, as Server-Sent Events.
+
+    The events are the ones of `stream_rants`, with the data as JSON: each "rant" event has the name of its rant type
+    and the rendered rant as its "html", and a rant that fails is sent as an "error" event with the name of its type.
+    No rant type names means all of them.
+    """
+
+    def generate_messages():
+        try:
+            rant_types = [RantType[name.upper()] for name in rant_type_names] or list(RantType)
+        except KeyError:
+            yield get_event_message("error", {"message": "Invalid rant type"})
+            return
+
+        try:
+            for event, data in stream_rants(playlist_id, rant_types, regenerate):
+                match event:
+                    case "rant":
+                        data = {"type": data["type"].name.lower(), "html": render_rant(data["type"], data["rant"])}
+                    case "error":
+                        data = {
+                            "type": data["type"].name.lower(),
+                            "message": "An error occurred while generating the rant",
+                        }
+
+                yield get_event_message(event, data)
+        except Exception as exception:
+            data = get_stream_error_data(exception, "An error occurred while generating the rants")
+            yield get_event_message("error", data)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    return Response(stream_with_context(generate_messages()), mimetype="text/event-stream", headers=headers)
+
+
+def handle_rant_job_submit(playlist_id: str, rant_type: RantType, regenerate: bool = False):
+    """Handles the submission of the generation of the rant of the given playlist, as a background job."""
+    if not playlist_id:
+        return jsonify({"message": "Playlist not specified"}), 400
+
+    try:
+        job = rant_jobs.submit(playlist_id, rant_type, regenerate, get_access_token(), get_session_owner())
+    except RantJobQueueFullError:
+        message = "Too many rants are being generated, please try again later"
+        return jsonify({"message": message}), 503, {"Retry-After": "5"}
+
+    return jsonify(get_rant_job_data(job)), 202, {"Location": url_for("rant.job", job_id=job["id"])}
+
+
+def handle_rant_job(job_id: str, wait: float = 0):
+    """
+    Handles the status of the given rant job, waiting up to the given seconds for it to finish.
+
+    A job submitted by another session isn't found, as if it didn't exist.
+    """
+    job = rant_jobs.get(job_id, get_session_owner(), wait)
+
+    if job is None:
+        return jsonify({"message": "Rant job not found"}), 404
+
+    return jsonify(get_rant_job_data(job))
+
+
+def get_rant_job_data(job: dict) -> dict:
+    """Gets the public data of the given rant job: its status, and its rendered rant or error once finished."""
+    rant_type = RantType[job["rant_type"]]
+    data = {"job_id": job["id"], "type": rant_type.name.lower(), "status": job["status"]}
+
+    match job["status"]:
+        case "done":
+            rant = llm_client.get_prompt_manager(rant_type).parser_model.model_validate(job["result"])
+            data["html"] = render_rant(rant_type, rant)
+        case "failed":
+            data["message"] = job["error"]
+
+    return data
+
+
+def render_rant(rant_type: RantType, rant: Review | Rhyme) -> str:
+    """Renders the given rant of the given type."""
     match rant_type:
         case RantType.RATE | RantType.ROAST:
             return render_template("rant/review.html", review=rant)
         case RantType.RHYME:
             return render_template("rant/rhyme.html", rhyme=rant)
         case _:
-            return apology("Invalid rant type", 400)
+            raise ValueError("Invalid rant type")
+
+
+def get_rant_etag(playlist_id: str, snapshot_id: Optional[str], rant_type: RantType) -> Optional[str]:
+    """
+    Gets the ETag of the given rant of a playlist snapshot, if the playlist has a snapshot.
+
+    The rant changes only with the playlist snapshot, the rant type and its version (as the rant cache key does), so the
+    ETag is known before the rant is generated. It's a weak one, as a regenerated rant is another text of the same rant.
+    """
+    if not snapshot_id:
+        return None
+
+    rant_version = llm_client.get_rant_version(rant_type)
+    rant_key = f"{playlist_id}:{snapshot_id}:{rant_type.name}:{rant_version}"
+
+    return hashlib.sha256(rant_key.encode()).hexdigest()[:32]
+
+
+def is_rant_not_modified(etag: Optional[str], regenerate: bool) -> bool:
+    """Checks whether the `If-None-Match` of the request has the given rant ETag, unless it's regenerated."""
+    return etag is not None and not regenerate and request.if_none_match.contains_weak(etag)
+
+
+def get_not_modified_response(etag: str) -> Response:
+    """
+    Gets the response of a rant with the given ETag that matched the `If-None-Match` of the request.
+
+    It's a "304 Not Modified" for a GET (or HEAD) request, and a "412 Precondition Failed" for any other method (e.g.
+    the POST of a rant), as RFC 9110 only allows a 304 for the former. The client then displays the rant it has.
+    """
+    response = Response(status=304 if request.method in ("GET", "HEAD") else 412)
+    response.set_etag(etag, weak=True)
+
+    return response
+
+
+def get_stream_error_data(exception: Exception, message: str) -> dict:
+    """
+    Gets the data of the "error" event of the given exception, raised once the stream has started, with the given
+    message unless it's a Spotify API error.
 
+    A Spotify API error has its own message and status, as the app error handlers give it, and an authorization error
+    clears the session. Any other unexpected exception is logged.
+    """
+    if isinstance(exception, SpotifyException):
+        if exception.http_status == 401:
+            clear_streamed_session()
 
-def generate_rant(playlist_id: str, rant_type: RantType) -> Review | Rhyme:
-    """Generates a Rant for the given playlist."""
+        return {"message": get_spotify_error_message(exception), "status": exception.http_status}
+
+    if not isinstance(exception, (ValueError, OutputParserException)):
+        current_app.logger.exception("Failed to stream the rant")
+
+    return {"message": message, "status": 500}
+
+
+def get_event_message(event: str, data: Any) -> str:
+    """Gets the Server-Sent Events message of the given event, with its data as JSON."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def generate_rant(
+    playlist_id: str,
+    rant_type: RantType,
+    regenerate: bool = False,
+    access_token: Optional[str] = None,
+    playlist: Optional[SpotifyPlaylist] = None,
+    tracks_pages: Optional[Iterable[List[SpotifyTrack]]] = None,
+) -> Review | Rhyme:
+    """
+    Generates a Rant for the given playlist.
+
+    A rant of an unchanged playlist is served from the rant cache, unless it's asked to be regenerated. Otherwise, the
+    tracks are streamed from the Spotify API into the prompt, one page at a time, and the time spent on each stage of
+    the pipeline is logged. The playlist is read with the given Spotify access token, or the one of the session (a
+    background job has none), unless it was already fetched (see `get_rant_playlist`), as its tracks pages may be (e.g.
+    shared by several rants, see `SharedTracksPages`).
+    """
+    spotify = create_spotify_client(access_token)
+    timer = StageTimer()
+
+    if playlist is None:
+        with timer.measure("playlist"):
+            playlist = get_rant_playlist(spotify, playlist_id)
+
+    rant_version = llm_client.get_rant_version(rant_type)
+
+    rant = rant_cache.get_rant(playlist.id, playlist.snapshot_id, rant_type, rant_version, bypass=regenerate)
+    if rant is not None:
+        return rant
+
+    def compute_rant():
+        if tracks_pages is None:
+            pages = spotify.iter_playlist_tracks_pages(
+                playlist.id, playlist.snapshot_id, SpotifyProjection.PROMPT, timer=timer
+            )
+        else:
+            pages = tracks_pages
+
+        start_time = time.perf_counter()
+
+        try:
+            match rant_type:
+                case RantType.RATE:
+                    rant = llm_client.rate(playlist, pages, timer)
+
+                case RantType.ROAST:
+                    rant = llm_client.roast(playlist, pages, timer)
+
+                case RantType.RHYME:
+                    rant = llm_client.rhyme(playlist, pages, timer)
+        except OutputParserException:
+            raise
+        finally:
+            current_app.logger.info("Rant stage timings (ms): %s", timer.as_dict())
+
+        if rant is not None:
+            generation_ms = round((time.perf_counter() - start_time) * 1000)
+            rant_cache.set_rant(playlist.id, playlist.snapshot_id, rant_type, rant_version, rant, generation_ms)
+
+        return rant
+
+    def get_shared_rant():
+        return rant_cache.get_rant(playlist.id, playlist.snapshot_id, rant_type, rant_version)
+
+    flight_key = get_rant_flight_key(playlist, rant_type, rant_version)
+
+    return single_flight.do(flight_key, compute_rant, get_shared_rant)
+
+
+def get_rant_playlist(spotify, playlist_id: str) -> SpotifyPlaylist:
+    """Gets the given playlist, without its tracks, with the given Spotify Client. Raises a `ValueError` if missing."""
     if not playlist_id:
         raise ValueError("Playlist not specified")
 
-    access_token = get_access_token()
-    spotify = SpotifyClient(access_token)
-
-    playlist = spotify.get_playlist(playlist_id, include_tracks=True)
+    playlist = spotify.get_playlist(playlist_id, include_tracks=False, projection=SpotifyProjection.PROMPT)
 
     if not playlist:
         raise ValueError("Playlist not found")
 
+    return playlist
+
+
+def get_rant_flight_key(playlist: SpotifyPlaylist, rant_type: RantType, rant_version: str) -> str:
+    """
+    Gets the single flight key of the generation of the given rant of the given playlist.
+
+    The playlist metadata is fetched before, by each request, so only the users who can read the playlist share a rant.
+    """
+    return f"rant:{playlist.id}:{playlist.snapshot_id}:{rant_type.name}:{rant_version}"
+
+
+def stream_rant(
+    playlist_id: str, rant_type: RantType, regenerate: bool = False, playlist: Optional[SpotifyPlaylist] = None
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Generates a Rant for the given playlist as `generate_rant` does, streaming its progress as events.
+
+    Yields ("progress", data) events as the rant goes through its stages ("started", "playlist" and "prompt"), then
+    ("partial", data) events with the fields of the rant generated so far (see `LLMClient.stream_rant`), and finally a
+    ("rant", rant) event. A cached rant is yielded right after the "playlist" stage. A playlist already fetched (see
+    `get_rant_playlist`) isn't fetched again.
+
+    The streams of the same rant are coalesced into the first one (see `SingleFlight.stream`): the others don't stream
+    its "prompt" stage nor its partial rants, and only yield its final rant, once it's done.
+    """
+    yield "progress", {"stage": "started"}
+
+    spotify = create_spotify_client()
+    timer = StageTimer()
+
+    if playlist is None:
+        with timer.measure("playlist"):
+            playlist = get_rant_playlist(spotify, playlist_id)
+
+    yield "progress", {
+        "stage": "playlist",
+        "name": playlist.name,
+        "tracks_count": playlist.total_tracks,
+        "snapshot_id": playlist.snapshot_id,
+    }
+
+    prompt_manager = llm_client.get_prompt_manager(rant_type)
+    rant_version = llm_client.get_rant_version(rant_type)
+
+    rant = rant_cache.get_rant(playlist.id, playlist.snapshot_id, rant_type, rant_version, bypass=regenerate)
+    if rant is not None:
+        yield "rant", rant
+        return
+
+    tracks_progress = {"tracks_fetched": 0}
+
+    def iter_tracks_pages():
+        tracks_pages = spotify.iter_playlist_tracks_pages(
+            playlist.id, playlist.snapshot_id, SpotifyProjection.PROMPT, timer=timer
+        )
+
+        try:
+            for tracks in tracks_pages:
+                tracks_progress["tracks_fetched"] += len(tracks)
+                yield tracks
+        finally:
+            if hasattr(tracks_pages, "close"):
+                tracks_pages.close()
+
+    def compute_rant():
+        start_time = time.perf_counter()
+        rant = None
+
+        try:
+            for event, data in llm_client.stream_rant(playlist, prompt_manager, iter_tracks_pages(), timer):
+                match event:
+                    case "prompt":
+                        yield "progress", {"stage": "prompt", **tracks_progress}
+                    case "rant":
+                        rant = data
+                    case _:
+                        yield event, data
+        finally:
+            current_app.logger.info("Rant stage timings (ms): %s", timer.as_dict())
+
+        generation_ms = round((time.perf_counter() - start_time) * 1000)
+        rant_cache.set_rant(playlist.id, playlist.snapshot_id, rant_type, rant_version, rant, generation_ms)
+
+        return rant
+
+    def get_shared_rant():
+        return rant_cache.get_rant(playlist.id, playlist.snapshot_id, rant_type, rant_version)
+
+    flight_key = get_rant_flight_key(playlist, rant_type, rant_version)
+    rant = yield from single_flight.stream(flight_key, compute_rant, get_shared_rant)
+
+    yield "rant", rant
+
+
+def stream_rants(playlist_id: str, rant_types: List[RantType], regenerate: bool = False) -> Iterator[Tuple[str, Any]]:
+    """
+    Generates the Rants of the given types for the given playlist, yielding each one as soon as it's done.
+
+    The playlist is fetched once, for all the rants, and the rants are generated concurrently (see `generate_rant`), so
+    all of them take about as long as the slowest one. Their prompts share the tracks pages, which are fetched once,
+    and only as far as the largest prompt reads them. Yields ("progress", data) events as the rants go through the
+    "started" and "playlist" stages, then a ("rant", data) event, with the "type" and the "rant", for each rant as it's
+    done, or an ("error", data) event, with the "type", for each rant that fails.
+    """
+    yield "progress", {"stage": "started"}
+
+    spotify = create_spotify_client()
+    timer = StageTimer()
+
+    with timer.measure("playlist"):
+        playlist = get_rant_playlist(spotify, playlist_id)
+
+    yield "progress", {"stage": "playlist", "name": playlist.name, "tracks_count": playlist.total_tracks}
+
+    tracks_pages = SharedTracksPages(
+        spotify.iter_playlist_tracks_pages(playlist.id, playlist.snapshot_id, SpotifyProjection.PROMPT, timer=timer)
+    )
+
+    # The rants are generated in other threads, which have neither the app context nor the session of the request.
+    app = current_app._get_current_object()
+    access_token = get_access_token()
+
+    def generate(rant_type: RantType):
+        with app.app_context():
+            return generate_rant(playlist.id, rant_type, regenerate, access_token, playlist, tracks_pages)
+
     try:
-        match rant_type:
-            case RantType.RATE:
-                return llm_client.rate(playlist)
+        with ThreadPoolExecutor(max_workers=len(rant_types)) as executor:
+            futures = {executor.submit(generate, rant_type): rant_type for rant_type in rant_types}
 
-            case RantType.ROAST:
-                return llm_client.roast(playlist)
+            for future in as_completed(futures):
+                rant_type = futures[future]
 
-            case RantType.RHYME:
-                return llm_client.rhyme(playlist)
-    except OutputParserException:
-        raise
+                try:
+                    rant = future.result()
+                except Exception:
+                    current_app.logger.exception("Failed to generate the %s rant", rant_type.name.lower())
+                    yield "error", {"type": rant_type}
+                    continue
 
-    return None
+                yield "rant", {"type": rant_type, "rant": rant}
+    finally:
+        current_app.logger.info("Rants stage timings (ms): %s", timer.as_dict())
@@ -1,10 +1,12 @@
-from flask import redirect, request
+from typing import Optional
+from flask import current_app, redirect, request
 
 from spotipy.oauth2 import SpotifyOAuth, SpotifyOauthError, SpotifyStateError
 
-from app import spotify_oauth
+from app import spotify_oauth, spotify_playlist_cache, spotify_session_pool
+from app.api.spotify import SpotifyClient
 from app.helpers.errors import apology
-from app.helpers.session import set_token_info, pop_oauth_state
+from app.helpers.session import get_access_token, set_token_info, pop_oauth_state
 
 
 def handle_spotify_callback():
@@ -24,3 +26,13 @@ def handle_spotify_callback():
     set_token_info(token_info)
 
     return redirect("/")
+
+
+def create_spotify_client(access_token: Optional[str] = None) -> SpotifyClient:
+    """Creates a Spotify Client with the given access token, or the one of the user of the current session."""
+    return SpotifyClient(
+        access_token or get_access_token(),
+        playlist_cache=spotify_playlist_cache,
+        max_concurrent_requests=current_app.config["SPOTIFY_MAX_CONCURRENT_REQUESTS"],
+        requests_session=spotify_session_pool.session,
+    )
@@ -3,12 +3,17 @@
  */
 
 
+// URL of the last rant displayed, to regenerate it.
+let lastRantUrl = null;
+
+
 // Runs after DOM is fully loaded.
 $(document).ready(
     function() {
         addEventOnRateButtonClicked();
         addEventOnRoastButtonClicked();
         addEventOnRhymeButtonClicked();
+        addEventOnRegenerateButtonClicked();
         addEventOnSelectPlaylistChanged();
         showDisclaimer();
     }
@@ -33,6 +38,16 @@ function addEventOnRhymeButtonClicked() {
 }
 
 
+// Adds an event listener to the click of Regenerate Button
+function addEventOnRegenerateButtonClicked() {
+    $("#regenerate-button").click(function() {
+        if (lastRantUrl) {
+            submitRant(lastRantUrl, true);
+        }
+    });
+}
+
+
 // Adds an event listener to the change of Select Playlist dropdown
 function addEventOnSelectPlaylistChanged() {
     const playlistSelect = $("#playlist-select");
@@ -43,6 +58,8 @@ function addEventOnSelectPlaylistChanged() {
     playlistSelect.change(function() {
         const selectedPlaylistId = playlistSelect.val();
 
+        hideRegenerateButton();
+
         if (selectedPlaylistId) {
             const encodedPlaylistId = encodeURIComponent(selectedPlaylistId);
             const playlistUrl = baseSpotifyUrl + "playlist/" + encodedPlaylistId;
@@ -65,33 +82,151 @@ function addEventOnRantButtonClicked(buttonId, url) {
             return;
         }
 
-        disableRantButtons();
+        submitRant(url, false);
+    });
+}
+
+
+// Submits the rant form to the given URL, optionally asking to regenerate a cached rant.
+// The rant is streamed from the URL's stream endpoint, displaying its progress and its fields as they arrive.
+// A rant already displayed is sent with its ETag, so it's displayed again if the server answers it didn't change.
+async function submitRant(url, regenerate) {
+    disableRantButtons();
+    displayLoadingDots();
 
-        // Submits the rant data via jQuery AJAX.
-        $.ajax({
-            url: url,
+    const rantKey = getRantKey(url, $("#playlist-select").val());
+    const storedRant = JSON.parse(sessionStorage.getItem(rantKey));
+
+    const headers = { "Content-Type": "application/x-www-form-urlencoded" };
+    if (storedRant && !regenerate) {
+        headers["If-None-Match"] = storedRant.etag;
+    }
+
+    try {
+        const response = await fetch(url + "/stream", {
             method: "POST",
-            data: $("#rant-form").serialize(),
-            beforeSend: function() {
-                displayLoadingDots();
-            },
-            success: (data, textStatus, jqXHR) => {
-                removeLoadingDots();
-                displayRant(data);
-                enableRantButtons();
-            },
-            error: (jqXHR, textStatus, errorThrown) => {
-                removeLoadingDots();
-                displayRantError("Failed to submit rant. Please try again.");
-                enableRantButtons();
-            },
-            statusCode: {
-                401: () => {
-                    redirect("/auth/login");
-                }
-            }
+            headers: headers,
+            body: $("#rant-form").serialize() + (regenerate ? "&regenerate=true" : ""),
         });
-    });
+
+        if (response.status === 401) {
+            redirect("/auth/login");
+            return;
+        }
+
+        // The POST of a rant that didn't change fails its If-None-Match precondition.
+        if (response.status === 412 && storedRant) {
+            handleRantEvent({ event: "rant", data: storedRant }, url, rantKey);
+            return;
+        }
+
+        if (!response.ok) {
+            throw new Error(response.statusText);
+        }
+
+        await readRantEvents(response, url, rantKey);
+    }
+    catch (error) {
+        removeLoadingDots();
+        displayRantError("Failed to submit rant. Please try again.");
+    }
+    finally {
+        enableRantButtons();
+    }
+}
+
+
+// Gets the key of the rant of the given URL and playlist, in the session storage.
+function getRantKey(url, playlistId) {
+    return `rant:${url}:${playlistId}`;
+}
+
+
+// Reads the Server-Sent Events of the given rant stream response, handling each event as soon as it arrives.
+// A stream that ends before its rant or its error (e.g. the connection dropped) is an error itself.
+async function readRantEvents(response, url, rantKey) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let finished = false;
+
+    while (true) {
+        const { done, value } = await reader.read();
+
+        if (done) {
+            break;
+        }
+
+        buffer += decoder.decode(value, { stream: true });
+
+        // The last message may still be incomplete, so it's kept until the next chunk.
+        const messages = buffer.split("\n\n");
+        buffer = messages.pop();
+
+        for (const message of messages) {
+            finished = handleRantEvent(parseEventMessage(message), url, rantKey) || finished;
+        }
+    }
+
+    if (!finished) {
+        throw new Error("The rant stream ended unexpectedly");
+    }
+}
+
+
+// Parses the event name and the JSON data of a Server-Sent Events message.
+function parseEventMessage(message) {
+    let event = "message";
+    let data = "";
+
+    for (const line of message.split("\n")) {
+        if (line.startsWith("event: ")) {
+            event = line.slice("event: ".length);
+        }
+        else if (line.startsWith("data: ")) {
+            data += line.slice("data: ".length);
+        }
+    }
+
+    return { event: event, data: JSON.parse(data) };
+}
+
+
+// Handles an event of the rant stream of the given URL, storing the rant with its ETag under the given key.
+// Returns whether the event ends the stream (the rant or an error).
+function handleRantEvent(message, url, rantKey) {
+    switch (message.event) {
+        case "progress":
+            displayRantProgress(message.data);
+            break;
+
+        case "partial":
+            displayPartialRant(message.data);
+            break;
+
+        case "rant":
+            displayRant(message.data.html);
+
+            if (message.data.etag) {
+                sessionStorage.setItem(rantKey, JSON.stringify({ html: message.data.html, etag: message.data.etag }));
+            }
+
+            lastRantUrl = url;
+            showRegenerateButton();
+            return true;
+
+        case "error":
+            if (message.data.status === 401) {
+                redirect("/auth/login");
+                return true;
+            }
+
+            removeLoadingDots();
+            displayRantError(message.data.message);
+            return true;
+    }
+
+    return false;
 }
 
 
@@ -106,6 +241,60 @@ function showDisclaimer() {
 }
 
 
+// Displays the progress of the rant generation under the loading dots via jQuery.
+function displayRantProgress(progress) {
+    switch (progress.stage) {
+        case "started":
+            $("#rant-progress").text("Looking for your playlist...");
+            break;
+
+        case "playlist":
+            $("#rant-progress").text(`Going through the tracks of ${progress.name}...`);
+            break;
+
+        case "prompt":
+            $("#rant-progress").text(`Listened to ${progress.tracks_fetched} tracks, thinking about them...`);
+            break;
+    }
+}
+
+
+// Displays the fields of the rant generated so far via jQuery, as the rant templates do.
+function displayPartialRant(rant) {
+    const rantContent = [];
+
+    if (Array.isArray(rant.stanzas)) {
+        const rhyme = $("<div>", { class: "card-text rhyme" });
+
+        for (const stanza of rant.stanzas) {
+            const stanzaRow = $("<div>", { class: "row mb-4 stanza" });
+
+            for (const line of Array.isArray(stanza) ? stanza : []) {
+                stanzaRow.append($("<p>", { class: "mb-0", text: line }));
+            }
+
+            rhyme.append(stanzaRow);
+        }
+
+        rantContent.push(rhyme);
+    }
+
+    if (rant.rating !== undefined) {
+        rantContent.push($("<div>", { class: "row" }).append($("<h1>", { text: `${rant.rating}/10` })));
+    }
+
+    if (rant.review) {
+        rantContent.push($("<div>", { class: "row" }).append($("<p>", { class: "card-text", text: rant.review })));
+    }
+
+    // Keeps the loading dots while only the facts are generated.
+    if (rantContent.length) {
+        $("#rant-display").empty().append(rantContent);
+        removeRantError();
+    }
+}
+
+
 // Displays the rant in index page via jQuery.
 function displayRant(rantContent) {
     $("#rant-display").html(rantContent);
@@ -138,15 +327,28 @@ function enableRantButtons() {
 }
 
 
+// Shows the Regenerate Button via jQuery.
+function showRegenerateButton() {
+    $("#regenerate-button").removeClass("d-none");
+}
+
+
+// Hides the Regenerate Button via jQuery.
+function hideRegenerateButton() {
+    $("#regenerate-button").addClass("d-none");
+}
+
+
 // Displays the loading dots in index page via jQuery.
 function displayLoadingDots() {
     const loadingDotsHtml = `
-        <div class="d-flex justify-content-center align-items-center h-100">
+        <div class="d-flex flex-column justify-content-center align-items-center h-100">
             <div class="loading-dots">
                 <div class="loading-dot"></div>
                 <div class="loading-dot"></div>
                 <div class="loading-dot"></div>
             </div>
+            <p id="rant-progress" class="text-center mt-3"></p>
         </div>
     `;
 
@@ -154,9 +356,10 @@ function displayLoadingDots() {
 }
 
 
-// Removes the loading dots in index page via jQuery.
+// Removes the loading dots (and the progress) in index page via jQuery.
 function removeLoadingDots() {
     $(".loading-dots").remove();
+    $("#rant-progress").remove();
 }
 
 
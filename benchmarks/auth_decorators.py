@@ -0,0 +1,101 @@
+"""
+Benchmark of the per-request overhead of the auth decorators.
+
+Compares the stacked `auth_required` and `validate_token` decorators, and the access token read by the route, reading
+the Flask session and checking the token expiration in each of them (the previous path), with the auth context resolved
+once per request.
+
+    python -m benchmarks.auth_decorators
+"""
+
+import time
+import timeit
+
+from flask import g, session
+from functools import wraps
+
+from spotipy.oauth2 import SpotifyOAuth
+from spotipy.cache_handler import FlaskSessionCacheHandler
+
+from app import create_app
+from app.decorators.session import auth_required, validate_token
+from app.helpers.session import get_access_token
+
+
+NUMBER = 10_000
+
+
+def get_token_info_legacy():
+    """Gets the SPOTIFY TOKEN INFO from the session, as it was read before the auth context."""
+    return FlaskSessionCacheHandler(session).get_cached_token()
+
+
+def auth_required_legacy(f):
+    """Decorates a route to require authorization, as it did before the auth context."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not get_token_info_legacy():
+            return None
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def validate_token_legacy(f):
+    """Decorates a route to validate the token, as it did before the auth context."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token_info = get_token_info_legacy()
+        if token_info and not SpotifyOAuth.is_token_expired(token_info):
+            return f(*args, **kwargs)
+        return None
+
+    return decorated_function
+
+
+def main():
+    """Runs the benchmark."""
+    app = create_app("test")
+
+    @auth_required_legacy
+    @validate_token_legacy
+    def view_legacy():
+        return get_token_info_legacy()["access_token"]
+
+    @auth_required(from_ajax=True)
+    @validate_token(from_ajax=True)
+    def view_auth_context():
+        return get_access_token()
+
+    def view():
+        return "dummy_access_token"
+
+    def request_legacy():
+        return view_legacy()
+
+    with app.test_request_context():
+        request_globals = g._get_current_object()
+
+        def request_auth_context():
+            # Each request starts without an auth context, as it does in its own app context.
+            request_globals.__dict__.pop("auth_context", None)
+            return view_auth_context()
+
+        session["token_info"] = {"access_token": "dummy_access_token", "expires_at": int(time.time()) + 3600}
+
+        assert request_legacy() == request_auth_context() == view()
+
+        bare_time = min(timeit.repeat(view, number=NUMBER)) / NUMBER
+        legacy_time = min(timeit.repeat(request_legacy, number=NUMBER)) / NUMBER
+        auth_context_time = min(timeit.repeat(request_auth_context, number=NUMBER)) / NUMBER
+
+    print(f"{'Chain':<14} {'Per request (us)':>17} {'Overhead (us)':>14}")
+
+    for name, request_time in [("Bare route", bare_time), ("Legacy", legacy_time), ("Auth context", auth_context_time)]:
+        print(f"{name:<14} {request_time * 1e6:>17.2f} {(request_time - bare_time) * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmark of the construction of the Spotify models from the Spotify API data.
+
+Compares the validated path with the trusted (validation-free) path used for data that came straight from the API.
+
+    python -m benchmarks.models_spotify
+"""
+
+import timeit
+
+from app.models.spotify import SpotifyPlaylist
+from benchmarks.samples import get_playlist_tracks_sample
+
+
+TRACKS_COUNTS = [100, 1_000, 10_000]
+
+
+def benchmark(playlist_tracks_data, validate: bool, repeat: int = 5) -> float:
+    """Gets the best time, in seconds, to create the tracks of the given data."""
+    timer = timeit.Timer(lambda: SpotifyPlaylist.tracks_from_json(playlist_tracks_data, validate))
+    return min(timer.repeat(repeat=repeat, number=1))
+
+
+def main():
+    """Runs the benchmark."""
+    print(f"{'Tracks':>8} {'Validated (ms)':>16} {'Trusted (ms)':>14} {'Speedup':>9}")
+
+    for tracks_count in TRACKS_COUNTS:
+        playlist_tracks_data = get_playlist_tracks_sample(tracks_count)
+
+        validated_time = benchmark(playlist_tracks_data, validate=True)
+        trusted_time = benchmark(playlist_tracks_data, validate=False)
+
+        print(
+            f"{tracks_count:>8} {validated_time * 1000:>16.2f} {trusted_time * 1000:>14.2f}"
+            f" {validated_time / trusted_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of the memory held by the Spotify models of an album-heavy playlist.
+
+Compares creating a new album and new artists for every track with sharing the repeated ones through the identity map
+of a parse.
+
+    python -m benchmarks.models_spotify_memory
+"""
+
+import time
+import tracemalloc
+
+from app.models.spotify import SpotifyPlaylist, SpotifyTrack
+from benchmarks.samples import get_playlist_tracks_sample
+
+
+TRACKS_COUNT = 10_000
+ALBUMS_COUNT = 500
+ARTISTS_COUNT = 300
+
+
+def create_tracks_without_identity_map(playlist_tracks_data, validate):
+    """Creates the tracks of the given data, with new albums and artists for every track."""
+    return [SpotifyTrack.from_json(track_data["track"], validate) for track_data in playlist_tracks_data]
+
+
+def create_tracks_with_identity_map(playlist_tracks_data, validate):
+    """Creates the tracks of the given data, sharing the repeated albums and artists."""
+    return SpotifyPlaylist.tracks_from_json(playlist_tracks_data, validate)
+
+
+def measure(create_tracks, playlist_tracks_data, validate):
+    """Gets the time, the retained memory and the peak memory, in MiB, to create the tracks of the given data."""
+    tracemalloc.start()
+
+    start_time = time.perf_counter()
+    tracks = create_tracks(playlist_tracks_data, validate)
+    elapsed_time = time.perf_counter() - start_time
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del tracks
+
+    return elapsed_time, current / 2**20, peak / 2**20
+
+
+def main():
+    """Runs the benchmark."""
+    playlist_tracks_data = get_playlist_tracks_sample(TRACKS_COUNT, ALBUMS_COUNT, ARTISTS_COUNT)
+
+    print(f"{TRACKS_COUNT} tracks, {ALBUMS_COUNT} albums, {ARTISTS_COUNT} artists (time under tracemalloc)")
+    print(f"{'Path':<10} {'Identity map':<14} {'Time (ms)':>10} {'Retained (MiB)':>16} {'Peak (MiB)':>12}")
+
+    for validate in [True, False]:
+        for identity_map, create_tracks in [
+            ("no", create_tracks_without_identity_map),
+            ("yes", create_tracks_with_identity_map),
+        ]:
+            elapsed_time, retained, peak = measure(create_tracks, playlist_tracks_data, validate)
+
+            print(
+                f"{'Validated' if validate else 'Trusted':<10} {identity_map:<14} {elapsed_time * 1000:>10.1f}"
+                f" {retained:>16.2f} {peak:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
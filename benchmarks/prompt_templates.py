@@ -0,0 +1,69 @@
+"""
+Benchmark of the per-request assembly of the prompt.
+
+Compares formatting the langchain Prompt Template and counting the tokens of its static part on each request (the
+previous path) with the compiled template and its static tokens counted once.
+
+    python -m benchmarks.prompt_templates
+"""
+
+import timeit
+import tiktoken
+
+from langchain.prompts import PromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+
+from app.helpers.spotify import playlist_to_csv, tracks_to_csv
+from app.models.llm import Review
+from app.models.spotify import SpotifyPlaylist
+from app.prompts import prompts
+from app.prompts.prompts import CompiledPromptTemplate
+from benchmarks.samples import get_playlist_tracks_sample
+
+
+TRACKS_COUNTS = [0, 10, 100]
+NUMBER = 1_000
+
+
+def main():
+    """Runs the benchmark."""
+    encoding = tiktoken.get_encoding("cl100k_base")
+    format_instructions = PydanticOutputParser(pydantic_object=Review).get_format_instructions()
+
+    prompt_template = PromptTemplate(
+        template=prompts.rate_prompt_template,
+        input_variables=["playlist", "tracks"],
+        partial_variables={"format_instructions": format_instructions},
+    )
+    compiled_prompt_template = CompiledPromptTemplate(
+        prompts.rate_prompt_template, format_instructions=format_instructions
+    )
+    static_tokens_count = len(encoding.encode_ordinary(compiled_prompt_template.static_text))
+
+    def assemble_langchain(playlist_csv, tracks_csv):
+        prompt = prompt_template.format(playlist=playlist_csv, tracks=tracks_csv)
+        tokens_count = len(encoding.encode_ordinary(prompt_template.format(playlist="", tracks="")))
+
+        return prompt, tokens_count
+
+    def assemble_compiled(playlist_csv, tracks_csv):
+        return compiled_prompt_template.format(playlist=playlist_csv, tracks=tracks_csv), static_tokens_count
+
+    print(f"{'Tracks':>7} {'Langchain (us)':>15} {'Compiled (us)':>14}")
+
+    for tracks_count in TRACKS_COUNTS:
+        playlist = SpotifyPlaylist.from_json(
+            {"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(tracks_count)
+        )
+        playlist_csv, tracks_csv = playlist_to_csv(playlist), tracks_to_csv(playlist.tracks)
+
+        assert assemble_compiled(playlist_csv, tracks_csv) == assemble_langchain(playlist_csv, tracks_csv)
+
+        langchain_time = min(timeit.repeat(lambda: assemble_langchain(playlist_csv, tracks_csv), number=NUMBER))
+        compiled_time = min(timeit.repeat(lambda: assemble_compiled(playlist_csv, tracks_csv), number=NUMBER))
+
+        print(f"{tracks_count:>7} {langchain_time / NUMBER * 1e6:>15.1f} {compiled_time / NUMBER * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
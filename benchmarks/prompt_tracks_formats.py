@@ -0,0 +1,76 @@
+"""
+Benchmark of the density of the tracks formats of the prompt.
+
+Serializes synthetic playlists in each format and reports the tokens per track and how many tracks fit in the tokens
+budget of the prompt, with the tracks in a shuffled order and sorted by album (the order of album-heavy playlists).
+
+    python -m benchmarks.prompt_tracks_formats
+"""
+
+import random
+import tiktoken
+
+from app.helpers.spotify import create_tracks_serializer, TRACKS_SERIALIZERS
+from app.models.llm import Review
+from app.models.spotify import SpotifyPlaylist
+from app.api.llm import RantPromptManager
+from app.prompts import prompts
+from benchmarks.samples import get_playlist_tracks_sample
+from config import Config
+
+
+TRACKS_COUNT = 2_000
+
+# Name, number of albums and number of artists of each sample playlist.
+PLAYLISTS = [
+    ("singles", None, None),
+    ("albums", 150, 300),
+]
+
+
+def get_tracks_tokens_count(tracks, tracks_format, encoding) -> int:
+    """Gets the number of tokens of the given tracks serialized in the given format, without the header."""
+    rows = create_tracks_serializer(tracks_format).get_rows(tracks)
+
+    return len(encoding.encode_ordinary("".join(row for _, row in rows)))
+
+
+def get_fitting_tracks_count(playlist, tracks_format, encoding) -> int:
+    """Gets the number of tracks of the given playlist that fit in the prompt in the given format."""
+    prompt_manager = RantPromptManager(
+        Review, prompts.rate_prompt_template, Config.LLM_MAX_PROMPT_TOKENS, tracks_format=tracks_format
+    )
+    prompt_manager.generate_prompt(playlist, encoding)
+
+    return prompt_manager.counters.get("tracks_used")
+
+
+def main():
+    """Runs the benchmark."""
+    encoding = tiktoken.get_encoding("cl100k_base")
+
+    print(f"{'Playlist':<10} {'Order':<9} {'Format':<14} {'Tokens/track':>13} {'Fitting tracks':>15}")
+
+    for playlist_name, albums_count, artists_count in PLAYLISTS:
+        playlist_tracks_data = get_playlist_tracks_sample(TRACKS_COUNT, albums_count, artists_count)
+        random.Random(0).shuffle(playlist_tracks_data)
+
+        sorted_playlist_tracks_data = sorted(
+            playlist_tracks_data, key=lambda playlist_track_data: playlist_track_data["track"]["album"]["id"]
+        )
+
+        for order, tracks_data in [("shuffled", playlist_tracks_data), ("by album", sorted_playlist_tracks_data)]:
+            playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, tracks_data)
+
+            for tracks_format in TRACKS_SERIALIZERS:
+                tokens_per_track = get_tracks_tokens_count(playlist.tracks, tracks_format, encoding) / TRACKS_COUNT
+                fitting_tracks_count = get_fitting_tracks_count(playlist, tracks_format, encoding)
+
+                print(
+                    f"{playlist_name:<10} {order:<9} {tracks_format:<14} "
+                    f"{tokens_per_track:>13.2f} {fitting_tracks_count:>15}"
+                )
+
+
+if __name__ == "__main__":
+    main()
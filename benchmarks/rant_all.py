@@ -0,0 +1,86 @@
+"""
+Benchmark of the generation of all the rants of a playlist.
+
+Compares requesting each rant on its own, one after another (as clicking rate, roast and rhyme does), with the
+combined endpoint, which fetches the playlist once and generates the rants concurrently. The fake LLM takes longer to
+rhyme than to rate or roast, so the combined rants should take about as long as the rhyme alone.
+
+    python -m benchmarks.rant_all
+"""
+
+import time
+
+from unittest import mock
+from langchain_core.messages import AIMessage
+
+from app import create_app, llm_client
+from app.api.spotify import SpotifyClient
+from benchmarks.rant_stream import FakeLatencySpotify
+
+
+TRACKS_COUNT = 1_000
+REVIEW_LATENCY = 0.5
+RHYME_LATENCY = 0.8
+
+REVIEW_CONTENT = '{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}'
+RHYME_CONTENT = '{"facts": "Lorem Ipsum", "stanzas": [["Dolor", "Sit"], ["Amet"]]}'
+
+
+class FakeLatencyLLM:
+    """Fake LLM that responds after a fixed latency, longer for rhymes."""
+
+    def invoke(self, prompt):
+        """Gets the response of the rant asked by the given prompt."""
+        if "rhyme" in prompt.lower():
+            time.sleep(RHYME_LATENCY)
+            return AIMessage(content=RHYME_CONTENT)
+
+        time.sleep(REVIEW_LATENCY)
+        return AIMessage(content=REVIEW_CONTENT)
+
+
+def create_fake_spotify_client():
+    """Creates a Spotify Client with the fake backend."""
+    spotify = SpotifyClient("dummy_access_token")
+    spotify.spotify_api_client.spotify = FakeLatencySpotify(TRACKS_COUNT)
+
+    return spotify
+
+
+def measure(run) -> float:
+    """Gets the time, in seconds, of the given run."""
+    start_time = time.perf_counter()
+    run()
+
+    return time.perf_counter() - start_time
+
+
+def main():
+    """Runs the benchmark."""
+    app = create_app("test")
+    llm_client.llm = FakeLatencyLLM()
+
+    client = app.test_client()
+
+    with client.session_transaction() as session:
+        session["token_info"] = {"access_token": "dummy_access_token", "expires_at": time.time() + 3600}
+
+    data = {"playlist": "0001", "regenerate": "true"}
+
+    def run_separate_rants():
+        for url in ["/rant/rate", "/rant/roast", "/rant/rhyme"]:
+            assert client.post(url, data=data).status_code == 200
+
+    def run_combined_rants():
+        assert client.post("/rant/all/stream", data=data).data.count(b"event: rant") == 3
+
+    print(f"LLM latency of {REVIEW_LATENCY:.2f} s per review and {RHYME_LATENCY:.2f} s per rhyme")
+    print(f"{'Rants':<10} {'Total (s)':>10}")
+
+    with mock.patch("app.services.rant.create_spotify_client", create_fake_spotify_client):
+        print(f"{'Separate':<10} {measure(run_separate_rants):>10.2f}")
+        print(f"{'Combined':<10} {measure(run_combined_rants):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of concurrent rants against a fake LLM with latency.
+
+Compares the sync gunicorn workers, with each rant holding one of a fixed number of workers, with the gthread workers
+(see `gunicorn.conf.py`), with each rant holding one of the threads of those workers while it waits on the LLM.
+
+    python -m benchmarks.rant_concurrency
+"""
+
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage
+
+from app import create_app, llm_client
+from app.models.spotify import SpotifyPlaylist
+from benchmarks.samples import get_playlist_tracks_sample
+
+
+RANTS_COUNTS = [1, 10, 50, 200]
+WORKERS_COUNT = 4
+THREADS_COUNT = 8
+LLM_LATENCY = 0.5
+
+RANT_CONTENT = '{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}'
+
+
+class FakeLatencyLLM:
+    """Fake LLM that responds after a fixed latency."""
+
+    def invoke(self, prompt):
+        """Gets the response, blocking the calling thread."""
+        time.sleep(LLM_LATENCY)
+
+        return AIMessage(content=RANT_CONTENT)
+
+
+def run_rants(playlist, rants_count: int, concurrency: int):
+    """Runs the given number of rants, with up to the given number of them at once."""
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: llm_client.rate(playlist), range(rants_count)))
+
+
+def measure(run) -> float:
+    """Gets the time, in seconds, of the given run."""
+    start_time = time.perf_counter()
+    run()
+
+    return time.perf_counter() - start_time
+
+
+def main():
+    """Runs the benchmark."""
+    create_app("test")
+    llm_client.llm = FakeLatencyLLM()
+
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(100))
+
+    print(f"LLM latency of {LLM_LATENCY:.2f} s, {WORKERS_COUNT} workers, {THREADS_COUNT} threads per gthread worker")
+    print(f"{'Rants':>6} {'Sync (s)':>9} {'Gthread (s)':>12} {'Sync (rants/s)':>15} {'Gthread (rants/s)':>18}")
+
+    for rants_count in RANTS_COUNTS:
+        sync_time = measure(lambda: run_rants(playlist, rants_count, WORKERS_COUNT))
+        gthread_time = measure(lambda: run_rants(playlist, rants_count, WORKERS_COUNT * THREADS_COUNT))
+
+        print(
+            f"{rants_count:>6} {sync_time:>9.2f} {gthread_time:>12.2f} "
+            f"{rants_count / sync_time:>15.1f} {rants_count / gthread_time:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
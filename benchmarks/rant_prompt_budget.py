@@ -0,0 +1,50 @@
+"""
+Benchmark of the cost of generating the prompt of playlists of growing sizes, under the default tokens budget.
+
+The tracks pages stop being fetched once the prompt overflows the budget, so the cost should stay about constant.
+
+    python -m benchmarks.rant_prompt_budget
+"""
+
+import time
+import tiktoken
+
+from app.api.llm import RantPromptManager
+from app.api.spotify import SpotifyClient
+from app.models.llm import Review
+from app.models.spotify import SpotifyPlaylist
+from app.prompts import prompts
+from benchmarks.rant_prompt_pipeline import FakeSpotify
+from config import Config
+
+
+TRACKS_COUNTS = [100, 1_000, 10_000, 50_000]
+
+
+def main():
+    """Runs the benchmark."""
+    encoding = tiktoken.get_encoding("cl100k_base")
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, Config.LLM_MAX_PROMPT_TOKENS)
+
+    print(f"{'Tracks':>8} {'Pages fetched':>14} {'Tracks used':>12} {'Time (ms)':>10}")
+
+    for tracks_count in TRACKS_COUNTS:
+        fake_spotify = FakeSpotify(tracks_count)
+
+        spotify = SpotifyClient("dummy_access_token")
+        spotify.spotify_api_client.spotify = fake_spotify
+
+        playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist", "tracks": {"total": tracks_count}})
+        tracks_used = prompt_manager.counters.get("tracks_used")
+
+        start_time = time.perf_counter()
+        prompt_manager.generate_prompt(playlist, encoding, spotify.iter_playlist_tracks_pages(playlist.id))
+        elapsed_time = time.perf_counter() - start_time
+
+        tracks_used = prompt_manager.counters.get("tracks_used") - tracks_used
+
+        print(f"{tracks_count:>8} {fake_spotify.requested_pages:>14} {tracks_used:>12} {elapsed_time * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
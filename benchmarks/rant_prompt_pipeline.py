@@ -0,0 +1,106 @@
+"""
+Benchmark of the peak memory of generating the prompt of a large playlist.
+
+Compares materializing every stage (all the pages, then all the tracks, then the prompt) with streaming the tracks
+pages into the prompt as they arrive. The pages are generated on request, as if they came from the Spotify API.
+
+    python -m benchmarks.rant_prompt_pipeline
+"""
+
+import tiktoken
+import tracemalloc
+
+from app.api.llm import RantPromptManager
+from app.api.spotify import SpotifyClient
+from app.helpers.metrics import StageTimer
+from app.models.llm import Review
+from app.models.spotify import SpotifyPlaylist
+from app.prompts import prompts
+from benchmarks.samples import get_playlist_tracks_sample
+
+
+TRACKS_COUNT = 10_000
+PAGE_SIZE = 100
+MAX_PROMPT_TOKENS = 10_000_000
+
+
+class FakeSpotify:
+    """Fake Spotify API backend that generates the pages of the playlist tracks on request."""
+
+    def __init__(self, tracks_count=TRACKS_COUNT):
+        """Creates the fake backend with the given number of tracks."""
+        self.tracks_count = tracks_count
+        self.requested_pages = 0
+
+    def playlist_tracks(self, playlist_id, fields=None, limit=PAGE_SIZE, offset=0):
+        """Gets a page of the playlist tracks."""
+        self.requested_pages += 1
+        next_offset = offset + limit
+
+        return {
+            "items": get_playlist_tracks_sample(min(limit, self.tracks_count - offset), albums_count=20, seed=offset),
+            "limit": limit,
+            "offset": offset,
+            "total": self.tracks_count,
+            "next": f"offset={next_offset}" if next_offset < self.tracks_count else None,
+        }
+
+    def next(self, results):
+        """Gets the next page of the given page of the playlist tracks."""
+        return self.playlist_tracks(None, limit=results["limit"], offset=results["offset"] + results["limit"])
+
+
+def generate_materialized_prompt(spotify, prompt_manager, playlist, encoding):
+    """Generates the prompt materializing every stage of the pipeline."""
+    tracks_data = spotify.spotify_api_client.get_playlist_tracks(playlist.id)
+    tracks = SpotifyPlaylist.tracks_from_json(tracks_data, validate=False)
+
+    return prompt_manager.generate_prompt(playlist.model_copy(update={"tracks": tracks}), encoding)
+
+
+def generate_streamed_prompt(spotify, prompt_manager, playlist, encoding, timer=None):
+    """Generates the prompt streaming the tracks pages into it."""
+    tracks_pages = spotify.iter_playlist_tracks_pages(playlist.id, timer=timer)
+
+    return prompt_manager.generate_prompt(playlist, encoding, tracks_pages, timer)
+
+
+def measure_peak(generate):
+    """Gets the generated prompt and the peak memory, in MiB, to generate it."""
+    tracemalloc.start()
+    prompt = generate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return prompt, peak / 2**20
+
+
+def main():
+    """Runs the benchmark."""
+    encoding = tiktoken.get_encoding("cl100k_base")
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, MAX_PROMPT_TOKENS)
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist", "description": "Lorem Ipsum"})
+
+    spotify = SpotifyClient("dummy_access_token")
+    spotify.spotify_api_client.spotify = FakeSpotify()
+
+    materialized_prompt, materialized_peak = measure_peak(
+        lambda: generate_materialized_prompt(spotify, prompt_manager, playlist, encoding)
+    )
+
+    timer = StageTimer()
+    streamed_prompt, streamed_peak = measure_peak(
+        lambda: generate_streamed_prompt(spotify, prompt_manager, playlist, encoding, timer)
+    )
+
+    assert streamed_prompt == materialized_prompt
+
+    print(f"{TRACKS_COUNT} tracks, pages of {PAGE_SIZE}, prompt of {len(streamed_prompt) / 2**20:.2f} MiB")
+    print(f"{'Pipeline':<14} {'Peak (MiB)':>12}")
+    print(f"{'Materialized':<14} {materialized_peak:>12.2f}")
+    print(f"{'Streamed':<14} {streamed_peak:>12.2f}")
+    print(f"Streamed stage timings (ms): {timer.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
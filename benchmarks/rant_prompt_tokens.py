@@ -0,0 +1,71 @@
+"""
+Benchmark of the token accounting of the rant prompt.
+
+Compares the previous path (formatting the whole prompt, encoding all of it and decoding the tokens that fit) with the
+row-wise accounting, with cold and warm track tokens caches.
+
+    python -m benchmarks.rant_prompt_tokens
+"""
+
+import timeit
+import tiktoken
+
+from app.api.llm import RantPromptManager, TrackTokensCache
+from app.helpers.spotify import playlist_to_csv, tracks_to_csv
+from app.models.llm import Review
+from app.models.spotify import SpotifyPlaylist
+from app.prompts import prompts
+from benchmarks.samples import get_playlist_tracks_sample
+from config import Config
+
+
+TRACKS_COUNTS = [100, 1_000, 10_000]
+
+
+def generate_whole_prompt(prompt_manager, playlist, encoding):
+    """Generates the prompt as the previous path did: encoding the whole prompt, and cutting it mid-row if needed."""
+    prompt = prompt_manager.prompt_template.format(
+        playlist=playlist_to_csv(playlist), tracks=tracks_to_csv(playlist.tracks)
+    )
+    prompt_tokens = encoding.encode(prompt)
+
+    if len(prompt_tokens) > prompt_manager.max_prompt_tokens:
+        prompt = encoding.decode(prompt_tokens[: prompt_manager.max_prompt_tokens])
+        prompt += prompt_manager.limit_exceeded_prompt_message
+
+    return prompt
+
+
+def generate_row_wise_prompt(prompt_manager, playlist, encoding, cold):
+    """Generates the prompt with the row-wise accounting, optionally with a cold track tokens cache."""
+    if cold:
+        prompt_manager.track_tokens_cache = TrackTokensCache()
+
+    return prompt_manager.generate_prompt(playlist, encoding)
+
+
+def benchmark(generate, repeat: int = 5) -> float:
+    """Gets the best time, in seconds, of the given generation."""
+    return min(timeit.Timer(generate).repeat(repeat=repeat, number=1))
+
+
+def main():
+    """Runs the benchmark."""
+    encoding = tiktoken.get_encoding("cl100k_base")
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, Config.LLM_MAX_PROMPT_TOKENS)
+
+    print(f"{'Tracks':>8} {'Whole (ms)':>11} {'Row-wise cold (ms)':>19} {'Row-wise warm (ms)':>19}")
+
+    for tracks_count in TRACKS_COUNTS:
+        playlist_data = {"id": "0001", "name": "My Playlist", "description": "Lorem Ipsum"}
+        playlist = SpotifyPlaylist.from_json(playlist_data, get_playlist_tracks_sample(tracks_count))
+
+        whole_time = benchmark(lambda: generate_whole_prompt(prompt_manager, playlist, encoding))
+        cold_time = benchmark(lambda: generate_row_wise_prompt(prompt_manager, playlist, encoding, cold=True))
+        warm_time = benchmark(lambda: generate_row_wise_prompt(prompt_manager, playlist, encoding, cold=False))
+
+        print(f"{tracks_count:>8} {whole_time * 1000:>11.2f} {cold_time * 1000:>19.2f} {warm_time * 1000:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
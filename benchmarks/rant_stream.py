@@ -0,0 +1,113 @@
+"""
+Benchmark of the time to first byte of the rant endpoints.
+
+Compares the blocking rate endpoint with its streaming version, with fake Spotify and LLM backends with latency: the
+time to the first byte, to the first rendered field of the rant (streaming only), and to the whole rant.
+
+    python -m benchmarks.rant_stream
+"""
+
+import time
+
+from unittest import mock
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from app import create_app, llm_client
+from app.api.spotify import SpotifyClient
+from benchmarks.rant_prompt_pipeline import FakeSpotify
+
+
+TRACKS_COUNT = 1_000
+SPOTIFY_LATENCY = 0.05
+LLM_FIRST_TOKEN_LATENCY = 0.5
+LLM_TOKEN_LATENCY = 0.02
+
+RANT_CONTENT = '{"facts": "Lorem Ipsum", "review": "' + "Dolor sit amet. " * 100 + '", "rating": 7}'
+
+
+class FakeLatencySpotify(FakeSpotify):
+    """Fake Spotify API backend, with latency on each request."""
+
+    def playlist(self, playlist_id, fields=None):
+        """Gets the playlist metadata."""
+        time.sleep(SPOTIFY_LATENCY)
+
+        return {"id": playlist_id, "name": "My Playlist", "snapshot_id": "1", "tracks": {"total": self.tracks_count}}
+
+    def playlist_tracks(self, playlist_id, fields=None, limit=100, offset=0):
+        """Gets a page of the playlist tracks."""
+        time.sleep(SPOTIFY_LATENCY)
+
+        return super().playlist_tracks(playlist_id, fields, limit, offset)
+
+
+class FakeLLM:
+    """Fake LLM that generates the rant content a few characters (a token) at a time."""
+
+    def get_tokens(self):
+        """Gets the tokens of the rant content."""
+        return [RANT_CONTENT[index:][:4] for index in range(0, len(RANT_CONTENT), 4)]
+
+    def invoke(self, prompt):
+        """Gets the whole response, once all of its tokens are generated."""
+        time.sleep(LLM_FIRST_TOKEN_LATENCY + LLM_TOKEN_LATENCY * len(self.get_tokens()))
+
+        return AIMessage(content=RANT_CONTENT)
+
+    def stream(self, prompt):
+        """Streams the tokens of the response as they are generated."""
+        time.sleep(LLM_FIRST_TOKEN_LATENCY)
+
+        for token in self.get_tokens():
+            time.sleep(LLM_TOKEN_LATENCY)
+            yield AIMessageChunk(content=token)
+
+
+def create_fake_spotify_client():
+    """Creates a Spotify Client with the fake backend."""
+    spotify = SpotifyClient("dummy_access_token")
+    spotify.spotify_api_client.spotify = FakeLatencySpotify(TRACKS_COUNT)
+
+    return spotify
+
+
+def measure(client, url):
+    """Gets the time to the first byte, to the first rant field (if streamed) and to the whole response, in seconds."""
+    start_time = time.perf_counter()
+
+    response = client.post(url, data={"playlist": "0001", "regenerate": "true"}, buffered=False)
+    chunks = iter(response.response)
+
+    next(chunks)
+    first_byte_time = time.perf_counter() - start_time
+    first_field_time = None
+
+    for chunk in chunks:
+        if first_field_time is None and chunk.startswith(b"event: partial") and b"review" in chunk:
+            first_field_time = time.perf_counter() - start_time
+
+    return first_byte_time, first_field_time, time.perf_counter() - start_time
+
+
+def main():
+    """Runs the benchmark."""
+    app = create_app("test")
+    llm_client.llm = FakeLLM()
+
+    client = app.test_client()
+
+    with client.session_transaction() as session:
+        session["token_info"] = {"access_token": "dummy_access_token", "expires_at": time.time() + 3600}
+
+    print(f"{'Endpoint':<20} {'First byte (s)':>15} {'First field (s)':>16} {'Total (s)':>10}")
+
+    with mock.patch("app.services.rant.create_spotify_client", create_fake_spotify_client):
+        for url in ["/rant/rate", "/rant/rate/stream"]:
+            first_byte_time, first_field_time, total_time = measure(client, url)
+            first_field = f"{first_field_time:.2f}" if first_field_time is not None else "-"
+
+            print(f"{url:<20} {first_byte_time:>15.2f} {first_field:>16} {total_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import random
+
+
+MARKETS = ["AR", "AU", "BR", "CA", "DE", "ES", "FR", "GB", "IT", "JP", "MX", "NL", "PT", "SE", "US"] * 12
+
+WORDS = [
+    "love", "night", "city", "blue", "fire", "dream", "heart", "road", "summer", "ghost",
+    "light", "dance", "river", "gold", "storm", "echo", "neon", "wild", "silver", "moon",
+]  # fmt: skip
+
+
+def get_name(rng: random.Random, words_count: int) -> str:
+    """Gets a random title-cased name with the given number of words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words_count)).title()
+
+
+def get_images(url_id: str):
+    """Gets the Spotify images data of the given id."""
+    return [
+        {"url": f"https://i.scdn.co/image/{url_id}{size}", "height": size, "width": size} for size in (640, 300, 64)
+    ]
+
+
+def get_artist_sample(index: int, rng: random.Random):
+    """Gets a simplified Spotify Artist data sample."""
+    artist_id = f"artist{index:018}"
+
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "href": f"https://api.spotify.com/v1/artists/{artist_id}",
+        "id": artist_id,
+        "name": get_name(rng, rng.randint(1, 3)),
+        "type": "artist",
+        "uri": f"spotify:artist:{artist_id}",
+    }
+
+
+def get_album_sample(index: int, artists, rng: random.Random):
+    """Gets a simplified Spotify Album data sample."""
+    album_id = f"album{index:019}"
+
+    return {
+        "album_type": rng.choice(["album", "single", "compilation"]),
+        "total_tracks": rng.randint(1, 20),
+        "available_markets": MARKETS,
+        "external_urls": {"spotify": f"https://open.spotify.com/album/{album_id}"},
+        "href": f"https://api.spotify.com/v1/albums/{album_id}",
+        "id": album_id,
+        "images": get_images(album_id),
+        "name": get_name(rng, rng.randint(1, 4)),
+        "release_date": f"{rng.randint(1960, 2024)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}",
+        "release_date_precision": "day",
+        "type": "album",
+        "uri": f"spotify:album:{album_id}",
+        "artists": artists,
+    }
+
+
+def get_playlist_tracks_sample(tracks_count: int, albums_count: int = None, artists_count: int = None, seed: int = 0):
+    """
+    Gets a synthetic Spotify Playlist Tracks data sample, shaped like the full track objects of the Spotify API.
+
+    Fewer albums and artists than tracks make an album-heavy playlist, where they repeat over many tracks.
+    """
+    rng = random.Random(seed)
+
+    artists = [get_artist_sample(index, rng) for index in range(artists_count or tracks_count)]
+    albums = [get_album_sample(index, [rng.choice(artists)], rng) for index in range(albums_count or tracks_count)]
+
+    playlist_tracks = []
+
+    for index in range(tracks_count):
+        track_id = f"track{index:019}"
+        album = albums[index % len(albums)]
+
+        playlist_tracks.append(
+            {
+                "added_at": "2024-01-01T00:00:00Z",
+                "is_local": False,
+                "track": {
+                    "album": album,
+                    "artists": album["artists"] + rng.sample(artists, rng.randint(0, 2)),
+                    "available_markets": MARKETS,
+                    "disc_number": 1,
+                    "duration_ms": rng.randint(90_000, 420_000),
+                    "explicit": rng.random() < 0.2,
+                    "external_ids": {"isrc": f"USRC1{index:07}"},
+                    "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+                    "href": f"https://api.spotify.com/v1/tracks/{track_id}",
+                    "id": track_id,
+                    "is_local": False,
+                    "name": get_name(rng, rng.randint(1, 5)),
+                    "popularity": rng.randint(0, 100),
+                    "preview_url": f"https://p.scdn.co/mp3-preview/{track_id}",
+                    "track_number": rng.randint(1, 12),
+                    "type": "track",
+                    "uri": f"spotify:track:{track_id}",
+                },
+            }
+        )
+
+    return playlist_tracks
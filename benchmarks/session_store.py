@@ -0,0 +1,116 @@
+"""
+Benchmark of the load and the save of a session, in each session store, as the number of stored sessions grows.
+
+Each store is filled with the given numbers of sessions, then the time of loading and of saving a random session is
+measured (as Flask-Session does on each request). A tenth of the sessions of the "sqlite" store are expired, and the
+time of sweeping a batch of them is measured. The "filesystem" store is only filled up to `MAX_FILESYSTEM_SESSIONS`,
+as writing a million files takes a long time.
+
+    python -m benchmarks.session_store [SESSIONS_COUNT ...]
+"""
+
+import sys
+import time
+import pickle
+import random
+import tempfile
+
+from cachelib import FileSystemCache, SimpleCache
+
+from app.api.sqlite_cache import SQLiteCache
+
+
+SESSIONS_COUNTS = [10_000, 100_000, 1_000_000]
+MAX_FILESYSTEM_SESSIONS = 100_000
+OPERATIONS_COUNT = 2_000
+TIMEOUT = 31 * 24 * 60 * 60
+
+
+def get_session(index: int) -> dict:
+    """Gets the data of a session, as the ones of a logged in user."""
+    return {
+        "_permanent": False,
+        "token_info": {
+            "access_token": f"access-token-{index}-" + "x" * 200,
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "refresh_token": f"refresh-token-{index}-" + "x" * 100,
+            "scope": "playlist-read-collaborative playlist-read-private user-library-read",
+            "expires_at": int(time.time()) + 3600,
+        },
+    }
+
+
+def fill_store(store, store_name: str, sessions_count: int):
+    """Fills the given store with the given number of sessions, a tenth of them expired."""
+    if store_name == "sqlite":
+        now = time.time()
+        rows = (
+            (f"session:{index}", pickle.dumps(get_session(index)), now + (-1 if index % 10 == 0 else TIMEOUT))
+            for index in range(sessions_count)
+        )
+        connection = store.connect()
+        connection.execute("BEGIN")
+        connection.executemany("INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?)", rows)
+        connection.execute("COMMIT")
+        return
+
+    for index in range(sessions_count):
+        store.set(f"session:{index}", get_session(index), timeout=TIMEOUT)
+
+
+def create_store(store_name: str, directory: str, sessions_count: int):
+    """Creates the given empty store, in the given directory."""
+    match store_name:
+        case "memory":
+            return SimpleCache(threshold=sessions_count + OPERATIONS_COUNT)
+        case "sqlite":
+            return SQLiteCache(f"{directory}/sessions.sqlite3", sweep_interval=float("inf"))
+        case "filesystem":
+            return FileSystemCache(cache_dir=f"{directory}/sessions", threshold=0)
+
+
+def measure(run) -> float:
+    """Gets the mean time of the given run, over the operations, in microseconds."""
+    start_time = time.perf_counter()
+
+    for _ in range(OPERATIONS_COUNT):
+        run()
+
+    return (time.perf_counter() - start_time) / OPERATIONS_COUNT * 1e6
+
+
+def main():
+    """Runs the benchmark."""
+    sessions_counts = [int(count) for count in sys.argv[1:]] or SESSIONS_COUNTS
+
+    print(f"{'Sessions':>9} {'Store':<11} {'Load (us)':>10} {'Save (us)':>10} {'Sweep (ms)':>11}")
+
+    for sessions_count in sessions_counts:
+        for store_name in ["memory", "sqlite", "filesystem"]:
+            if store_name == "filesystem" and sessions_count > MAX_FILESYSTEM_SESSIONS:
+                print(f"{sessions_count:>9} {store_name:<11} {'-':>10} {'-':>10} {'-':>11}")
+                continue
+
+            with tempfile.TemporaryDirectory() as directory:
+                store = create_store(store_name, directory, sessions_count)
+                fill_store(store, store_name, sessions_count)
+
+                # Loads the sessions that aren't expired, as only a tenth of those of the "sqlite" store are.
+                keys = [f"session:{random.randrange(sessions_count) // 10 * 10 + 1}" for _ in range(OPERATIONS_COUNT)]
+                keys = iter(keys * 2)
+
+                load_time = measure(lambda: store.get(next(keys)))
+                save_time = measure(lambda: store.set(next(keys), get_session(0), timeout=TIMEOUT))
+
+                sweep = ""
+                if store_name == "sqlite":
+                    start_time = time.perf_counter()
+                    store.sweep(force=True)
+                    sweep = f"{(time.perf_counter() - start_time) * 1000:.1f}"
+
+                print(f"{sessions_count:>9} {store_name:<11} {load_time:>10.1f} {save_time:>10.1f} {sweep:>11}")
+
+
+if __name__ == "__main__":
+    main()
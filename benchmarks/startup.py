@@ -0,0 +1,97 @@
+"""
+Benchmark of the startup of a worker: the import time and the memory (RSS) of the app.
+
+Each measure runs in a new interpreter. It reports the time and RSS after importing the app, creating it, and warming
+up the LLM Client (see `LLM_WARM_UP`), and whether the heavy langchain modules were imported by then. It then forks a
+worker, as gunicorn does, which generates a prompt: with the app warmed up before the fork (`preload_app`), the
+worker's private memory is only what it allocates, otherwise it imports and loads everything on its own. Linux only,
+as the memory is read from `/proc`.
+
+    python -m benchmarks.startup
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+from benchmarks.samples import get_playlist_tracks_sample
+
+
+HEAVY_MODULES = ["langchain_openai", "langchain_core.output_parsers"]
+
+
+def get_memory_mb() -> dict:
+    """Gets the resident memory of this process, and its private part (not shared with its parent), in MB."""
+    with open("/proc/self/smaps_rollup") as smaps:
+        fields = dict(line.split(":", 1) for line in smaps.read().splitlines()[1:])
+
+    def get_field_mb(name):
+        return int(fields[name].split()[0]) / 1024
+
+    return {"rss": get_field_mb("Rss"), "private": get_field_mb("Private_Clean") + get_field_mb("Private_Dirty")}
+
+
+def measure(warm_up: bool):
+    """Measures the startup of the app in this process, and of a forked worker, printing the results as JSON."""
+    results = []
+
+    def add_result(step, start_time):
+        heavy_modules = all(module in sys.modules for module in HEAVY_MODULES)
+        results.append({"step": step, "ms": (time.perf_counter() - start_time) * 1000, "heavy": heavy_modules})
+        results[-1].update(get_memory_mb())
+
+    start_time = time.perf_counter()
+    import app
+
+    add_result("import", start_time)
+
+    start_time = time.perf_counter()
+    app.create_app("test")
+    add_result("create_app", start_time)
+
+    if warm_up:
+        start_time = time.perf_counter()
+        app.llm_client.warm_up()
+        add_result("warm_up", start_time)
+
+    from app.models.spotify import SpotifyPlaylist
+
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(1000))
+    read_fd, write_fd = os.pipe()
+
+    if os.fork() == 0:
+        start_time = time.perf_counter()
+        app.llm_client.rate_prompt_manager.generate_prompt(playlist, app.llm_client.encoding)
+        add_result("worker", start_time)
+
+        os.write(write_fd, json.dumps(results[-1]).encode())
+        os._exit(0)
+
+    os.wait()
+    results.append(json.loads(os.read(read_fd, 4096)))
+
+    print(json.dumps(results))
+
+
+def main():
+    """Runs the benchmark."""
+    print(f"{'Warm up':<8} {'Step':<11} {'Time (ms)':>10} {'RSS (MB)':>9} {'Private (MB)':>13} {'Heavy':>6}")
+
+    for warm_up in [False, True]:
+        command = [sys.executable, "-m", "benchmarks.startup", "--measure", "--warm-up" if warm_up else ""]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+
+        for result in json.loads(output.splitlines()[-1]):
+            print(
+                f"{str(warm_up):<8} {result['step']:<11} {result['ms']:>10.1f} {result['rss']:>9.1f} "
+                f"{result['private']:>13.1f} {str(result['heavy']):>6}"
+            )
+
+
+if __name__ == "__main__":
+    if "--measure" in sys.argv:
+        measure(warm_up="--warm-up" in sys.argv)
+    else:
+        main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the sampling of the tracks that don't fit in the prompt.
+
+Compares the "head" and "sample" selections of the rant prompt: the time to generate the prompt (with a warm track
+tokens cache, as the playlist is sampled again on each snapshot), and how many of the decades, artists and albums of
+the playlist its tracks cover. The time of the stratified order alone shows it grows about linearly with the playlist.
+
+    python -m benchmarks.tracks_sampling
+"""
+
+import timeit
+import tiktoken
+
+from app.api.llm import RantPromptManager
+from app.helpers.sampling import get_stratified_order, get_track_strata
+from app.models.llm import Review
+from app.models.spotify import SpotifyPlaylist
+from app.prompts import prompts
+from benchmarks.samples import get_playlist_tracks_sample
+from config import Config
+
+
+TRACKS_COUNTS = [1_000, 10_000, 50_000]
+
+
+def get_strata_counts(tracks) -> str:
+    """Gets the number of distinct decades, artists and albums of the given tracks (the strata)."""
+    strata = [get_track_strata(track) for track in tracks]
+
+    return "/".join(str(len({track_strata[level] for track_strata in strata})) for level in range(3))
+
+
+def get_used_tracks(playlist, prompt):
+    """Gets the tracks of the given playlist whose row is in the given prompt (their names are unique)."""
+    return [track for track in playlist.tracks if f"\n{track.name}," in prompt]
+
+
+def benchmark(run, repeat: int = 3) -> float:
+    """Gets the best time, in seconds, of the given run."""
+    return min(timeit.Timer(run).repeat(repeat=repeat, number=1))
+
+
+def main():
+    """Runs the benchmark."""
+    encoding = tiktoken.get_encoding("cl100k_base")
+
+    print(f"{'Tracks':>7} {'Selection':<10} {'Prompt (ms)':>12} {'Order (ms)':>11} {'Used':>6} {'Strata':>12}")
+
+    for tracks_count in TRACKS_COUNTS:
+        playlist_tracks_data = get_playlist_tracks_sample(tracks_count, tracks_count // 10, tracks_count // 20)
+
+        for index, playlist_track_data in enumerate(playlist_tracks_data):
+            playlist_track_data["track"]["name"] += f" {index}"
+
+        playlist_data = {"id": "0001", "name": "My Playlist", "snapshot_id": "1", "tracks": {"total": tracks_count}}
+        playlist = SpotifyPlaylist.from_json(playlist_data, playlist_tracks_data)
+
+        order_time = benchmark(lambda: get_stratified_order(playlist.tracks, "0001:1"))
+
+        strata_counts = get_strata_counts(playlist.tracks)
+        print(f"{tracks_count:>7} {'all':<10} {'':>12} {'':>11} {tracks_count:>6} {strata_counts:>12}")
+
+        for tracks_selection in ["head", "sample"]:
+            prompt_manager = RantPromptManager(
+                Review,
+                prompts.rate_prompt_template,
+                Config.LLM_MAX_PROMPT_TOKENS,
+                tracks_selection=tracks_selection,
+            )
+
+            prompt = prompt_manager.generate_prompt(playlist, encoding)
+            prompt_time = benchmark(lambda: prompt_manager.generate_prompt(playlist, encoding))
+
+            used_tracks = get_used_tracks(playlist, prompt)
+            selection_order_time = f"{order_time * 1000:.2f}" if tracks_selection == "sample" else ""
+
+            print(
+                f"{tracks_count:>7} {tracks_selection:<10} {prompt_time * 1000:>12.2f} {selection_order_time:>11} "
+                f"{len(used_tracks):>6} {get_strata_counts(used_tracks):>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 from flask_caching.backends.filesystemcache import FileSystemCache
+from flask_caching.backends.simplecache import SimpleCache
 
 
 class Config(object):
@@ -16,13 +17,46 @@ class Config(object):
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
     SESSION_TYPE = "cachelib"
-    SESSION_CACHELIB = FileSystemCache(cache_dir="/tmp/flask_session")
+
+    # Store of the sessions (see `create_session_store`): "memory" for a single process, "sqlite" to share them with
+    # the other workers, sweeping the expired ones, in the database of the path, or "filesystem" for a file per session,
+    # in the directory.
+    SESSION_STORE = "sqlite"
+    SESSION_STORE_PATH = "/tmp/rantify/sessions.sqlite3"
+    SESSION_STORE_DIR = "/tmp/rantify/sessions"
+    SESSION_STORE_THRESHOLD = 10_000
+    SESSION_STORE_SWEEP_INTERVAL = 60
+
+    # Only writes the sessions back to the store when they change.
+    SESSION_REFRESH_EACH_REQUEST = False
 
     # LLM configurations
     LLM_MODEL = os.getenv("OPENAI_LLM_MODEL")
     LLM_MAX_PROMPT_TOKENS = 12288
     LLM_MAX_RETRY_ATTEMPTS = 3
 
+    # Directory of the tokenizer BPE files (tiktoken's cache), so the encoding is loaded from the bundled or cached file
+    # instead of being downloaded. A missing file is downloaded into it the first time, e.g. while building the app.
+    LLM_TOKENIZER_CACHE_DIR = os.getenv("LLM_TOKENIZER_CACHE_DIR")
+
+    # Imports and creates the LLM, the encoding and the prompts when the app is created, instead of on the first rant.
+    # Used with gunicorn's `preload_app`, so they are created once and shared by all the workers.
+    LLM_WARM_UP = False
+
+    # Constrains the LLM responses to valid JSON objects (OpenAI's JSON mode).
+    LLM_JSON_MODE = True
+
+    # Seconds to wait before the first retry of a response that couldn't be parsed, doubled on each retry.
+    LLM_RETRY_BACKOFF = 0.5
+
+    # Format of the tracks in the prompt (see `TRACKS_SERIALIZERS`), compared by `benchmarks.prompt_tracks_formats`.
+    LLM_TRACKS_FORMAT = "csv"
+
+    # Selection of the tracks of the prompt when they don't all fit in it (see `TRACKS_SELECTIONS`): "head" stops
+    # fetching once the first ones fill the prompt, while "sample" (opt-in) fetches all of them to pick a representative
+    # sample.
+    LLM_TRACKS_SELECTION = "head"
+
     # Spotify configurations
     SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
     SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
@@ -33,6 +67,54 @@ class Config(object):
         "user-library-read",  # Read access to a user's library.
     ]
 
+    # Maximum number of concurrent requests to the Spotify API, when fetching the pages of a paginated result.
+    SPOTIFY_MAX_CONCURRENT_REQUESTS = 8
+
+    # Maximum number of kept-alive connections per host, shared by all the Spotify clients of a worker.
+    SPOTIFY_HTTP_POOL_SIZE = 16
+
+    # Spotify cache configurations
+    # Shared by all the workers, evicting the oldest entries when over the threshold.
+    SPOTIFY_PLAYLIST_CACHE = FileSystemCache(cache_dir="/tmp/rantify/playlists", threshold=500)
+    SPOTIFY_PLAYLIST_CACHE_TIMEOUT = 24 * 60 * 60
+
+    # Rant cache configurations
+    # Shared by all the workers, evicting the least recently used entries when over the threshold.
+    RANT_CACHE = FileSystemCache(cache_dir="/tmp/rantify/rants", threshold=1000)
+    RANT_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+    # Rant jobs configurations
+    # Rants generated in the background, by a pool of threads of each worker, up to a maximum of queued or running jobs.
+    RANT_JOBS_MAX_WORKERS = 4
+    RANT_JOBS_MAX_QUEUE_DEPTH = 64
+    # Seconds a job, and its result, is kept after it's submitted.
+    RANT_JOBS_TIMEOUT = 60 * 60
+    # Maximum seconds a status request waits for its job to finish (long polling).
+    RANT_JOBS_MAX_WAIT = 30
+    # SQLite database of the jobs, shared by the workers and kept over their restarts (in memory when not set).
+    RANT_JOBS_DATABASE = "/tmp/rantify/jobs.sqlite3"
+
+    # Single flight configurations
+    # SQLite database of the locks of the rants being generated, shared by the workers, so an identical request of
+    # another worker waits for the rant instead of generating it again (only coalesced within a worker when not set).
+    SINGLE_FLIGHT_LOCK_DATABASE = "/tmp/rantify/flights.sqlite3"
+    # Seconds a lock is held at most, in case its worker dies, and between the checks of the workers waiting on it.
+    SINGLE_FLIGHT_LOCK_TIMEOUT = 120
+    SINGLE_FLIGHT_POLL_INTERVAL = 0.25
+
+    # HTTP cache configurations
+    # Cache-Control of the responses, by endpoint or blueprint (the most specific one applies), or else the default.
+    # The static files have the hash of their content in their URLs, so they can be cached for a year. The rants are
+    # revalidated with their ETags, and the pages of a user aren't stored at all.
+    CACHE_CONTROL_DEFAULT = "private, no-store"
+    CACHE_CONTROL_POLICIES = {
+        "static": "public, max-age=31536000, immutable",
+        "rant": "private, no-cache",
+    }
+
+    # Cache-Control of the static files found without the hash of their current content in their URLs (or not found).
+    CACHE_CONTROL_UNVERSIONED_STATIC = "public, max-age=3600"
+
 
 class DevelopmentConfig(Config):
     """Set Development Flask configuration variables."""
@@ -46,12 +128,23 @@ class ProductionConfig(Config):
 
     SESSION_COOKIE_SECURE = True
 
+    LLM_WARM_UP = True
+
 
 class TestConfig(Config):
     """Set Test Flask configuration variables."""
 
     TESTING = True
 
+    SESSION_STORE = "memory"
+
+    SPOTIFY_PLAYLIST_CACHE = SimpleCache(threshold=500)
+    RANT_CACHE = SimpleCache(threshold=1000)
+    RANT_JOBS_DATABASE = None
+    SINGLE_FLIGHT_LOCK_DATABASE = None
+
+    LLM_RETRY_BACKOFF = 0
+
 
 configs_by_name = {
     "development": DevelopmentConfig,
@@ -0,0 +1,14 @@
+import gc
+
+
+# Loads the app once in the master process, before forking the workers, so the modules and the objects created when
+# the app is created (e.g. the LLM encoding, see `LLM_WARM_UP`) are shared copy-on-write by all the workers.
+preload_app = True
+
+worker_class = "gthread"
+threads = 8
+
+
+def when_ready(server):
+    """Freezes the objects of the preloaded app, so the garbage collector doesn't copy their pages into each worker."""
+    gc.freeze()
@@ -0,0 +1,466 @@
+import os
+import re
+import sys
+import pytest
+import subprocess
+
+from flask import Flask
+from pathlib import Path
+from langchain.prompts import PromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+from langchain_core.messages import AIMessage, AIMessageChunk
+from pytest_mock import MockerFixture
+
+from app import llm_client
+from app.api import llm as llm_module
+from app.api.llm import RantPromptManager, repair_response
+from app.helpers.metrics import StageTimer
+from app.models.llm import Review, Rhyme
+from app.models.spotify import SpotifyPlaylist
+from app.helpers.sampling import get_stratified_order, get_track_strata
+from app.helpers.spotify import playlist_to_csv, tracks_to_csv, tracks_to_csv_rows, TRACKS_SERIALIZERS
+from app.helpers.spotify import AlbumGroupedTracksSerializer
+from app.prompts import prompts
+
+
+def get_playlist_tracks_sample(tracks_count):
+    """Gets a Spotify Playlist Tracks data sample with the given number of tracks."""
+    return [
+        {
+            "track": {
+                "id": f"track-{index}",
+                "name": f"Track, {index}",
+                "artists": [{"id": f"artist-{index % 7}", "name": f"Artist '{index % 7}'"}],
+                "album": {"id": f"album-{index % 3}", "name": f"Album {index % 3}", "release_date": "1999-01-01"},
+            }
+        }
+        for index in range(tracks_count)
+    ]
+
+
+def get_baseline_prompt(parser_model, prompt_template, playlist: SpotifyPlaylist):
+    """Gets the prompt of the given playlist as the baseline generated it, from the whole playlist at once."""
+    prompt_template = PromptTemplate(
+        template=prompt_template,
+        input_variables=["playlist", "tracks"],
+        partial_variables={
+            "format_instructions": PydanticOutputParser(pydantic_object=parser_model).get_format_instructions()
+        },
+    )
+
+    return prompt_template.format(playlist=playlist_to_csv(playlist), tracks=tracks_to_csv(playlist.tracks))
+
+
+def test_generate_prompt_from_tracks_pages_matches_the_baseline(app: Flask):
+    """Test that the prompt streamed from the tracks pages is the one the baseline generated for the whole playlist."""
+    playlist_data = {"id": "0001", "name": "My Playlist", "description": "Lorem Ipsum", "tracks": {"total": 251}}
+    playlist_tracks_data = get_playlist_tracks_sample(250)
+    playlist_tracks_data.insert(120, {"track": None})
+
+    playlist = SpotifyPlaylist.from_json(playlist_data, playlist_tracks_data)
+    pages_data = [playlist_tracks_data[:100], playlist_tracks_data[100:200], playlist_tracks_data[200:]]
+    tracks_pages = (SpotifyPlaylist.tracks_from_json(page_data) for page_data in pages_data)
+
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, 100_000)
+    timer = StageTimer()
+
+    baseline_prompt = get_baseline_prompt(Review, prompts.rate_prompt_template, playlist)
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+    streamed_prompt = prompt_manager.generate_prompt(
+        SpotifyPlaylist.from_json(playlist_data), llm_client.encoding, tracks_pages, timer
+    )
+
+    assert prompt == baseline_prompt
+    assert streamed_prompt == baseline_prompt
+    assert set(timer.as_dict()) == {"serialize", "format", "encode"}
+
+
+@pytest.mark.parametrize("tracks_selection", ["head", "sample"])
+def test_generate_prompt_counts_the_parsed_tracks(app: Flask, tracks_selection):
+    """Test that the number of tracks of a prompt that isn't cut short doesn't count the unavailable tracks."""
+    playlist_data = {"id": "0001", "name": "P", "description": "D", "tracks": {"total": 21}}
+    playlist_tracks_data = get_playlist_tracks_sample(20) + [{"track": None}]
+
+    playlist = SpotifyPlaylist.from_json(playlist_data, playlist_tracks_data)
+
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, 100_000, tracks_selection=tracks_selection)
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+
+    assert "P,D,20\r\n" in prompt
+    assert "P,D,21" not in prompt
+
+
+def test_generate_prompt_from_tracks_pages_is_cut_identically(app: Flask):
+    """Test that the prompt streamed from the tracks pages is cut short like the one of the whole playlist."""
+    playlist_data = {"id": "0001", "name": "My Playlist", "description": "Lorem Ipsum", "tracks": {"total": 251}}
+    playlist_tracks_data = get_playlist_tracks_sample(250)
+    playlist_tracks_data.insert(120, {"track": None})
+
+    playlist = SpotifyPlaylist.from_json(playlist_data, playlist_tracks_data)
+    pages_data = [playlist_tracks_data[:100], playlist_tracks_data[100:200], playlist_tracks_data[200:]]
+    tracks_pages = (SpotifyPlaylist.tracks_from_json(page_data) for page_data in pages_data)
+
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, 500)
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+    streamed_prompt = prompt_manager.generate_prompt(
+        SpotifyPlaylist.from_json(playlist_data), llm_client.encoding, tracks_pages
+    )
+
+    assert streamed_prompt == prompt
+    assert "My Playlist,Lorem Ipsum,251" in prompt
+    assert prompt.endswith(prompt_manager.get_limit_exceeded_message(prompt_manager.counters.get("tracks_used"), 251))
+
+
+def test_generate_prompt_stops_consuming_pages_over_the_token_budget(app: Flask):
+    """Test that the tracks pages are no longer consumed once the prompt overflows its tokens budget."""
+    playlist_data = {"id": "0001", "name": "My Playlist", "description": "Lorem Ipsum", "tracks": {"total": 10_000}}
+    playlist = SpotifyPlaylist.from_json(playlist_data)
+
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, 0)
+    prompt_without_tracks = prompt_manager.prompt_template.format(playlist="", tracks="")
+    prompt_manager.max_prompt_tokens = len(llm_client.encoding.encode(prompt_without_tracks)) + 2000
+
+    consumed_pages = []
+
+    def iter_tracks_pages():
+        for offset in range(0, 10_000, 100):
+            consumed_pages.append(offset)
+            yield SpotifyPlaylist.tracks_from_json(get_playlist_tracks_sample(100))
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding, iter_tracks_pages())
+
+    counters = prompt_manager.counters.as_dict()
+
+    assert len(consumed_pages) <= 2
+    assert prompt.endswith(prompt_manager.get_limit_exceeded_message(counters["tracks_used"], 10_000))
+    assert "My Playlist,Lorem Ipsum,10000" in prompt
+
+    assert counters["tracks_fetched"] == len(consumed_pages) * 100
+    assert 0 < counters["tracks_used"] < counters["tracks_fetched"]
+
+
+def test_llm_client_reports_tracks_metrics(app: Flask):
+    """Test that the prompt managers of the LLM Client report to its tracks metrics."""
+    assert llm_client.rate_prompt_manager.counters is llm_client.counters
+    assert llm_client.roast_prompt_manager.counters is llm_client.counters
+    assert llm_client.rhyme_prompt_manager.counters is llm_client.counters
+
+    tracks_fetched = llm_client.counters.get("tracks_fetched")
+    tracks_used = llm_client.counters.get("tracks_used")
+
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(10))
+    llm_client.roast_prompt_manager.generate_prompt(playlist, llm_client.encoding)
+
+    stats = llm_client.stats()
+
+    assert stats["tracks_fetched"] == tracks_fetched + 10
+    assert stats["tracks_used"] == tracks_used + 10
+    assert 0 < stats["tracks_used_ratio"] <= 1
+
+
+def test_generate_prompt_cuts_on_row_boundaries(app: Flask):
+    """Test that an overflowing prompt is cut after its last fitting track row, counting the limit exceeded message."""
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(1000))
+
+    prompt_manager = RantPromptManager(Review, prompts.rhyme_prompt_template, 0)
+    prompt_without_tracks = prompt_manager.prompt_template.format(playlist="", tracks="")
+    prompt_manager.max_prompt_tokens = len(llm_client.encoding.encode(prompt_without_tracks)) + 1000
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+    used_tracks_count = prompt_manager.counters.get("tracks_used")
+    prompt_data = prompt.removesuffix(prompt_manager.get_limit_exceeded_message(used_tracks_count, 1000))
+
+    last_track, next_track = playlist.tracks[used_tracks_count - 1], playlist.tracks[used_tracks_count]
+    last_row, next_row = tracks_to_csv_rows([last_track, next_track])
+
+    assert prompt_data != prompt
+    assert prompt_data.endswith(last_row)
+    assert next_row not in prompt_data
+    assert len(llm_client.encoding.encode(prompt)) <= prompt_manager.max_prompt_tokens
+    assert "My Playlist,,1000" in prompt
+
+
+def test_generate_prompt_caches_track_rows_tokens(app: Flask, mocker: MockerFixture):
+    """Test that the tokens of each track row are counted once, and then taken from the cache."""
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(100))
+
+    prompt_manager = RantPromptManager(Review, prompts.rate_prompt_template, 100_000)
+    prompt_manager.generate_prompt(playlist, llm_client.encoding)
+
+    spy_encode = mocker.spy(llm_client.encoding, "encode_ordinary")
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+
+    # Only the playlist data and the tracks header, as the prompt template tokens are also cached.
+    assert spy_encode.call_count == 2
+    assert "The data exceeded the maximum context tokens" not in prompt
+    assert prompt_manager.counters.as_dict() == {"tracks_fetched": 200, "tracks_used": 200}
+
+
+@pytest.mark.parametrize("tracks_format", TRACKS_SERIALIZERS)
+@pytest.mark.parametrize("tracks_tokens", [100_000, 1000])
+def test_generate_prompt_in_each_tracks_format(app: Flask, tracks_format, tracks_tokens):
+    """Test that the prompt can be generated in each tracks format, within its tokens budget."""
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(250))
+
+    prompt_manager = RantPromptManager(Review, prompts.roast_prompt_template, 0, tracks_format=tracks_format)
+    default_prompt_manager = RantPromptManager(Review, prompts.roast_prompt_template, 0)
+
+    prompt_without_tracks = prompt_manager.prompt_template.format(playlist="", tracks="")
+    max_prompt_tokens = len(llm_client.encoding.encode(prompt_without_tracks)) + tracks_tokens
+    prompt_manager.max_prompt_tokens = max_prompt_tokens
+    default_prompt_manager.max_prompt_tokens = max_prompt_tokens
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+
+    header = TRACKS_SERIALIZERS[tracks_format]().get_header()
+    used_tracks_count = prompt_manager.counters.get("tracks_used")
+
+    assert header in prompt
+    assert len(llm_client.encoding.encode(prompt)) <= max_prompt_tokens
+    assert "Track, 0" in prompt
+    assert (used_tracks_count == 250) == (tracks_tokens == 100_000)
+    assert (prompt_manager.version == default_prompt_manager.version) == (tracks_format == "csv")
+
+
+def test_album_grouped_tracks_serializer_writes_each_run_once():
+    """Test that the album of consecutive tracks is written once, at the start of their run."""
+    tracks_data = get_playlist_tracks_sample(6)
+    tracks_data.sort(key=lambda playlist_track_data: playlist_track_data["track"]["album"]["id"])
+
+    serializer = AlbumGroupedTracksSerializer()
+    rows = serializer.get_rows(SpotifyPlaylist.tracks_from_json(tracks_data[:3]))
+    rows += serializer.get_rows(SpotifyPlaylist.tracks_from_json(tracks_data[3:]))
+
+    assert [row for _, row in rows] == [
+        "[Album 0 | 1999-01-01]\nTrack, 0 | Artist '0'\n",
+        "Track, 3 | Artist '3'\n",
+        "[Album 1 | 1999-01-01]\nTrack, 1 | Artist '1'\n",
+        "Track, 4 | Artist '4'\n",
+        "[Album 2 | 1999-01-01]\nTrack, 2 | Artist '2'\n",
+        "Track, 5 | Artist '5'\n",
+    ]
+    assert rows[0][0] != rows[1][0]
+
+
+def get_decades_playlist_tracks_sample(tracks_count):
+    """Gets a Spotify Playlist Tracks data sample with the given number of tracks, released over six decades."""
+    playlist_tracks_data = get_playlist_tracks_sample(tracks_count)
+
+    for index, playlist_track_data in enumerate(playlist_tracks_data):
+        track_data = playlist_track_data["track"]
+        track_data["album"] = {"id": f"album-{index % 60}", "name": f"Album {index % 60}"}
+        track_data["album"]["release_date"] = f"{1960 + index % 6 * 10}-01-01"
+
+    return playlist_tracks_data
+
+
+@pytest.mark.parametrize("tracks_format", ["csv", "album_groups"])
+def test_generate_prompt_samples_tracks_over_the_token_budget(app: Flask, tracks_format):
+    """Test that a deterministic sample of the tracks, spread over the strata, is used when they don't all fit."""
+    playlist_data = {"id": "0001", "name": "My Playlist", "snapshot_id": "snapshot-1", "tracks": {"total": 1000}}
+    playlist = SpotifyPlaylist.from_json(playlist_data, get_decades_playlist_tracks_sample(1000))
+
+    prompt_manager = RantPromptManager(
+        Review, prompts.rate_prompt_template, 0, tracks_format=tracks_format, tracks_selection="sample"
+    )
+    prompt_without_tracks = prompt_manager.prompt_template.format(playlist="", tracks="")
+    prompt_manager.max_prompt_tokens = len(llm_client.encoding.encode(prompt_without_tracks)) + 1500
+
+    prompt = prompt_manager.generate_prompt(playlist, llm_client.encoding)
+    used_tracks_count = prompt_manager.counters.get("tracks_used")
+
+    assert prompt == prompt_manager.generate_prompt(playlist, llm_client.encoding)
+    assert len(llm_client.encoding.encode(prompt)) <= prompt_manager.max_prompt_tokens
+    assert prompt.endswith(prompt_manager.get_limit_exceeded_message(used_tracks_count, 1000))
+    assert f"only {used_tracks_count} of the 1000 tracks ({used_tracks_count / 1000:.1%})" in prompt
+
+    used_indexes = [int(index) for index in re.findall(r"Track, (\d+)", prompt)]
+    used_strata = [get_track_strata(playlist.tracks[index]) for index in used_indexes]
+
+    assert len(used_indexes) == used_tracks_count
+    assert used_indexes == sorted(used_indexes)
+    assert {decade for decade, _, _ in used_strata} == {1960, 1970, 1980, 1990, 2000, 2010}
+    assert len({artist for _, artist, _ in used_strata}) == 7
+
+
+def test_get_stratified_order_is_deterministic():
+    """Test that the stratified order is a seeded permutation of the tracks, alternating their decades."""
+    tracks = SpotifyPlaylist.tracks_from_json(get_decades_playlist_tracks_sample(120))
+
+    order = get_stratified_order(tracks, "0001:snapshot-1")
+
+    assert sorted(order) == list(range(120))
+    assert order == get_stratified_order(tracks, "0001:snapshot-1")
+    assert order != get_stratified_order(tracks, "0001:snapshot-2")
+    assert len({get_track_strata(tracks[index])[0] for index in order[:6]}) == 6
+
+
+def test_get_stratified_order_is_proportional_to_the_strata():
+    """Test that every prefix of the stratified order takes from each decade in proportion to its number of tracks."""
+    playlist_tracks_data = get_decades_playlist_tracks_sample(1000)
+    decades_sizes = {1960: 3, 1970: 30, 1980: 300, 1990: 667}
+    decades = [decade for decade, size in decades_sizes.items() for _ in range(size)]
+
+    for index, (playlist_track_data, decade) in enumerate(zip(playlist_tracks_data, decades)):
+        album_id = f"album-{decade}-{index % 10}"
+        playlist_track_data["track"]["album"] = {"id": album_id, "name": album_id, "release_date": f"{decade}-01-01"}
+
+    tracks = SpotifyPlaylist.tracks_from_json(playlist_tracks_data)
+    order = get_stratified_order(tracks, "0001:snapshot-1")
+    taken_counts = dict.fromkeys(decades_sizes, 0)
+
+    for position, index in enumerate(order, start=1):
+        taken_counts[get_track_strata(tracks[index])[0]] += 1
+
+        for decade, size in decades_sizes.items():
+            assert abs(taken_counts[decade] - position * size / 1000) < 1
+
+    assert [get_track_strata(tracks[index])[0] for index in order[:10]].count(1960) == 0
+    assert [get_track_strata(tracks[index])[0] for index in order[:100]].count(1990) in (66, 67, 68)
+
+
+def test_stream_rant_retries_unparsable_response(app: Flask, mocker: MockerFixture):
+    """Test that a streamed response that can't be parsed is parsed once, then repaired by the LLM without streaming."""
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(10))
+    content = '{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}'
+
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.stream.return_value = iter([AIMessageChunk(content='{"facts": "Lorem'), AIMessageChunk(content=" Ipsum")])
+    mock_llm.invoke.return_value = AIMessage(content=content)
+    spy_repair_response = mocker.spy(llm_module, "repair_response")
+    parse_failures_count = llm_client.counters.get("parse_failures")
+
+    events = list(llm_client.stream_rant(playlist, llm_client.rate_prompt_manager))
+
+    assert events[0] == ("prompt", None)
+    assert events[1:-1] == [("partial", {"facts": "Lorem"}), ("partial", {"facts": "Lorem Ipsum"})]
+    assert events[-1] == ("rant", Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7))
+    assert mock_llm.invoke.call_count == 1
+    assert spy_repair_response.call_count == 1
+    assert llm_client.counters.get("parse_failures") == parse_failures_count + 1
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '```json\n{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}\n```',
+        'Here is the review: {"facts": ["Lorem", "Ipsum",], "review": "Dolor Sit Amet", "rating": "7/10",}',
+        '{"facts": "Lorem Ipsum", "review": "Dolor\nSit Amet", "rating": "7"}',
+    ],
+)
+def test_repair_response(content):
+    """Test that the common issues of the JSON responses are repaired locally."""
+    review = repair_response(content, Review)
+
+    assert review.rating == 7
+    assert review.review.startswith("Dolor")
+
+
+def test_repair_response_keeps_the_commas_of_the_strings():
+    """Test that only the trailing commas outside of the strings are removed."""
+    content = '{"facts": ["Lorem, ]", "Ipsum \\", }",], "review": "Dolor, } Sit Amet", "rating": 7,}'
+
+    review = repair_response(content, Review)
+
+    assert review.facts == ["Lorem, ]", 'Ipsum ", }']
+    assert review.review == "Dolor, } Sit Amet"
+
+
+def test_repair_response_gives_up_on_invalid_responses():
+    """Test that responses without a valid object of the model aren't repaired."""
+    assert repair_response("Lorem Ipsum", Review) is None
+    assert repair_response('{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet"}', Review) is None
+    assert repair_response('{"facts": "Lorem Ipsum", "stanzas": "Dolor Sit Amet"}', Rhyme) is None
+
+
+def test_get_parsed_response_repairs_locally_before_retrying(app: Flask, mocker: MockerFixture):
+    """Test that a response that can be repaired locally isn't retried."""
+    content = '{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": "7",}'
+
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.invoke.return_value = AIMessage(content=content)
+
+    counters = llm_client.counters.as_dict()
+    review = llm_client.get_parsed_response("Lorem Ipsum", llm_client.rate_prompt_manager.parser)
+
+    assert review == Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    assert mock_llm.invoke.call_count == 1
+    assert llm_client.counters.get("parse_failures") == counters["parse_failures"] + 1
+    assert llm_client.counters.get("repairs") == counters["repairs"] + 1
+    assert llm_client.counters.get("retries") == counters["retries"]
+
+
+def test_get_parsed_response_retries_with_the_bad_output_only(app: Flask, mocker: MockerFixture):
+    """Test that a response that can't be repaired locally is retried with only the bad output and its error."""
+    playlist = SpotifyPlaylist.from_json({"id": "0001", "name": "My Playlist"}, get_playlist_tracks_sample(100))
+    prompt = llm_client.rate_prompt_manager.generate_prompt(playlist, llm_client.encoding)
+    content = '{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}'
+
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.invoke.side_effect = [AIMessage(content="Lorem Ipsum"), AIMessage(content=content)]
+
+    counters = llm_client.counters.as_dict()
+    review = llm_client.get_parsed_response(prompt, llm_client.rate_prompt_manager.parser)
+    repair_prompt = mock_llm.invoke.call_args.args[0]
+
+    assert review == Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    assert "Lorem Ipsum" in repair_prompt
+    assert "Track, 0" not in repair_prompt
+    assert len(repair_prompt) < len(prompt) / 2
+    assert llm_client.counters.get("parse_failures") == counters["parse_failures"] + 1
+    assert llm_client.counters.get("retries") == counters["retries"] + 1
+
+
+def test_app_imports_the_llm_dependencies_lazily():
+    """Test that creating the app doesn't import langchain's parsers and models, which are imported on first use."""
+    code = (
+        "import sys; from app import create_app; create_app('test'); "
+        "print(any(module in sys.modules for module in ['langchain_openai', 'langchain_core.output_parsers']))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).parents[1], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.strip() == "False"
+
+
+def test_tokenizer_cache_dir_keeps_the_tiktoken_one(app: Flask, tmp_path, monkeypatch):
+    """Test that the tokenizer cache directory is set once by the app, and doesn't replace tiktoken's one if set."""
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path / "tiktoken"))
+
+    app.config["LLM_TOKENIZER_CACHE_DIR"] = str(tmp_path)
+    llm_client.init_app(app)
+
+    assert os.environ["TIKTOKEN_CACHE_DIR"] == str(tmp_path / "tiktoken")
+
+    monkeypatch.delenv("TIKTOKEN_CACHE_DIR")
+    llm_client.init_app(app)
+
+    assert os.environ["TIKTOKEN_CACHE_DIR"] == str(tmp_path)
+
+    monkeypatch.delenv("TIKTOKEN_CACHE_DIR")
+    llm_client.encoding
+
+    assert "TIKTOKEN_CACHE_DIR" not in os.environ
+
+
+def test_warm_up_creates_the_llm_and_the_prompts(app: Flask, tmp_path, monkeypatch, mocker: MockerFixture):
+    """Test that the warm up creates the LLM, loads the encoding from the tokenizer cache, and prepares the prompts."""
+    monkeypatch.delenv("TIKTOKEN_CACHE_DIR", raising=False)
+    encoding = llm_client.encoding
+    mock_encoding_for_model = mocker.patch("app.api.llm.tiktoken.encoding_for_model", return_value=encoding)
+
+    app.config["LLM_TOKENIZER_CACHE_DIR"] = str(tmp_path)
+    llm_client.init_app(app)
+    llm_client.warm_up()
+
+    assert "llm" in vars(llm_client)
+    assert mock_encoding_for_model.call_count == 1
+    assert os.environ["TIKTOKEN_CACHE_DIR"] == str(tmp_path)
+
+    for prompt_manager in [llm_client.rate_prompt_manager, llm_client.roast_prompt_manager]:
+        assert "version" in vars(prompt_manager)
+        assert encoding.name in prompt_manager.static_tokens_counts
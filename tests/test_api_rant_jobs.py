@@ -0,0 +1,142 @@
+import os
+import stat
+import pytest
+import sqlite3
+import subprocess
+
+from flask import Flask
+from pytest_mock import MockerFixture
+
+from app import rant_jobs
+from app.api.rant_jobs import SQLiteRantJobStore, get_worker_token
+from app.models.llm import Review, RantType
+
+
+def get_gone_process_id() -> int:
+    """Gets the id of a process that already exited."""
+    process = subprocess.Popen(["true"])
+    process.wait()
+
+    return process.pid
+
+
+def test_sqlite_store_keeps_the_jobs(tmp_path):
+    """Test that the jobs of the SQLite store are kept by a new store of the same database, until they expire."""
+    path = str(tmp_path / "jobs.sqlite3")
+    job = {
+        "id": "job-1",
+        "status": "queued",
+        "rant_type": RantType.RATE.name,
+        "playlist_id": "0001",
+        "regenerate": False,
+        "access_token": "dummy_access_token",
+        "owner": "owner-1",
+        "result": None,
+        "error": None,
+        "worker": "1:1",
+        "created_at": 1000.0,
+        "expires_at": 2000.0,
+    }
+
+    SQLiteRantJobStore(path).add(job)
+
+    store = SQLiteRantJobStore(path)
+    assert store.get_unfinished() == [job]
+
+    SQLiteRantJobStore(path).update("job-1", status="done", result={"rating": 7}, access_token=None)
+
+    store = SQLiteRantJobStore(path)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert store.get("job-1") == {**job, "status": "done", "result": {"rating": 7}, "access_token": None}
+    assert store.get_unfinished() == []
+
+    with pytest.raises(ValueError):
+        store.update("job-1", status="failed", unknown="Lorem Ipsum")
+
+    store.delete_expired(1999.0)
+    assert store.get("job-1") is not None
+
+    store.delete_expired(2000.0)
+    assert store.get("job-1") is None
+
+
+def test_rant_job_queue_resumes_the_jobs_of_gone_workers(app: Flask, tmp_path, mocker: MockerFixture):
+    """Test that the unfinished jobs of a worker that is gone are resumed once the pool of another one starts."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mock_generate_rant = mocker.patch("app.services.rant.generate_rant", return_value=review)
+
+    app.config["RANT_JOBS_DATABASE"] = str(tmp_path / "jobs.sqlite3")
+    rant_jobs.init_app(app)
+
+    job = {
+        "id": "job-1",
+        "status": "running",
+        "rant_type": RantType.ROAST.name,
+        "playlist_id": "0001",
+        "regenerate": True,
+        "access_token": "dummy_access_token",
+        "owner": "owner-1",
+        "result": None,
+        "error": None,
+        "worker": f"{get_gone_process_id()}:1",
+        "created_at": 1000.0,
+        "expires_at": 1e12,
+    }
+    rant_jobs.store.add(job)
+
+    resumed_count = rant_jobs.counters.get("resumed")
+    rant_jobs.get_executor()
+
+    assert rant_jobs.get("job-1", "owner-1", wait=5)["result"] == review.model_dump()
+    assert rant_jobs.counters.get("resumed") == resumed_count + 1
+    mock_generate_rant.assert_called_once_with("0001", RantType.ROAST, True, "dummy_access_token")
+
+
+def test_rant_job_queue_resumes_the_polled_jobs_of_gone_workers(app: Flask, tmp_path, mocker: MockerFixture):
+    """Test that a polled job is resumed if its worker is gone, even if its process id was reused by another one."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mocker.patch("app.services.rant.generate_rant", return_value=review)
+
+    app.config["RANT_JOBS_DATABASE"] = str(tmp_path / "jobs.sqlite3")
+    rant_jobs.init_app(app)
+    rant_jobs.get_executor()
+
+    job = {
+        "id": "job-1",
+        "status": "running",
+        "rant_type": RantType.RATE.name,
+        "playlist_id": "0001",
+        "regenerate": False,
+        "access_token": "dummy_access_token",
+        "owner": "owner-1",
+        "result": None,
+        "error": None,
+        "worker": f"{os.getpid()}:0",
+        "created_at": 1000.0,
+        "expires_at": 1e12,
+    }
+    rant_jobs.store.add(job)
+
+    assert get_worker_token() != job["worker"]
+    assert rant_jobs.get("job-1", "owner-2") is None
+
+    job = rant_jobs.get("job-1", "owner-1", wait=5)
+
+    assert job["status"] == "done"
+    assert job["worker"] == get_worker_token()
+    assert job["access_token"] is None
+
+
+def test_rant_job_queue_releases_the_jobs_that_fail_to_submit(app: Flask, tmp_path, mocker: MockerFixture):
+    """Test that a job that fails to be stored doesn't keep counting in the queue depth."""
+    app.config["RANT_JOBS_DATABASE"] = str(tmp_path / "jobs.sqlite3")
+    rant_jobs.init_app(app)
+
+    queue_depth = rant_jobs.stats()["queue_depth"]
+    mocker.patch.object(rant_jobs.store, "add", side_effect=sqlite3.OperationalError("database is locked"))
+
+    with pytest.raises(sqlite3.OperationalError):
+        rant_jobs.submit("0001", RantType.RATE, False, "dummy_access_token", "owner-1")
+
+    assert rant_jobs.stats()["queue_depth"] == queue_depth
@@ -0,0 +1,200 @@
+import time
+import pytest
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+
+from app.api.single_flight import SingleFlight
+
+
+def create_single_flight(app: Flask, lock_database=None) -> SingleFlight:
+    """Creates a Single Flight, as the one of a worker, with the given shared lock database."""
+    app.config["SINGLE_FLIGHT_LOCK_DATABASE"] = lock_database
+    app.config["SINGLE_FLIGHT_POLL_INTERVAL"] = 0.01
+
+    single_flight = SingleFlight()
+    single_flight.init_app(app)
+
+    return single_flight
+
+
+def test_single_flight_coalesces_concurrent_calls(app: Flask):
+    """Test that the concurrent calls of a key share a single computation, and that the later calls compute again."""
+    single_flight = create_single_flight(app)
+    release_event = threading.Event()
+    computations = []
+
+    def compute():
+        computations.append(None)
+        release_event.wait()
+        return len(computations)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(single_flight.do, "key", compute) for _ in range(5)]
+
+        while not computations:
+            time.sleep(0.01)
+
+        time.sleep(0.05)
+        release_event.set()
+
+    assert [future.result() for future in futures] == [1] * 5
+    assert single_flight.do("key", compute) == 2
+    assert single_flight.counters.as_dict() == {"computed": 2, "coalesced": 4, "shared_coalesced": 0}
+
+
+def test_single_flight_shares_the_exception_of_the_computation(app: Flask):
+    """Test that the calls coalesced into a failed computation get its exception."""
+    single_flight = create_single_flight(app)
+    release_event = threading.Event()
+
+    def compute():
+        release_event.wait()
+        raise ValueError("Failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(single_flight.do, "key", compute) for _ in range(2)]
+
+        while single_flight.counters.get("computed") == 0:
+            time.sleep(0.01)
+
+        time.sleep(0.05)
+        release_event.set()
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+
+
+def test_single_flight_streams_the_leader_and_returns_its_result_to_the_others(app: Flask):
+    """Test that the leader of a streamed key yields the items it computes, and the others just get its result."""
+    single_flight = create_single_flight(app)
+    release_event = threading.Event()
+
+    def compute():
+        yield "started"
+        release_event.wait()
+        yield "done"
+        return "result"
+
+    def consume():
+        items = []
+        stream = single_flight.stream("key", compute)
+
+        try:
+            while True:
+                items.append(next(stream))
+        except StopIteration as stop:
+            return items, stop.value
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader_future = executor.submit(consume)
+
+        while single_flight.counters.get("computed") == 0:
+            time.sleep(0.01)
+
+        follower_futures = [executor.submit(consume) for _ in range(2)]
+        time.sleep(0.05)
+        release_event.set()
+
+    assert leader_future.result() == (["started", "done"], "result")
+    assert [future.result() for future in follower_futures] == [([], "result")] * 2
+    assert single_flight.counters.as_dict() == {"computed": 1, "coalesced": 2, "shared_coalesced": 0}
+
+
+def test_single_flight_stream_is_computed_again_once_its_leader_is_closed(app: Flask):
+    """Test that the calls waiting on a streamed key compute it themselves if its leader is closed before it's done."""
+    single_flight = create_single_flight(app)
+
+    def compute():
+        yield "started"
+        return "result"
+
+    leader_stream = single_flight.stream("key", compute)
+    assert next(leader_stream) == "started"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        follower_future = executor.submit(lambda: list(single_flight.stream("key", compute)))
+        time.sleep(0.05)
+        leader_stream.close()
+
+        assert follower_future.result() == ["started"]
+
+    assert single_flight.counters.as_dict() == {"computed": 2, "coalesced": 0, "shared_coalesced": 0}
+
+
+def test_single_flight_coalesces_calls_across_workers(app: Flask, tmp_path):
+    """Test that a worker waits for the lock of another worker's computation, and then shares its stored result."""
+    lock_database = str(tmp_path / "flights.sqlite3")
+    first_single_flight = create_single_flight(app, lock_database)
+    second_single_flight = create_single_flight(app, lock_database)
+    lock_store = first_single_flight.lock_store
+
+    release_event = threading.Event()
+    results = {}
+
+    def compute():
+        release_event.wait()
+        results["key"] = "result"
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(first_single_flight.do, "key", compute)
+
+        while not lock_store.has(SingleFlight.get_lock_key("key")):
+            time.sleep(0.01)
+
+        threading.Timer(0.05, release_event.set).start()
+        shared_result = second_single_flight.do("key", lambda: "computed again", lambda: results.get("key"))
+
+    assert future.result() == shared_result == "result"
+    assert second_single_flight.counters.as_dict() == {"computed": 0, "coalesced": 0, "shared_coalesced": 1}
+    assert not lock_store.has(SingleFlight.get_lock_key("key"))
+
+
+def test_single_flight_lock_is_acquired_by_a_single_worker(app: Flask, tmp_path):
+    """Test that a lock, new or expired, is acquired by a single one of the workers trying at once."""
+    lock_database = str(tmp_path / "flights.sqlite3")
+    single_flights = [create_single_flight(app, lock_database) for _ in range(8)]
+    lock_key = SingleFlight.get_lock_key("key")
+
+    def acquire_lock_at_once(timeout):
+        barrier = threading.Barrier(len(single_flights))
+
+        def acquire_lock(single_flight):
+            single_flight.lock_timeout = timeout
+            barrier.wait()
+            return single_flight.acquire_lock(lock_key)
+
+        with ThreadPoolExecutor(max_workers=len(single_flights)) as executor:
+            return list(executor.map(acquire_lock, single_flights))
+
+    assert sum(lock_owner is not None for lock_owner in acquire_lock_at_once(0.05)) == 1
+
+    time.sleep(0.1)
+
+    assert sum(lock_owner is not None for lock_owner in acquire_lock_at_once(120)) == 1
+
+
+def test_single_flight_lock_is_only_released_by_its_holder(app: Flask, tmp_path):
+    """Test that the previous holder of an expired lock doesn't release it once another worker took it over."""
+    lock_database = str(tmp_path / "flights.sqlite3")
+    first_single_flight = create_single_flight(app, lock_database)
+    second_single_flight = create_single_flight(app, lock_database)
+    lock_store = first_single_flight.lock_store
+    lock_key = SingleFlight.get_lock_key("key")
+
+    first_single_flight.lock_timeout = 0.05
+    expired_lock_owner = first_single_flight.acquire_lock(lock_key)
+
+    time.sleep(0.1)
+
+    lock_owner = second_single_flight.acquire_lock(lock_key)
+    assert lock_owner is not None
+
+    first_single_flight.release_lock(lock_key, expired_lock_owner)
+    assert lock_store.has(lock_key)
+
+    second_single_flight.release_lock(lock_key, lock_owner)
+    assert not lock_store.has(lock_key)
@@ -0,0 +1,326 @@
+import gc
+import json
+import pytest
+import random
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Flask
+from flask_caching.backends.simplecache import SimpleCache
+from pytest_mock import MockerFixture
+
+from app import spotify_oauth, spotify_session_pool
+from app.api.spotify import SharedTracksPages, SpotifyClient, SpotifyAPIClient
+from app.api.spotify_cache import SpotifyPlaylistCache
+from app.api.spotify_projection import SpotifyProjection
+from app.api.spotify_session import SpotifySessionPool
+from app.helpers.metrics import StageTimer
+
+
+@pytest.fixture
+def playlist_cache(app: Flask):
+    """A Spotify Playlist Cache backed by a new in-memory cache."""
+    app.config["SPOTIFY_PLAYLIST_CACHE"] = SimpleCache()
+
+    playlist_cache = SpotifyPlaylistCache()
+    playlist_cache.init_app(app)
+
+    return playlist_cache
+
+
+@pytest.fixture
+def http_server():
+    """A local keep-alive HTTP server that records the Authorization header of each request."""
+
+    class KeepAliveHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.server.authorization_headers.append(self.headers.get("Authorization"))
+
+            body = json.dumps({}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.authorization_headers = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+class FakePaginatedSpotify:
+    """Fake Spotify API backend that paginates the tracks of the user's playlists with random latency."""
+
+    def __init__(self, total_tracks, limit=100, playlist_ids=("0001",), playlist_delays=None):
+        """Creates the fake backend with the given number of tracks on each playlist."""
+        self.tracks = [{"track": {"id": f"track-{index}", "name": f"Track {index}"}} for index in range(total_tracks)]
+        self.limit = limit
+        self.playlist_ids = playlist_ids
+        self.playlist_delays = playlist_delays or {}
+        self.requested_offsets = []
+        self.in_flight_requests = 0
+        self.max_in_flight_requests = 0
+        self.lock = threading.Lock()
+
+    def playlist_tracks(self, playlist_id, fields=None, limit=None, offset=0):
+        """Gets a page of the playlist tracks."""
+        limit = limit or self.limit
+
+        with self.lock:
+            self.requested_offsets.append(offset)
+            self.in_flight_requests += 1
+            self.max_in_flight_requests = max(self.max_in_flight_requests, self.in_flight_requests)
+
+        time.sleep(random.uniform(0, 0.01) + self.playlist_delays.get(playlist_id, 0))
+
+        with self.lock:
+            self.in_flight_requests -= 1
+
+        next_offset = offset + limit
+
+        return {
+            "items": self.tracks[offset:next_offset],
+            "limit": limit,
+            "offset": offset,
+            "total": len(self.tracks),
+            "next": f"offset={next_offset}" if next_offset < len(self.tracks) else None,
+        }
+
+    def user_playlists(self, user, limit=50, offset=0):
+        """Gets the page of the user's playlists."""
+        return {
+            "items": [
+                {"id": playlist_id, "name": f"Playlist {playlist_id}", "owner": {"id": user}, "snapshot_id": "1"}
+                for playlist_id in self.playlist_ids
+            ],
+            "next": None,
+        }
+
+
+def get_playlist_sample(snapshot_id="snapshot-1"):
+    """Gets a Spotify Playlist sample, without tracks."""
+    return {
+        "id": "0001",
+        "name": "My Playlist",
+        "owner": {"id": "1234567890"},
+        "description": "Lorem Ipsum",
+        "images": [],
+        "public": True,
+        "collaborative": False,
+        "snapshot_id": snapshot_id,
+    }
+
+
+def get_playlist_tracks_sample(track_names):
+    """Gets a Spotify Playlist Tracks page sample with the given track names."""
+    return {
+        "items": [
+            {"track": {"id": f"track-{name}", "name": name, "artists": [{"id": "a", "name": "Artist"}], "album": {}}}
+            for name in track_names
+        ],
+        "next": None,
+    }
+
+
+def test_playlist_cache_hit_skips_tracks_fetch(playlist_cache: SpotifyPlaylistCache, mocker: MockerFixture):
+    """Test that an unchanged playlist snapshot is served from the cache with a single request."""
+    mock_spotify = mocker.patch("spotipy.Spotify", autospec=True)
+    spotify_instance = mock_spotify.return_value
+    spotify_instance.playlist.return_value = get_playlist_sample()
+    spotify_instance.playlist_tracks.return_value = get_playlist_tracks_sample(["A", "B"])
+
+    spotify = SpotifyClient("dummy_access_token", playlist_cache=playlist_cache)
+
+    playlist = spotify.get_playlist("0001", include_tracks=True)
+    cached_playlist = spotify.get_playlist("0001", include_tracks=True)
+
+    assert [track.name for track in playlist.tracks] == ["A", "B"]
+    assert cached_playlist == playlist
+    assert spotify_instance.playlist.call_count == 2
+    assert spotify_instance.playlist_tracks.call_count == 1
+    assert playlist_cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_playlist_cache_miss_on_new_snapshot(playlist_cache: SpotifyPlaylistCache, mocker: MockerFixture):
+    """Test that a changed playlist snapshot fetches the tracks again."""
+    mock_spotify = mocker.patch("spotipy.Spotify", autospec=True)
+    spotify_instance = mock_spotify.return_value
+    spotify_instance.playlist.return_value = get_playlist_sample("snapshot-1")
+    spotify_instance.playlist_tracks.return_value = get_playlist_tracks_sample(["A"])
+
+    spotify = SpotifyClient("dummy_access_token", playlist_cache=playlist_cache)
+    spotify.get_playlist("0001", include_tracks=True)
+
+    spotify_instance.playlist.return_value = get_playlist_sample("snapshot-2")
+    spotify_instance.playlist_tracks.return_value = get_playlist_tracks_sample(["A", "C"])
+
+    playlist = spotify.get_playlist("0001", include_tracks=True)
+
+    assert [track.name for track in playlist.tracks] == ["A", "C"]
+    assert playlist.snapshot_id == "snapshot-2"
+    assert spotify_instance.playlist_tracks.call_count == 2
+    assert playlist_cache.stats()["misses"] == 2
+
+
+def test_get_playlist_requests_projected_fields(mocker: MockerFixture):
+    """Test that the playlist requests pass the fields filter of the given projection."""
+    mock_spotify = mocker.patch("spotipy.Spotify", autospec=True)
+    spotify_instance = mock_spotify.return_value
+    spotify_instance.playlist.return_value = get_playlist_sample()
+    spotify_instance.playlist_tracks.return_value = get_playlist_tracks_sample(["A"])
+
+    spotify = SpotifyClient("dummy_access_token")
+    playlist = spotify.get_playlist("0001", include_tracks=True, projection=SpotifyProjection.PROMPT)
+
+    assert playlist.tracks[0].name == "A"
+    spotify_instance.playlist.assert_called_once_with("0001", fields=SpotifyProjection.PROMPT.playlist_fields)
+    spotify_instance.playlist_tracks.assert_called_once_with("0001", fields=SpotifyProjection.PROMPT.tracks_fields)
+
+
+@pytest.mark.parametrize("total_tracks", [0, 1, 100, 101, 1234])
+def test_get_playlist_tracks_fetches_pages_concurrently(total_tracks):
+    """Test that the playlist tracks pages are fetched concurrently and reassembled in order."""
+    fake_spotify = FakePaginatedSpotify(total_tracks)
+
+    spotify_api_client = SpotifyAPIClient("dummy_access_token", max_concurrent_requests=4)
+    spotify_api_client.spotify = fake_spotify
+
+    playlist_tracks = spotify_api_client.get_playlist_tracks("0001")
+
+    assert playlist_tracks == fake_spotify.tracks
+    assert sorted(fake_spotify.requested_offsets) == list(range(0, max(total_tracks, 1), 100))
+    assert fake_spotify.max_in_flight_requests <= 4
+
+
+def test_get_playlists_fetches_tracks_concurrently():
+    """Test that the tracks of the user's playlists are fetched concurrently, under the in-flight requests cap."""
+    playlist_ids = [f"{index:04}" for index in range(20)]
+    fake_spotify = FakePaginatedSpotify(350, playlist_ids=playlist_ids)
+
+    spotify = SpotifyClient("dummy_access_token", max_concurrent_requests=4)
+    spotify.spotify_api_client.spotify = fake_spotify
+
+    playlists = spotify.get_playlists("1234567890", include_tracks=True)
+
+    assert [playlist.id for playlist in playlists] == playlist_ids
+    assert all([track.id for track in playlist.tracks] == [f"track-{i}" for i in range(350)] for playlist in playlists)
+    assert len(fake_spotify.requested_offsets) == 20 * 4
+    assert fake_spotify.max_in_flight_requests <= 4
+
+
+def test_iter_playlists_returns_partial_results_on_timeout():
+    """Test that the playlists fetched until the timeout are yielded, skipping the slow ones."""
+    fake_spotify = FakePaginatedSpotify(10, playlist_ids=["0001", "0002", "0003"], playlist_delays={"0002": 1})
+
+    spotify = SpotifyClient("dummy_access_token", max_concurrent_requests=4)
+    spotify.spotify_api_client.spotify = fake_spotify
+
+    start_time = time.monotonic()
+    playlists = list(spotify.iter_playlists("1234567890", timeout=0.5))
+
+    assert time.monotonic() - start_time < 1
+    assert sorted(playlist.id for playlist in playlists) == ["0001", "0003"]
+    assert all(len(playlist.tracks) == 10 for playlist in playlists)
+
+
+def test_spotify_clients_reuse_pooled_connections(app: Flask, http_server: ThreadingHTTPServer):
+    """Test that Spotify clients of different users share the pooled keep-alive connections."""
+    session_pool = SpotifySessionPool()
+    session_pool.init_app(app)
+
+    url = f"http://127.0.0.1:{http_server.server_address[1]}/v1/me"
+
+    for access_token in ["token-1", "token-2", "token-3"]:
+        spotify_api_client = SpotifyAPIClient(access_token, requests_session=session_pool.session)
+        spotify_api_client.spotify._get(url)
+
+        del spotify_api_client
+        gc.collect()
+
+    assert http_server.authorization_headers == ["Bearer token-1", "Bearer token-2", "Bearer token-3"]
+    assert session_pool.stats() == {
+        "pool_size": app.config["SPOTIFY_HTTP_POOL_SIZE"],
+        "hosts": 1,
+        "requests": 3,
+        "connections": 1,
+        "reused_connections": 2,
+    }
+
+    session_pool.session.shutdown()
+
+
+def test_spotify_oauth_uses_pooled_session(app: Flask):
+    """Test that the Spotify OAuth Client uses the pooled session."""
+    assert spotify_oauth._session is spotify_session_pool.session
+
+
+def test_iter_playlist_tracks_pages_streams_pages(playlist_cache: SpotifyPlaylistCache):
+    """Test that the playlist tracks are yielded one parsed page at a time, and cached once fully consumed."""
+    fake_spotify = FakePaginatedSpotify(250)
+
+    spotify = SpotifyClient("dummy_access_token", playlist_cache=playlist_cache, max_concurrent_requests=2)
+    spotify.spotify_api_client.spotify = fake_spotify
+
+    timer = StageTimer()
+    tracks_pages = spotify.iter_playlist_tracks_pages("0001", "snapshot-1", timer=timer)
+
+    assert [track.id for track in next(tracks_pages)] == [f"track-{index}" for index in range(100)]
+    assert playlist_cache.get_tracks("0001", "snapshot-1", SpotifyProjection.FULL) is None
+
+    assert [len(tracks) for tracks in tracks_pages] == [100, 50]
+    assert set(timer.as_dict()) == {"fetch", "parse"}
+
+    cached_tracks = playlist_cache.get_tracks("0001", "snapshot-1", SpotifyProjection.FULL)
+    assert [track.id for track in cached_tracks] == [f"track-{index}" for index in range(250)]
+
+    assert list(spotify.iter_playlist_tracks_pages("0001", "snapshot-1")) == [cached_tracks]
+    assert len(fake_spotify.requested_offsets) == 3
+
+
+def test_shared_tracks_pages_are_fetched_once_and_on_demand():
+    """Test that the passes over shared tracks pages fetch each page once, and only as far as the furthest one goes."""
+    fetched_pages = []
+
+    def iter_tracks_pages():
+        for index in range(10):
+            fetched_pages.append(index)
+            yield [index]
+
+    tracks_pages = SharedTracksPages(iter_tracks_pages())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        passes = list(executor.map(lambda pages_count: list(islice(tracks_pages, pages_count)), [1, 3, 2, 3]))
+
+    assert passes == [[[0]], [[0], [1], [2]], [[0], [1]], [[0], [1], [2]]]
+    assert fetched_pages == [0, 1, 2]
+
+    assert list(tracks_pages) == [[index] for index in range(10)]
+    assert fetched_pages == list(range(10))
+
+
+def test_shared_tracks_pages_raise_the_fetch_error_to_every_pass():
+    """Test that an error fetching a page is raised to every pass that reads up to it, not taken as the last page."""
+
+    def iter_tracks_pages():
+        yield [0]
+        raise ValueError("Failed to fetch")
+
+    tracks_pages = SharedTracksPages(iter_tracks_pages())
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            list(tracks_pages)
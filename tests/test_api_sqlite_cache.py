@@ -0,0 +1,98 @@
+import os
+import json
+import stat
+
+from cachelib import FileSystemCache
+from pytest_mock import MockerFixture
+
+from app import create_app
+from app.api.sqlite_cache import SQLiteCache
+from config import TestConfig
+
+
+def test_sqlite_cache_expires_and_sweeps_entries(tmp_path, mocker: MockerFixture):
+    """Test that the entries of the SQLite cache expire after their timeout, and are swept once expired."""
+    mock_time = mocker.patch("app.api.sqlite_cache.time.time", return_value=1000)
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), default_timeout=60)
+
+    cache.set("key", {"token": "Lorem Ipsum"})
+    cache.set("permanent", "Dolor Sit Amet", timeout=0)
+
+    assert SQLiteCache(cache.path).get("key") == {"token": "Lorem Ipsum"}
+
+    mock_time.return_value = 1060
+
+    assert cache.get("key") is None
+    assert not cache.has("key")
+    assert cache.get("permanent") == "Dolor Sit Amet"
+    assert cache.sweep(force=True) == 1
+    assert cache.sweep(force=True) == 0
+
+
+def test_sqlite_cache_adds_only_missing_or_expired_entries(tmp_path, mocker: MockerFixture):
+    """Test that the SQLite cache adds an entry only if it's missing or expired, and deletes it only by its value."""
+    mock_time = mocker.patch("app.api.sqlite_cache.time.time", return_value=1000)
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+
+    assert cache.add("lock", 1, timeout=60)
+    assert not cache.add("lock", 2, timeout=60)
+    assert cache.get("lock") == 1
+
+    mock_time.return_value = 1060
+
+    assert cache.add("lock", 3, timeout=60)
+    assert cache.get("lock") == 3
+    assert not cache.delete_if("lock", 1)
+    assert cache.get("lock") == 3
+    assert cache.delete_if("lock", 3)
+    assert not cache.delete("lock")
+
+
+def test_sqlite_cache_stores_the_values_as_json(tmp_path):
+    """Test that the values of the SQLite cache are stored as JSON, in a database only readable by its owner."""
+    path = tmp_path / "cache.sqlite3"
+    cache = SQLiteCache(str(path))
+
+    assert cache.set("session", {"token_info": {"access_token": "dummy_access_token", "expires_at": 1000}})
+    assert cache.get("session") == {"token_info": {"access_token": "dummy_access_token", "expires_at": 1000}}
+
+    row = cache.connect().execute("SELECT value FROM cache WHERE key = ?", ("session",)).fetchone()
+
+    assert json.loads(row[0]) == cache.get("session")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_unchanged_session_is_not_written(tmp_path, spotify_token, monkeypatch, mocker: MockerFixture):
+    """Test that the session is kept in the SQLite session store, and only written back to it when it changes."""
+    monkeypatch.setattr(TestConfig, "SESSION_STORE", "sqlite")
+    monkeypatch.setattr(TestConfig, "SESSION_STORE_PATH", str(tmp_path / "sessions.sqlite3"))
+
+    app = create_app("test")
+    client = app.test_client()
+
+    assert isinstance(app.config["SESSION_CACHELIB"], SQLiteCache)
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    spy_set = mocker.spy(app.config["SESSION_CACHELIB"], "set")
+
+    assert client.get("/rant/jobs/unknown").status_code == 404
+    assert spy_set.call_count == 0
+
+    with client.session_transaction() as session:
+        assert session["token_info"] == spotify_token
+
+
+def test_filesystem_session_store_has_its_own_directory(tmp_path, monkeypatch):
+    """Test that the filesystem session store keeps its files in its directory, not at the SQLite store path."""
+    monkeypatch.setattr(TestConfig, "SESSION_STORE", "filesystem")
+    monkeypatch.setattr(TestConfig, "SESSION_STORE_PATH", str(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(TestConfig, "SESSION_STORE_DIR", str(tmp_path / "sessions"))
+
+    app = create_app("test")
+
+    assert isinstance(app.config["SESSION_CACHELIB"], FileSystemCache)
+    assert app.config["SESSION_CACHELIB"].set("session", "data")
+    assert (tmp_path / "sessions").is_dir()
+    assert not (tmp_path / "sessions.sqlite3").exists()
@@ -1,4 +1,4 @@
-from flask_caching.backends.filesystemcache import FileSystemCache
+from cachelib import SimpleCache
 
 
 def test_app_exists(app):
@@ -19,11 +19,9 @@ def test_app_has_session_cookie_name(app):
 def test_app_has_session_cache(app):
     """Test that the app has a session cache."""
     assert app.config["SESSION_TYPE"] == "cachelib"
+    assert app.config["SESSION_STORE"] == "memory"
 
-    cachelib = app.config["SESSION_CACHELIB"]
-
-    assert isinstance(cachelib, FileSystemCache)
-    assert cachelib._path == "/tmp/flask_session"
+    assert isinstance(app.config["SESSION_CACHELIB"], SimpleCache)
 
 
 def test_app_has_secret_key(app):
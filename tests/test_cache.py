@@ -0,0 +1,60 @@
+import re
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+
+def test_static_files_are_versioned_and_cached(app: Flask, client: FlaskClient):
+    """Test that the static files have the hash of their content in their URLs, and are cached for a year."""
+    response = client.get("/auth/login")
+    url = re.search(r'href="(/static/css/styles\.css\?v=[0-9a-f]{12})"', response.get_data(as_text=True)).group(1)
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Expires" not in response.headers and "Pragma" not in response.headers
+
+
+def test_pages_are_not_stored(client: FlaskClient):
+    """Test that the pages aren't stored by the browser, by default."""
+    response = client.get("/auth/login")
+
+    assert response.headers["Cache-Control"] == "private, no-store"
+    assert response.headers["Pragma"] == "no-cache"
+
+
+def test_cache_policy_by_endpoint_over_blueprint(app: Flask, client: FlaskClient, monkeypatch):
+    """Test that the cache policy of an endpoint applies over the one of its blueprint."""
+    monkeypatch.setitem(app.config["CACHE_CONTROL_POLICIES"], "auth", "private, max-age=60")
+
+    assert client.get("/auth/login").headers["Cache-Control"] == "private, max-age=60"
+
+    monkeypatch.setitem(app.config["CACHE_CONTROL_POLICIES"], "auth.login", "no-cache")
+
+    assert client.get("/auth/login").headers["Cache-Control"] == "no-cache"
+
+
+def test_static_files_without_their_current_version_are_cached_briefly(client: FlaskClient):
+    """Test that the static files are only cached for good at the URL of their current version, if found."""
+    response = client.get("/static/css/styles.css")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+
+    response = client.get("/static/css/styles.css?v=000000000000")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+
+    response = client.get("/static/css/missing.css?v=000000000000")
+
+    assert response.status_code == 404
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+
+
+def test_stylesheet_images_are_versioned(client: FlaskClient):
+    """Test that the images of the stylesheet are set by the pages, with their versions in their URLs."""
+    response = client.get("/auth/login")
+
+    assert re.search(r"url\('/static/images/waves\.svg\?v=[0-9a-f]{12}'\)", response.get_data(as_text=True))
@@ -0,0 +1,64 @@
+from flask import Flask, session
+from flask.testing import FlaskClient
+
+from spotipy.oauth2 import SpotifyOAuth
+from spotipy.cache_handler import FlaskSessionCacheHandler
+
+from app.helpers.session import clear_session, get_access_token, get_auth_context, get_token_info, set_token_info
+
+
+def test_auth_context_is_resolved_once_per_request(app: Flask, spotify_token, mocker):
+    """Test that the session is read, and the token expiration checked, only once per request."""
+    get_cached_token_spy = mocker.spy(FlaskSessionCacheHandler, "get_cached_token")
+    is_token_expired_spy = mocker.spy(SpotifyOAuth, "is_token_expired")
+
+    with app.test_request_context():
+        session["token_info"] = spotify_token
+
+        assert get_auth_context().is_authorized()
+        assert get_auth_context().is_authorized()
+        assert get_token_info() == spotify_token
+        assert get_access_token() == spotify_token["access_token"]
+
+    assert get_cached_token_spy.call_count == 1
+    assert is_token_expired_spy.call_count == 1
+
+    with app.test_request_context():
+        assert get_auth_context().token_info is None
+        assert not get_auth_context().is_authorized()
+
+    assert get_cached_token_spy.call_count == 2
+
+
+def test_auth_context_follows_the_session_changes(app: Flask, spotify_token):
+    """Test that setting the token info and clearing the session update the auth context."""
+    with app.test_request_context():
+        assert get_token_info() is None
+
+        set_token_info(spotify_token)
+        assert session["token_info"] == spotify_token
+        assert get_auth_context().is_authorized()
+        assert get_access_token() == spotify_token["access_token"]
+
+        clear_session()
+        assert get_token_info() is None
+
+
+def test_stacked_auth_decorators_share_the_auth_context(client: FlaskClient, spotify_token, mocker):
+    """Test that the stacked auth decorators and the route read the session only once in a request."""
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    def handle_rant(playlist_id, rant_type, regenerate):
+        return {"access_token": get_access_token()}
+
+    mocker.patch("app.rant.routes.handle_rant", side_effect=handle_rant)
+    get_cached_token_spy = mocker.spy(FlaskSessionCacheHandler, "get_cached_token")
+    is_token_expired_spy = mocker.spy(SpotifyOAuth, "is_token_expired")
+
+    response = client.post("/rant/rate", data={"playlist": "0001"})
+    assert response.status_code == 200
+    assert response.json == {"access_token": spotify_token["access_token"]}
+
+    assert get_cached_token_spy.call_count == 1
+    assert is_token_expired_spy.call_count == 1
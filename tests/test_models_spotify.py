@@ -90,6 +90,10 @@ def test_create_spotify_track():
     }
 
     spotify_track = SpotifyTrack.from_json(spotify_track_sample)
+    trusted_spotify_track = SpotifyTrack.from_json(spotify_track_sample, validate=False)
+
+    assert trusted_spotify_track == spotify_track
+    assert trusted_spotify_track.album.model_fields_set == spotify_track.album.model_fields_set
 
     assert spotify_track.id == "1234567890"
     assert spotify_track.name == "Lorem Ipsum"
@@ -346,6 +350,8 @@ def test_create_spotify_playlist():
     assert spotify_playlist.image_url == HttpUrl("https://i.scdn.co/image/ab67616d00001e02ff9ca10b55ce82ae553c8228")
     assert spotify_playlist.public is True
     assert spotify_playlist.collaborative is False
+    assert spotify_playlist.snapshot_id == "string"
+    assert spotify_playlist.total_tracks == 4
     assert (
         spotify_playlist.tracks == [
             SpotifyTrack.from_json(track_data.get("track"))
@@ -355,3 +361,67 @@ def test_create_spotify_playlist():
         if spotify_playlist_tracks_sample
         else []
     )
+
+
+def test_create_spotify_playlist_from_prompt_projection():
+    """Test that a Spotify Playlist can be created from the fields of the prompt projection."""
+    spotify_playlist_sample = {
+        "id": "1234567890",
+        "name": "Lorem Ipsum",
+        "description": "Lorem Ipsum Dolor Sit Amet",
+        "snapshot_id": "string",
+    }
+    spotify_playlist_tracks_sample = [
+        {
+            "track": {
+                "id": "1234567890",
+                "name": "Lorem Ipsum",
+                "artists": [{"id": "0987654321", "name": "John Doe"}],
+                "album": {"id": "2up3OPMp9Tb4dAKM2erWXQ", "name": "Dolor Sit", "release_date": "1981-12"},
+            }
+        },
+        {"track": {"id": "0987654321", "name": "Dolor Sit"}},
+        {"track": None},
+    ]
+
+    spotify_playlist = SpotifyPlaylist.from_json(spotify_playlist_sample, spotify_playlist_tracks_sample)
+
+    assert spotify_playlist.owner_id is None
+    assert spotify_playlist.image_url is None
+    assert len(spotify_playlist.tracks) == 2
+
+    spotify_track = spotify_playlist.tracks[0]
+
+    assert spotify_track.name == "Lorem Ipsum"
+    assert spotify_track.popularity is None
+    assert spotify_track.artists[0].name == "John Doe"
+    assert spotify_track.album.name == "Dolor Sit"
+    assert spotify_track.album.release_date == "1981-12"
+    assert spotify_track.album.artists == []
+
+    assert spotify_playlist.tracks[1].artists == []
+    assert spotify_playlist.tracks[1].album is None
+
+
+def test_create_spotify_playlist_tracks_shares_repeated_albums_and_artists():
+    """Test that the albums and artists repeated over the tracks of a playlist are created once and shared."""
+    artist_sample = {"id": "0987654321", "name": "John Doe"}
+    album_sample = {"id": "2up3OPMp9Tb4dAKM2erWXQ", "name": "Dolor Sit", "artists": [artist_sample]}
+
+    spotify_playlist_tracks_sample = [
+        {"track": {"id": "1", "name": "Lorem", "artists": [artist_sample], "album": album_sample}},
+        {"track": {"id": "2", "name": "Ipsum", "artists": [artist_sample], "album": album_sample}},
+        {"track": {"id": "3", "name": "Local", "artists": [{"id": None, "name": "Jane Doe"}], "album": {"id": None}}},
+        {"track": {"id": "4", "name": "Local", "artists": [{"id": None, "name": "Jane Doe"}], "album": {"id": None}}},
+    ]
+
+    for validate in [True, False]:
+        first, second, first_local, second_local = SpotifyPlaylist.tracks_from_json(
+            spotify_playlist_tracks_sample, validate
+        )
+
+        assert first.album is second.album
+        assert first.artists[0] is second.artists[0]
+        assert first.artists[0] is first.album.artists[0]
+        assert first_local.album is not second_local.album
+        assert first_local.artists[0] is not second_local.artists[0]
@@ -0,0 +1,53 @@
+import pytest
+
+from pathlib import Path
+from langchain.prompts import PromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+
+from app.models.llm import Review, Rhyme
+from app.prompts import prompts
+from app.prompts.prompts import CompiledPromptTemplate, load_prompt_template
+
+
+@pytest.mark.parametrize(
+    "template, parser_model",
+    [
+        (prompts.rate_prompt_template, Review),
+        (prompts.roast_prompt_template, Review),
+        (prompts.rhyme_prompt_template, Rhyme),
+    ],
+)
+def test_compiled_prompt_template_formats_as_langchain(template, parser_model):
+    """Test that the compiled templates format the same prompts as the langchain Prompt Templates."""
+    format_instructions = PydanticOutputParser(pydantic_object=parser_model).get_format_instructions()
+
+    prompt_template = PromptTemplate(
+        template=template,
+        input_variables=["playlist", "tracks"],
+        partial_variables={"format_instructions": format_instructions},
+    )
+    compiled_prompt_template = CompiledPromptTemplate(template, format_instructions=format_instructions)
+
+    variables = {"playlist": "My {Playlist}", "tracks": "Track Name,Artist Names\r\nLorem,['Ipsum']\r\n"}
+
+    assert compiled_prompt_template.format(**variables) == prompt_template.format(**variables)
+    assert compiled_prompt_template.static_text == prompt_template.format(playlist="", tracks="")
+    assert compiled_prompt_template.variables == ["playlist", "tracks"]
+
+
+def test_compiled_prompt_template_version_changes_with_content():
+    """Test that the version of a compiled template only changes with its formatted content."""
+    template = "Lorem {{Ipsum}} {instructions}\n{playlist}"
+
+    version = CompiledPromptTemplate(template, instructions="Dolor").version
+
+    assert CompiledPromptTemplate(template, instructions="Dolor").version == version
+    assert CompiledPromptTemplate(template, instructions="Sit").version != version
+    assert CompiledPromptTemplate(template + ".", instructions="Dolor").version != version
+
+
+def test_load_prompt_template_does_not_depend_on_the_working_directory(tmp_path: Path, monkeypatch):
+    """Test that the prompt templates are loaded from the package, whatever the working directory."""
+    monkeypatch.chdir(tmp_path)
+
+    assert load_prompt_template("rate.md") == prompts.rate_prompt_template
@@ -1,4 +1,9 @@
+import time
+
 from flask.testing import FlaskClient
+from pytest_mock import MockerFixture
+
+from app import spotify_oauth
 
 
 def test_rant_routes_redirect_if_not_auth(client: FlaskClient, spotify_token):
@@ -22,3 +27,20 @@ def test_rant_routes_redirect_if_not_auth(client: FlaskClient, spotify_token):
     response = client.post("/rant/rhyme")
     assert response.status_code == 401
     assert response.location == "/auth/login"
+
+
+def test_rant_job_route_validates_the_token(client: FlaskClient, spotify_token, mocker: MockerFixture):
+    """Test that the rant job route refreshes an expired token, and redirects to login if it can't."""
+    mock_validate_token = mocker.patch.object(spotify_oauth, "validate_token", return_value=None)
+
+    with client.session_transaction() as session:
+        session["token_info"] = {**spotify_token, "expires_at": time.time() - 60}
+
+    response = client.get("/rant/jobs/unknown")
+    assert response.status_code == 401
+    assert response.location == "/auth/login"
+    assert mock_validate_token.call_count == 1
+
+    mock_validate_token.return_value = spotify_token
+
+    assert client.get("/rant/jobs/unknown").status_code == 404
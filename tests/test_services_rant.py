@@ -0,0 +1,557 @@
+import json
+import time
+import threading
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+from flask.testing import FlaskClient
+from langchain_core.messages import AIMessage, AIMessageChunk
+from flask_caching.backends.simplecache import SimpleCache
+from pytest_mock import MockerFixture
+from spotipy import SpotifyException
+
+from app import llm_client, rant_jobs, single_flight, rant_cache as app_rant_cache
+from app.api.rant_cache import RantCache
+from app.models.llm import Review, RantType
+from app.models.spotify import SpotifyPlaylist
+from app.services import rant as rant_service
+from app.services.rant import generate_rant
+
+
+@pytest.fixture
+def rant_cache(app: Flask):
+    """The app's Rant Cache, backed by a new in-memory cache."""
+    app.config["RANT_CACHE"] = SimpleCache()
+    app_rant_cache.init_app(app)
+
+    return app_rant_cache
+
+
+@pytest.fixture
+def spotify_client(mocker: MockerFixture):
+    """A mocked Spotify Client, that returns an empty playlist with the snapshot id it's given."""
+    spotify_client = mocker.patch("app.services.rant.create_spotify_client").return_value
+    spotify_client.snapshot_id = "snapshot-1"
+    spotify_client.get_playlist.side_effect = lambda playlist_id, **kwargs: SpotifyPlaylist.from_json(
+        {"id": playlist_id, "snapshot_id": spotify_client.snapshot_id}
+    )
+    spotify_client.iter_playlist_tracks_pages.return_value = iter([[]])
+
+    return spotify_client
+
+
+def test_generate_rant_is_cached_by_playlist_snapshot(
+    app: Flask, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the rant of an unchanged playlist is served from the cache, unless it's regenerated."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mock_rate = mocker.patch.object(llm_client, "rate", return_value=review)
+
+    with app.app_context():
+        assert generate_rant("0001", RantType.RATE) == review
+        assert generate_rant("0001", RantType.RATE) == review
+        assert mock_rate.call_count == 1
+
+        generate_rant("0001", RantType.RATE, regenerate=True)
+        assert mock_rate.call_count == 2
+
+        spotify_client.snapshot_id = "snapshot-2"
+        generate_rant("0001", RantType.RATE)
+        assert mock_rate.call_count == 3
+
+    stats = rant_cache.stats()
+
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["bypasses"] == 1
+    assert stats["hit_ratio"] == 1 / 3
+
+
+def test_rants_fetch_their_playlist_with_get_rant_playlist(
+    app: Flask, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the generated and streamed rants all fetch their playlist through `get_rant_playlist`."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mocker.patch.object(llm_client, "rant", return_value=review)
+    mocker.patch("app.services.rant.get_access_token", return_value="dummy_access_token")
+    get_rant_playlist_spy = mocker.spy(rant_service, "get_rant_playlist")
+
+    with app.app_context():
+        generate_rant("0001", RantType.RATE)
+        list(rant_service.stream_rant("0001", RantType.RATE))
+        list(rant_service.stream_rants("0001", [RantType.RATE]))
+
+        assert get_rant_playlist_spy.call_count == 3
+
+        spotify_client.get_playlist.side_effect = lambda playlist_id, **kwargs: None
+
+        for generate in [
+            lambda: generate_rant("0001", RantType.RATE),
+            lambda: list(rant_service.stream_rant("0001", RantType.RATE)),
+            lambda: list(rant_service.stream_rants("0001", [RantType.RATE])),
+        ]:
+            with pytest.raises(ValueError, match="Playlist not found"):
+                generate()
+
+
+def test_rant_cache_expires_entries(app: Flask, rant_cache: RantCache, mocker: MockerFixture):
+    """Test that a cached rant expires once it's older than the timeout, even if it was hit since."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mock_time = mocker.patch("app.api.rant_cache.time.time", return_value=1000)
+
+    rant_cache.set_rant("0001", "snapshot-1", RantType.ROAST, "v1", review, generation_ms=2000)
+
+    mock_time.return_value = 1000 + rant_cache.timeout - 1
+    assert rant_cache.get_rant("0001", "snapshot-1", RantType.ROAST, "v1") == review
+    assert rant_cache.get_rant("0001", "snapshot-1", RantType.ROAST, "v2") is None
+
+    mock_time.return_value = 1000 + rant_cache.timeout
+    assert rant_cache.get_rant("0001", "snapshot-1", RantType.ROAST, "v1") is None
+
+    assert rant_cache.stats()["saved_generation_ms"] == 2000
+
+
+def test_rant_versions(app: Flask):
+    """Test that each rant type has its own version, including the LLM model."""
+    versions = [llm_client.get_rant_version(rant_type) for rant_type in RantType]
+
+    assert len(set(versions)) == len(RantType)
+    assert all(version.startswith(f"{app.config['LLM_MODEL']}:") for version in versions)
+
+
+def get_event_messages(response_data: bytes):
+    """Gets the event and the data of each Server-Sent Events message of the given response."""
+    event_messages = []
+
+    for message in response_data.decode().strip().split("\n\n"):
+        event_line, data_line = message.split("\n")
+        event_messages.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+
+    return event_messages
+
+
+def test_rant_stream_sends_progress_partial_and_rant_events(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the streamed rant sends its progress, then its partial fields and the rendered rant, and caches it."""
+    content = '```json\n{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}\n```'
+    chunks = [content[index:][:8] for index in range(0, len(content), 8)]
+
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.stream.return_value = iter(AIMessageChunk(content=chunk) for chunk in chunks)
+    spotify_client.iter_playlist_tracks_pages.return_value = iter([[], []])
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/rate/stream", data={"playlist": "0001"})
+    event_messages = get_event_messages(response.data)
+    events = [event for event, _ in event_messages]
+
+    assert response.mimetype == "text/event-stream"
+    assert events[:3] == ["progress", "progress", "progress"]
+    assert [data["stage"] for _, data in event_messages[:3]] == ["started", "playlist", "prompt"]
+    assert set(events[3:-1]) == {"partial"}
+    assert list(event_messages[3][1]) == ["facts"]
+    assert event_messages[-2][1] == {"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}
+    assert events[-1] == "rant"
+    assert "7/10" in event_messages[-1][1]["html"]
+
+    hits = rant_cache.counters.get("hits")
+
+    response = client.post("/rant/rate/stream", data={"playlist": "0001"})
+    events = [event for event, _ in get_event_messages(response.data)]
+
+    assert events == ["progress", "progress", "rant"]
+    assert mock_llm.stream.call_count == 1
+    assert rant_cache.counters.get("hits") == hits + 1
+
+
+def test_rant_stream_sends_error_event(app: Flask, client: FlaskClient, spotify_token, spotify_client):
+    """Test that an error while streaming the rant is sent as an error event."""
+    spotify_client.get_playlist.side_effect = lambda playlist_id, **kwargs: None
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/roast/stream", data={"playlist": "0001"})
+
+    assert response.status_code == 200
+    assert [event for event, _ in get_event_messages(response.data)] == ["progress", "error"]
+
+
+def test_rant_stream_sends_spotify_errors_as_error_events(
+    app: Flask, client: FlaskClient, spotify_token, spotify_client
+):
+    """Test that a Spotify error while streaming is sent with its status, clearing the session if unauthorized."""
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    spotify_client.get_playlist.side_effect = SpotifyException(404, -1, "Not found")
+    response = client.post("/rant/roast/stream", data={"playlist": "0001"})
+
+    assert get_event_messages(response.data)[-1] == ("error", {"message": "Spotify error: Not found", "status": 404})
+
+    with client.session_transaction() as session:
+        assert session.get("token_info") is not None
+
+    spotify_client.get_playlist.side_effect = SpotifyException(401, -1, "Expired token")
+    response = client.post("/rant/roast/stream", data={"playlist": "0001"})
+
+    assert get_event_messages(response.data)[-1] == (
+        "error",
+        {"message": "Spotify error: Expired token", "status": 401},
+    )
+
+    with client.session_transaction() as session:
+        assert session.get("token_info") is None
+
+
+def test_rant_streams_send_unexpected_errors_as_error_events(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that an unexpected error while streaming the rants is logged and sent as an error event."""
+    mocker.patch.object(llm_client, "stream_rant", side_effect=RuntimeError("API error"))
+    mocker.patch.object(llm_client, "rant", side_effect=RuntimeError("API error"))
+    mock_logger = mocker.patch.object(app, "logger")
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/rate/stream", data={"playlist": "0001"})
+
+    assert get_event_messages(response.data)[-1] == (
+        "error",
+        {"message": "An error occurred while generating the rant", "status": 500},
+    )
+
+    response = client.post("/rant/all/stream", data={"playlist": "0001", "type": ["rate", "roast"]})
+    event_messages = get_event_messages(response.data)
+
+    assert sorted(data["type"] for event, data in event_messages if event == "error") == ["rate", "roast"]
+    assert mock_logger.exception.call_count == 3
+
+
+def test_rant_route(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the rant routes render the rant generated by the LLM."""
+    content = '{"facts": "Lorem Ipsum", "stanzas": [["Dolor", "Sit"], ["Amet"]]}'
+
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.invoke.return_value = AIMessage(content=content)
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/rhyme", data={"playlist": "0001"})
+
+    assert response.status_code == 200
+    assert b"Dolor" in response.data and b"Amet" in response.data
+    assert mock_llm.invoke.call_count == 1
+
+
+def test_rant_route_fails_its_precondition_with_its_etag(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that a rant posted with its ETag gets a 412 without being generated, until its playlist changes."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mock_rant = mocker.patch.object(llm_client, "rant", return_value=review)
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/rate", data={"playlist": "0001"})
+    etag = response.headers["ETag"]
+
+    assert response.status_code == 200
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    response = client.post("/rant/rate", data={"playlist": "0001"}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 412
+    assert response.headers["ETag"] == etag
+    assert spotify_client.get_playlist.call_count == 2
+
+    response = client.post("/rant/roast", data={"playlist": "0001"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    response = client.post(
+        "/rant/rate", data={"playlist": "0001", "regenerate": "true"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    spotify_client.snapshot_id = "snapshot-2"
+    response = client.post("/rant/rate", data={"playlist": "0001"}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert mock_rant.call_count == 4
+
+
+def test_rant_stream_fails_its_precondition_with_its_etag(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the streamed rant sends its ETag, and that a request with it gets a 412 instead of the stream."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mocker.patch.object(llm_client, "stream_rant", return_value=iter([("rant", review)]))
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/rate/stream", data={"playlist": "0001"})
+    event_messages = get_event_messages(response.data)
+    etag = event_messages[-1][1]["etag"]
+
+    assert event_messages[-1][0] == "rant"
+    assert "snapshot_id" not in event_messages[1][1]
+
+    mock_stream_rant = mocker.patch("app.services.rant.stream_rant")
+    response = client.post("/rant/rate/stream", data={"playlist": "0001"}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 412
+    assert response.headers["ETag"] == etag
+    assert mock_stream_rant.call_count == 0
+
+
+def test_rants_stream_fetches_the_tracks_once_and_runs_the_rants_concurrently(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that all the rants share one fetch of the tracks, run concurrently, and are sent as each one is done."""
+    contents = {
+        "rate": '{"facts": "Lorem Ipsum", "review": "Rated", "rating": 7}',
+        "roast": '{"facts": "Lorem Ipsum", "review": "Roasted", "rating": 2}',
+        "rhyme": '{"facts": "Lorem Ipsum", "stanzas": [["Dolor", "Sit"], ["Amet"]]}',
+    }
+    latencies = {"rate": 0.3, "roast": 0.1, "rhyme": 0.2}
+
+    def invoke(prompt):
+        rant_name = "rhyme" if "rhyme" in prompt.lower() else "roast" if "roast" in prompt.lower() else "rate"
+        time.sleep(latencies[rant_name])
+
+        return AIMessage(content=contents[rant_name])
+
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.invoke.side_effect = invoke
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    start_time = time.perf_counter()
+    response = client.post("/rant/all/stream", data={"playlist": "0001", "regenerate": "true"})
+    event_messages = get_event_messages(response.data)
+    elapsed_time = time.perf_counter() - start_time
+
+    assert [data["stage"] for event, data in event_messages if event == "progress"] == ["started", "playlist"]
+    assert [data["type"] for event, data in event_messages if event == "rant"] == ["roast", "rhyme", "rate"]
+    assert elapsed_time < sum(latencies.values())
+    assert spotify_client.iter_playlist_tracks_pages.call_count == 1
+
+    response = client.post("/rant/all/stream", data={"playlist": "0001", "type": ["rate", "rhyme"]})
+    events = [event for event, _ in get_event_messages(response.data)]
+
+    assert events == ["progress", "progress", "rant", "rant"]
+    assert mock_llm.invoke.call_count == 3
+
+
+def test_rants_stream_fetches_the_tracks_pages_up_to_the_largest_prompt(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the rants stop fetching their shared tracks pages once the largest of their prompts is full."""
+    content = '{"facts": "Lorem Ipsum", "review": "Dolor Sit Amet", "rating": 7}'
+    mock_llm = mocker.patch.object(llm_client, "llm")
+    mock_llm.invoke.return_value = AIMessage(content=content)
+
+    prompt_template = llm_client.rate_prompt_manager.prompt_template.format(playlist="", tracks="")
+    prompt_tokens_count = len(llm_client.encoding.encode(prompt_template))
+    mocker.patch.object(llm_client.rate_prompt_manager, "max_prompt_tokens", prompt_tokens_count + 2000)
+    mocker.patch.object(llm_client.roast_prompt_manager, "max_prompt_tokens", prompt_tokens_count + 500)
+
+    fetched_pages = []
+
+    def iter_tracks_pages(*args, **kwargs):
+        for offset in range(0, 10_000, 100):
+            fetched_pages.append(offset)
+            yield SpotifyPlaylist.tracks_from_json(
+                [
+                    {"track": {"id": f"track-{offset + index}", "name": f"Track {offset + index}", "artists": []}}
+                    for index in range(100)
+                ]
+            )
+
+    spotify_client.iter_playlist_tracks_pages.side_effect = iter_tracks_pages
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    computed_count = single_flight.counters.get("computed")
+
+    response = client.post("/rant/all/stream", data={"playlist": "0001", "type": ["rate", "roast"]})
+    event_messages = get_event_messages(response.data)
+
+    assert sorted(data["type"] for event, data in event_messages if event == "rant") == ["rate", "roast"]
+    assert single_flight.counters.get("computed") == computed_count + 2
+    assert 0 < len(fetched_pages) <= 3
+    assert spotify_client.iter_playlist_tracks_pages.call_count == 1
+
+
+def test_rants_stream_sends_an_error_event_per_failed_rant(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that a rant that fails is sent as an error event of its type, without failing the other rants."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+
+    def rant(playlist, prompt_manager, tracks_pages=None, timer=None):
+        if prompt_manager is llm_client.roast_prompt_manager:
+            raise ValueError("Invalid rant")
+
+        return review
+
+    mocker.patch.object(llm_client, "rant", side_effect=rant)
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post(
+        "/rant/all/stream", data={"playlist": "0001", "type": ["rate", "roast"], "regenerate": "true"}
+    )
+    event_messages = [(event, data) for event, data in get_event_messages(response.data) if event != "progress"]
+
+    assert sorted((event, data["type"]) for event, data in event_messages) == [("error", "roast"), ("rant", "rate")]
+
+    response = client.post("/rant/all/stream", data={"playlist": "0001", "type": ["scream"]})
+
+    assert get_event_messages(response.data) == [("error", {"message": "Invalid rant type"})]
+
+
+def test_rant_job_runs_in_the_background(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that a submitted rant job runs in the background, and that its status is long polled until it's done."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mocker.patch.object(llm_client, "rate", side_effect=lambda *args: time.sleep(0.2) or review)
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    response = client.post("/rant/rate/jobs", data={"playlist": "0001"})
+    job_id = response.json["job_id"]
+
+    assert response.status_code == 202
+    assert response.location == f"/rant/jobs/{job_id}"
+    assert response.json["status"] in ["queued", "running"]
+
+    response = client.get(f"/rant/jobs/{job_id}", query_string={"wait": 5})
+
+    assert response.json["status"] == "done"
+    assert "7/10" in response.json["html"]
+    assert spotify_client.get_playlist.call_count == 1
+    assert rant_jobs.store.get(job_id)["access_token"] is None
+    assert client.get("/rant/jobs/unknown").status_code == 404
+
+    other_client = app.test_client()
+
+    with other_client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    assert other_client.get(f"/rant/jobs/{job_id}").status_code == 404
+
+
+def test_rant_job_queue_rejects_jobs_over_its_depth(
+    app: Flask, client: FlaskClient, spotify_token, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that a job submitted while the queue is full is rejected, and that a failed job reports its error."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=2)
+    release_event = threading.Event()
+    mocker.patch.object(llm_client, "roast", side_effect=lambda *args: release_event.wait() and review)
+    mocker.patch.object(rant_jobs, "max_queue_depth", 1)
+
+    with client.session_transaction() as session:
+        session["token_info"] = spotify_token
+
+    first_response = client.post("/rant/roast/jobs", data={"playlist": "0001"})
+    second_response = client.post("/rant/roast/jobs", data={"playlist": "0002"})
+
+    assert first_response.status_code == 202
+    assert second_response.status_code == 503
+    assert second_response.headers["Retry-After"] == "5"
+
+    release_event.set()
+
+    response = client.get(first_response.location, query_string={"wait": 5})
+    assert response.json["status"] == "done"
+
+    spotify_client.get_playlist.side_effect = lambda playlist_id, **kwargs: None
+
+    response = client.post("/rant/roast/jobs", data={"playlist": "0003"})
+    response = client.get(response.location, query_string={"wait": 5})
+
+    assert response.json["status"] == "failed"
+    assert response.json["message"] == "Playlist not found"
+
+
+def test_generate_rant_coalesces_identical_concurrent_requests(
+    app: Flask, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the identical rant requests made while one is generating wait for it, instead of generating again."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    mock_rate = mocker.patch.object(llm_client, "rate", side_effect=lambda *args: time.sleep(0.2) or review)
+    coalesced_count = single_flight.counters.get("coalesced")
+
+    def generate():
+        with app.app_context():
+            return generate_rant("0001", RantType.RATE, regenerate=True)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        rants = list(executor.map(lambda _: generate(), range(3)))
+
+    assert rants == [review] * 3
+    assert mock_rate.call_count == 1
+    assert spotify_client.iter_playlist_tracks_pages.call_count == 1
+    assert single_flight.counters.get("coalesced") == coalesced_count + 2
+
+
+def test_rant_stream_coalesces_identical_concurrent_streams(
+    app: Flask, rant_cache: RantCache, spotify_client, mocker: MockerFixture
+):
+    """Test that the identical rant streams started while one is generating wait for its rant, and only send it."""
+    review = Review(facts="Lorem Ipsum", review="Dolor Sit Amet", rating=7)
+    release_event = threading.Event()
+
+    def stream_rant(playlist, prompt_manager, tracks_pages=None, timer=None):
+        list(tracks_pages)
+        yield "prompt", None
+        release_event.wait()
+        yield "partial", {"facts": "Lorem"}
+        yield "rant", review
+
+    mock_stream_rant = mocker.patch.object(llm_client, "stream_rant", side_effect=stream_rant)
+    computed_count = single_flight.counters.get("computed")
+    coalesced_count = single_flight.counters.get("coalesced")
+
+    def stream():
+        with app.app_context():
+            return list(rant_service.stream_rant("0001", RantType.RATE, regenerate=True))
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader_future = executor.submit(stream)
+
+        while single_flight.counters.get("computed") == computed_count:
+            time.sleep(0.01)
+
+        follower_futures = [executor.submit(stream) for _ in range(2)]
+        time.sleep(0.05)
+        release_event.set()
+
+    leader_events = [event for event, _ in leader_future.result()]
+    assert leader_events == ["progress", "progress", "progress", "partial", "rant"]
+
+    for future in follower_futures:
+        events = future.result()
+        assert [event for event, _ in events] == ["progress", "progress", "rant"]
+        assert events[-1][1] == review
+
+    assert mock_stream_rant.call_count == 1
+    assert single_flight.counters.get("coalesced") == coalesced_count + 2